@@ -0,0 +1,140 @@
+"""
+Benchmark harness for dbml_sqlite.
+
+Generates a synthetic schema, then measures each stage of a conversion separately (PyDBML and native parsing, every `process*` emitter, the statements the conversion emits for the parsed file, the whole `iterPhased` conversion, the final join and executing the DDL on SQLite) for wall time and peak traced memory, and writes a JSON report.
+
+    python -m benchmarks.run --tables 500 --columns 20 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from pydbml import PyDBML
+from dbml_sqlite import __version__, processEnum, processTable, processColumn, processRef, processIndex, applyStatements, iterPhased
+from dbml_sqlite.core import _fileStatements
+from dbml_sqlite.native import parseDBML
+from .synthetic import syntheticDBML
+
+def measure(func, repeat=3):
+    """
+    Time `func` over `repeat` runs, then run it once more under `tracemalloc` for its peak memory. Tracing slows Python down considerably, so it is kept out of the timed runs.
+
+    Parameters:
+    func (function): the stage to measure. Called without arguments.
+    repeat (int): Default is 3. Number of timed runs; the fastest one is reported.
+
+    Returns:
+    tuple: `(result, stats)` where `result` is what the last run returned and `stats` is a dict with `seconds` and `peak_bytes`.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, {'seconds': best, 'peak_bytes': peak}
+
+def runBenchmark(tables=50, columns=10, enums=5, enumItems=20, refs=2, indexes=2, repeat=3, emulation='full'):
+    """
+    Generate a synthetic schema and measure every stage of converting and executing it.
+
+    Parameters:
+    tables, columns, enums, enumItems, refs, indexes: size of the synthetic schema, see `syntheticDBML`.
+    repeat (int): Default is 3. Runs per stage; the fastest one is reported.
+    emulation (str): Default is "full". Enum emulation mode to convert with, "full", "half" or "integer".
+
+    Returns:
+    dict: the report, with `meta` describing the environment and schema and `stages` mapping each stage to its `seconds` and `peak_bytes`.
+    """
+    params = {'tables': tables, 'columns': columns, 'enums': enums, 'enumItems': enumItems, 'refs': refs, 'indexes': indexes}
+    source = syntheticDBML(**params)
+    stages = {}
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'synthetic.dbml')
+        with open(path, 'w') as f:
+            f.write(source)
+        parsed, stages['parse'] = measure(lambda: PyDBML.parse_file(path), repeat)
+        # The whole conversion of the file, reading and parsing included.
+        _, stages['iterPhased'] = measure(lambda: list(iterPhased(path, emulation)), repeat)
+    _, stages['parseNative'] = measure(lambda: parseDBML(source), repeat)
+    allColumns = [c for t in parsed.tables for c in t.columns]
+    allRefs = [r for t in parsed.tables for r in t.refs]
+    allIndexes = [(t, i) for t in parsed.tables for i in t.indexes]
+    _, stages['processColumn'] = measure(lambda: [processColumn(c, emulation) for c in allColumns], repeat)
+    _, stages['processRef'] = measure(lambda: [processRef(r) for r in allRefs], repeat)
+    _, stages['processEnum'] = measure(lambda: [processEnum(e, True, False) for e in parsed.enums], repeat)
+    _, stages['processTable'] = measure(lambda: [processTable(t, emulation) for t in parsed.tables], repeat)
+    _, stages['processIndex'] = measure(lambda: [processIndex(t, i) for t, i in allIndexes], repeat)
+    # The statements of a parsed file, as the conversion emits them, rather than a copy of its loop.
+    statements, stages['emit'] = measure(lambda: [statement for _, statement in _fileStatements(parsed, emulation, True, True, None)], repeat)
+    ddl, stages['join'] = measure(lambda: ''.join(statements), repeat)
+    def executescript():
+        con = sqlite3.connect(':memory:')
+        con.executescript(ddl)
+        con.close()
+    def apply():
+        con = sqlite3.connect(':memory:')
+        applyStatements(statements, con)
+        con.close()
+    _, stages['executescript'] = measure(executescript, repeat)
+    _, stages['applyStatements'] = measure(apply, repeat)
+    return {
+        'meta': {
+            'dbml_sqlite': __version__,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'emulation': emulation,
+            'repeat': repeat,
+            'schema': params,
+            'counts': {
+                'tables': len(parsed.tables),
+                'columns': len(allColumns),
+                'refs': len(allRefs),
+                'indexes': len(allIndexes),
+                'enums': len(parsed.enums),
+                'statements': len(statements),
+                'source_bytes': len(source),
+                'ddl_bytes': len(ddl),
+            },
+        },
+        'stages': stages,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='Benchmark dbml_sqlite on a synthetic schema.')
+    parser.add_argument('--tables', type=int, default=50)
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--enums', type=int, default=5)
+    parser.add_argument('--enum-items', dest='enumItems', type=int, default=20)
+    parser.add_argument('--refs', type=int, default=2)
+    parser.add_argument('--indexes', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--half', dest='emulation', action='store_const', const='half', default='full', help='Use half enum emulation.')
+    mode.add_argument('--integer', dest='emulation', action='store_const', const='integer', help='Use integer enum emulation.')
+    parser.add_argument('--output', '-o', help='File to write the JSON report to. Printed to stdout if omitted.')
+    args = parser.parse_args(argv)
+    report = runBenchmark(args.tables, args.columns, args.enums, args.enumItems, args.refs, args.indexes, args.repeat, args.emulation)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    for stage, stats in report['stages'].items():
+        print(f'{stage:>16} {stats["seconds"] * 1000:10.2f} ms {stats["peak_bytes"] / 1024:12.1f} KiB', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
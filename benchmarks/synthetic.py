@@ -0,0 +1,53 @@
+import random
+
+TYPES = ('integer', 'int', 'bigint', 'text', 'varchar', 'varchar(255)', 'real', 'float', 'decimal', 'boolean', 'datetime', 'blob')
+
+def syntheticDBML(tables=50, columns=10, enums=5, enumItems=20, refs=2, indexes=2, seed=0):
+    """
+    Generate a synthetic DBML schema for benchmarking.
+
+    Parameters:
+    tables (int): Default is 50. Number of tables.
+    columns (int): Default is 10. Number of plain columns per table, on top of the `id` primary key, enum columns and foreign key columns.
+    enums (int): Default is 5. Number of enums. Every table gets one column per enum while there are fewer than `columns` of them.
+    enumItems (int): Default is 20. Number of items per enum.
+    refs (int): Default is 2. Number of foreign key columns per table, each referencing the `id` of an earlier table. Alternates between inline refs and standalone `Ref:` blocks.
+    indexes (int): Default is 2. Number of composite indexes per table.
+    seed (int): Default is 0. Seed for the random choice of column types, so the same arguments always produce the same schema.
+
+    Returns:
+    str: the DBML.
+    """
+    rnd = random.Random(seed)
+    out = []
+    for e in range(enums):
+        out.append(f'enum e{e} {{\n')
+        for i in range(enumItems):
+            out.append(f'    e{e}_item{i}\n')
+        out.append('}\n\n')
+    standalone = []
+    for t in range(tables):
+        out.append(f'Table t{t} {{\n    id integer [pk]\n')
+        for c in range(columns):
+            settings = ' [not null]' if c % 3 == 0 else ''
+            out.append(f'    c{c} {rnd.choice(TYPES)}{settings}\n')
+        for e in range(min(enums, columns)):
+            out.append(f'    status{e} e{e} [not null]\n')
+        for r in range(refs if t else 0):
+            parent = rnd.randrange(t)
+            if r % 2 == 0:
+                out.append(f'    fk{r} integer [ref: > t{parent}.id]\n')
+            else:
+                out.append(f'    fk{r} integer\n')
+                standalone.append(f'Ref: t{t}.fk{r} > t{parent}.id [delete: cascade]\n')
+        if indexes and columns >= 2:
+            out.append('\n    indexes {\n')
+            for i in range(indexes):
+                a = i % columns
+                b = (i + 1) % columns
+                unique = ', unique' if i % 2 else ''
+                out.append(f'        (c{a}, c{b}) [name: \'t{t}_idx{i}\'{unique}]\n')
+            out.append('    }\n')
+        out.append('}\n\n')
+    out.extend(standalone)
+    return ''.join(out)
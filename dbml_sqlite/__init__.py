@@ -1,5 +1,70 @@
-from .core import * 
-from .terminal import cli
+from .core import *
 
 __version__ = '0.3.3'
 
+# Everything outside of `core` is imported on first use, so `import dbml_sqlite` stays cheap: sqlite3, click and
+# friends are only loaded by the code paths that need them, and pydbml only once something is parsed.
+_LAZY = {
+    'DDLCache': 'cache',
+    'MemoryCache': 'cache',
+    'Stats': 'stats',
+    'applySQLite': 'apply',
+    'applyStatements': 'apply',
+    'statementName': 'apply',
+    'StatementTiming': 'apply',
+    'BOOTSTRAP_PRAGMAS': 'apply',
+    'applyPreamble': 'apply',
+    'splitPreamble': 'apply',
+    'PERSISTENT_PRAGMAS': 'profiles',
+    'PRAGMA_ORDER': 'profiles',
+    'parsePragma': 'profiles',
+    'checkPragma': 'profiles',
+    'toSQLiteAsync': 'aio',
+    'applySQLiteAsync': 'aio',
+    'applyStatementsAsync': 'aio',
+    'configureAsync': 'aio',
+    'loadSQLite': 'load',
+    'loadRows': 'load',
+    'provisionSQLite': 'provision',
+    'provisionStatements': 'provision',
+    'expandTargets': 'provision',
+    'ProvisionResult': 'provision',
+    'TypeRegistry': 'coltypes',
+    'normalizeColType': 'coltypes',
+    'readColTypes': 'coltypes',
+    'SchemaTemplate': 'template',
+    'schemaFixture': 'template',
+    'snapshotDBML': 'watch',
+    'watchDBML': 'watch',
+    'sendRequest': 'serve',
+    'handleRequest': 'serve',
+    'diffSQLite': 'diff',
+    'migrateSQLite': 'diff',
+    'applyMigration': 'diff',
+    'cli': 'terminal',
+    'migrate': 'terminal',
+}
+
+# The public API. `from dbml_sqlite import *` imports the names in `_LAZY` too, and with them the modules defining
+# them, click and sqlite3 included; import names one by one to keep startup cheap.
+__all__ = [
+    'PHASES', 'PARSERS', 'EMULATIONS', 'LABEL_VIEW_SUFFIX', 'TABLE_OPTIONS', 'SQLITE_FEATURES', 'ENUM_BATCH_ROWS',
+    'MAX_SQL_LENGTH', 'Event', 'ForeignKeyIndex', 'BatchInsert', 'PROFILES', 'resolvePragmas', 'pragmaStatements',
+    'TYPE_REGISTRY', 'TypeMatch', 'toSQLite', 'iterSQLite', 'iterPhased', 'pragmaPreamble', 'parseDBMLFile',
+    'dbmlTargets', 'validDBMLFile', 'processFiles', 'processFile', 'iterFile', 'processIndex', 'foreignKeyIndexes',
+    'tableIndexes', 'tableOptions', 'indexOptions', 'indexName', 'processEnum', 'enumInserts', 'processTable',
+    'processLabelView', 'labelViewName', 'enumColumns', 'processRef', 'processColumn', 'coerceColType',
+    'explainColTypes',
+] + list(_LAZY)
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    from importlib import import_module
+    value = getattr(import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,13 @@
+import sys
+
+def main(args=None):
+    """Entry point of the `dbml_sqlite` script and of `python -m dbml_sqlite`. `dbml_sqlite client ...` is sent to the server right away, without importing click, so it starts as fast as the `dbml_sqlite_client` script; everything else is handed to `terminal.main`."""
+    args = sys.argv[1:] if args is None else list(args)
+    if args and args[0] == 'client':
+        from .serve import clientMain
+        sys.exit(clientMain(args[1:]))
+    from .terminal import main as terminalMain
+    return terminalMain(args)
+
+if __name__ == '__main__':
+    main()
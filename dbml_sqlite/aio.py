@@ -0,0 +1,168 @@
+import asyncio
+import sqlite3
+import threading
+import weakref
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+from .core import toSQLite, iterPhased
+from .apply import applyStatements, applyPreamble, splitPreamble
+
+# Conversions run on a shared pool of this many threads unless another executor is configured or passed.
+CONVERT_THREADS = 4
+
+# Number of databases written to at the same time, each from a thread of its own.
+APPLY_LIMIT = 8
+
+_executor = None
+_applyLimit = APPLY_LIMIT
+# One semaphore per event loop, since asyncio primitives can't be shared between loops.
+_semaphores = weakref.WeakKeyDictionary()
+
+def configureAsync(executor=None, applyLimit=None):
+    """
+    Set the concurrency limits of the async API for the whole process.
+
+    Parameters:
+    executor (concurrent.futures.Executor): Default is None, which keeps the current one. The executor conversions run on when none is passed to the call. The default is a pool of `CONVERT_THREADS` threads; a `ProcessPoolExecutor` keeps parsing from holding the GIL the event loop needs, at the cost of sending the results back, and its observers and caches must be picklable.
+    applyLimit (int): Default is None, which keeps the current limit. Number of databases written to at the same time. Calls over the limit wait for a slot without blocking the event loop.
+    """
+    global _executor, _applyLimit
+    if applyLimit is not None:
+        if not isinstance(applyLimit, int) or applyLimit < 1:
+            raise ValueError(f'applyLimit must be a positive integer, got {applyLimit!r}.')
+        _applyLimit = applyLimit
+        _semaphores.clear()
+    if executor is not None:
+        _executor = executor
+
+async def toSQLiteAsync(dbml=".", emulation="full", tableExists=True, indexExists=True, join=True, workers=1, cache=None, phase=None, observer=None, parser="pydbml", fkIndexes=False, sqliteVersion=None, profile=None, pragmas=None, labelViews=False, executor=None):
+    """
+    Like `toSQLite`, but reads and parses the files on an executor instead of blocking the event loop.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`.
+    emulation (str): Default is "full". Emulation mode for enums, "full", "half" or "integer".
+    tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
+    indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
+    join (bool): Default is True. If True, the statements are joined into one string, as for `toSQLite`.
+    workers (int): Default is 1. Number of processes used to convert a directory of files, as for `toSQLite`.
+    cache (DDLCache): Default is None. If given, generated DDL is looked up in and stored to this cache.
+    phase (str): Default is None for all statements. Pass "pragmas", "schema" or "indexes" to only get statements of that phase.
+    observer (function): Default is None. Called with an `Event` per step, as for `toSQLite`, on the executor's thread.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    sqliteVersion (str or tuple): Default is None. The oldest SQLite version the DDL must run on, as for `toSQLite`.
+    profile (str): Default is None. Name of a PRAGMA profile to start the output with, as for `toSQLite`.
+    pragmas (dict): Default is None. PRAGMAs overriding the profile, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+    executor (concurrent.futures.Executor): Default is None, for the executor set by `configureAsync`.
+
+    Returns:
+    str or list of str: the same as `toSQLite`.
+    """
+    convert = partial(toSQLite, dbml, emulation, tableExists, indexExists, join, workers, cache, phase, observer, parser, fkIndexes, sqliteVersion, profile, pragmas, labelViews)
+    return await _convert(convert, executor)
+
+async def applySQLiteAsync(dbml, database, emulation="full", tableExists=True, indexExists=True, bootstrap=False, workers=1, cache=None, observer=None, parser="pydbml", fkIndexes=False, profile=None, pragmas=None, labelViews=False, executor=None):
+    """
+    Like `applySQLite`, but converts on an executor and executes the statements on a thread of its own, without blocking the event loop. If the task is cancelled, the statement running is interrupted and the transaction rolled back before the cancellation is raised.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`.
+    database (str, Path or sqlite3.Connection): the database to create the schema in. A path is opened on the thread executing the statements. A connection must be opened with `check_same_thread=False` and must not have a transaction in progress.
+    emulation (str): Default is "full". Emulation mode for enums, "full", "half" or "integer".
+    tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
+    indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
+    bootstrap (bool or dict): Default is False. PRAGMAs set while the schema is created, as for `applySQLite`.
+    workers (int): Default is 1. Number of processes used to convert a directory of files.
+    cache (DDLCache): Default is None. If given, generated DDL is looked up in and stored to this cache.
+    observer (function): Default is None. Called with an `Event` per step and executed statement, as for `applySQLite`, from the executor's and the database's thread.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    profile (str): Default is None. Name of a PRAGMA profile, as for `toSQLite`, applied before the transaction begins.
+    pragmas (dict): Default is None. PRAGMAs overriding the profile, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+    executor (concurrent.futures.Executor): Default is None, for the executor set by `configureAsync`.
+
+    Returns:
+    list of StatementTiming: one `(sql, seconds)` pair per executed statement, the preamble included.
+    """
+    convert = partial(_phased, dbml, emulation, tableExists, indexExists, workers, cache, observer, parser, fkIndexes, sqlite3.sqlite_version, profile, pragmas, labelViews)
+    preamble, tagged = splitPreamble(await _convert(convert, executor))
+    return await applyStatementsAsync([statement for _, statement in tagged], database, bootstrap, observer, preamble)
+
+async def applyStatementsAsync(statements, database, bootstrap=False, observer=None, preamble=()):
+    """
+    Execute SQLite statements in a single transaction on a thread of their own, like `applyStatements`, waiting for a slot among the `applyLimit` databases written to at once. If the task is cancelled, the statement running is interrupted and the transaction rolled back before the cancellation is raised.
+
+    Parameters:
+    statements (list of str): complete SQLite statements, one per item.
+    database (str, Path or sqlite3.Connection): the database to execute on. A path is opened on the thread executing the statements. A connection must be opened with `check_same_thread=False` and must not have a transaction in progress.
+    bootstrap (bool or dict): Default is False. As for `applyStatements`.
+    observer (function): Default is None. If given, it is called with an `Event` of kind "execute" after every statement, on the database's thread.
+    preamble (list of str): Default is empty. PRAGMA statements applied with `applyPreamble` before the transaction begins.
+
+    Returns:
+    list of StatementTiming: one `(sql, seconds)` pair per executed statement, the preamble included.
+    """
+    statements = list(statements)
+    preamble = list(preamble)
+    async with _semaphore():
+        cancelled = threading.Event()
+        connections = []
+        done = Future()
+        def run():
+            try:
+                done.set_result(_applyOnThread(database, statements, preamble, bootstrap, observer, cancelled, connections))
+            except BaseException as e:
+                done.set_exception(e)
+        threading.Thread(target=run, name=f'dbml_sqlite apply {database}', daemon=True).start()
+        result = asyncio.wrap_future(done)
+        try:
+            return await asyncio.shield(result)
+        except asyncio.CancelledError:
+            cancelled.set()
+            for con in connections:
+                con.interrupt()
+            # The cancellation is only raised once the thread rolled back and let go of the database.
+            await asyncio.wait([result])
+            raise
+
+class _Cancelled(Exception):
+    pass
+
+def _applyOnThread(database, statements, preamble, bootstrap, observer, cancelled, connections):
+    con = database if isinstance(database, sqlite3.Connection) else sqlite3.connect(str(database))
+    connections.append(con)
+    try:
+        timings = applyPreamble(preamble, con, observer=observer)
+        return timings + applyStatements(_untilCancelled(statements, cancelled), con, bootstrap=bootstrap, observer=observer)
+    finally:
+        if con is not database:
+            con.close()
+
+def _untilCancelled(statements, cancelled):
+    # Raising from the iterable makes applyStatements roll back everything executed so far.
+    for statement in statements:
+        if cancelled.is_set():
+            raise _Cancelled()
+        yield statement
+
+def _phased(*args):
+    # Runs on the executor, possibly in another process, so the lazy pairs are collected there.
+    return list(iterPhased(*args))
+
+async def _convert(convert, executor):
+    global _executor
+    if executor is None:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CONVERT_THREADS, thread_name_prefix='dbml_sqlite')
+        executor = _executor
+    return await asyncio.get_running_loop().run_in_executor(executor, convert)
+
+def _semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(_applyLimit)
+    return semaphore
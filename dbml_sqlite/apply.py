@@ -0,0 +1,206 @@
+import sqlite3
+from time import perf_counter
+from contextlib import contextmanager
+from collections import namedtuple
+from itertools import chain
+from .core import iterPhased, Event, BatchInsert
+from .profiles import PERSISTENT_PRAGMAS, parsePragma, checkPragma
+
+StatementTiming = namedtuple('StatementTiming', ['sql', 'seconds'])
+
+BOOTSTRAP_PRAGMAS = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+    'foreign_keys': 'OFF',
+}
+
+_AUTO_VACUUM = {'NONE': '0', 'FULL': '1', 'INCREMENTAL': '2'}
+
+def applySQLite(dbml, database, emulation="full", tableExists=True, indexExists=True, bootstrap=False, workers=1, cache=None, observer=None, parser="pydbml", fkIndexes=False, profile=None, pragmas=None, labelViews=False):
+    """
+    Convert DBML to SQLite and execute it on a database statement by statement, inside a single transaction. Tables and indexes using options the installed SQLite library doesn't support raise a ValueError before anything is executed.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`.
+    database (str, Path or sqlite3.Connection): the database to create the schema in. A path is opened (and created if needed) and closed again afterwards; a connection is left open and must not have a transaction in progress.
+    emulation (str): Default is "full". Emulation mode for enums, "full", "half" or "integer".
+    tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
+    indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
+    bootstrap (bool or dict): Default is False. If True, `BOOTSTRAP_PRAGMAS` are set while the schema is created and restored afterwards. A dict of PRAGMA names to values can be passed instead.
+    workers (int): Default is 1. Number of processes used to convert a directory of files.
+    cache (DDLCache): Default is None. If given, generated DDL is looked up in and stored to this cache.
+    observer (function): Default is None. Called with an `Event` for every conversion step, as for `toSQLite`, and for every executed statement.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    profile (str): Default is None. Name of a PRAGMA profile, as for `toSQLite`. Its preamble is applied with `applyPreamble` before the transaction begins.
+    pragmas (dict): Default is None. PRAGMAs overriding the profile, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+
+    Returns:
+    list of StatementTiming: one `(sql, seconds)` pair per executed statement, the preamble included.
+    """
+    if not isinstance(database, sqlite3.Connection):
+        con = sqlite3.connect(str(database))
+        try:
+            return applySQLite(dbml, con, emulation, tableExists, indexExists, bootstrap, workers, cache, observer, parser, fkIndexes, profile, pragmas, labelViews)
+        finally:
+            con.close()
+    tagged = iterPhased(dbml, emulation, tableExists=tableExists, indexExists=indexExists, workers=workers, cache=cache, observer=observer, parser=parser, fkIndexes=fkIndexes, sqliteVersion=sqlite3.sqlite_version, profile=profile, pragmas=pragmas, labelViews=labelViews)
+    preamble, statements = splitPreamble(tagged)
+    timings = applyPreamble(preamble, database, observer=observer)
+    return timings + applyStatements((statement for _, statement in statements), database, bootstrap=bootstrap, observer=observer)
+
+def splitPreamble(tagged):
+    """
+    Take the "pragmas" phase off the front of the `(phase, statement)` pairs of `iterPhased`.
+
+    Parameters:
+    tagged (iterable of (str, str)): `(phase, statement)` pairs, as yielded by `iterPhased`.
+
+    Returns:
+    (list of str, iterator of (str, str)): the PRAGMA statements, and the pairs of all the other phases.
+    """
+    tagged = iter(tagged)
+    preamble = []
+    for phase, statement in tagged:
+        if phase != 'pragmas':
+            return preamble, chain([(phase, statement)], tagged)
+        preamble.append(statement)
+    return preamble, tagged
+
+def applyPreamble(statements, database, observer=None):
+    """
+    Execute a PRAGMA preamble, as generated by `pragmaPreamble`, outside of any transaction. Settings stored in the database file (`PERSISTENT_PRAGMAS`) only apply to a database without tables, so when one of them changes on a database that has some, `VACUUM` rebuilds it with the new setting. WAL mode is left for that, since `page_size` can't change in it, and restored by the rest of the preamble.
+
+    Parameters:
+    statements (iterable of str): `PRAGMA name = value;` statements.
+    database (str, Path or sqlite3.Connection): the database to set them on. A path is opened and closed again afterwards, which only keeps the settings that are stored in the file.
+    observer (function): Default is None. If given, it is called with an `Event` of kind "execute" after every statement.
+
+    Returns:
+    list of StatementTiming: one `(sql, seconds)` pair per executed statement, `VACUUM` and any `journal_mode` change it needed included.
+    """
+    values = [parsePragma(statement) for statement in statements]
+    if not isinstance(database, sqlite3.Connection):
+        con = sqlite3.connect(str(database))
+        try:
+            return applyPreamble([f'PRAGMA {key} = {value};\n' for key, value in values], con, observer)
+        finally:
+            con.close()
+    if database.in_transaction:
+        raise ValueError('The connection has a transaction in progress. Commit or roll it back before setting PRAGMAs.')
+    timings = []
+    def run(statement):
+        start = perf_counter()
+        database.execute(statement)
+        timings.append(StatementTiming(statement, perf_counter() - start))
+        if observer is not None:
+            observer(Event('execute', statementName(statement), None, timings[-1].seconds, 1))
+    persistent = [(key, value) for key, value in values if key in PERSISTENT_PRAGMAS]
+    changed = [key for key, value in persistent if str(database.execute(f'PRAGMA {key}').fetchone()[0]) != _AUTO_VACUUM.get(value.upper(), value)]
+    for key, value in persistent:
+        run(f'PRAGMA {key} = {value};\n')
+    if changed and database.execute('SELECT count(*) FROM sqlite_master').fetchone()[0]:
+        if database.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal':
+            run('PRAGMA journal_mode = DELETE;\n')
+        run('VACUUM;\n')
+    for key, value in values:
+        if key not in PERSISTENT_PRAGMAS:
+            run(f'PRAGMA {key} = {value};\n')
+    return timings
+
+def applyStatements(statements, database, bootstrap=False, observer=None):
+    """
+    Execute SQLite statements one by one inside a single explicit transaction. If any statement (or the iterable producing them) fails, everything is rolled back. A `BatchInsert` runs its parameterized form with `executemany`.
+
+    Parameters:
+    statements (iterable of str): complete SQLite statements, one per item.
+    database (str, Path or sqlite3.Connection): the database to execute on. A path is opened and closed again afterwards; a connection is left open and must not have a transaction in progress.
+    bootstrap (bool or dict): Default is False. If True, `BOOTSTRAP_PRAGMAS` are set before the transaction begins and restored after it ends. A dict of PRAGMA names to values can be passed instead.
+    observer (function): Default is None. If given, it is called with an `Event` of kind "execute" after every statement.
+
+    Returns:
+    list of StatementTiming: one `(sql, seconds)` pair per executed statement.
+    """
+    if isinstance(database, sqlite3.Connection):
+        return _applyStatements(database, statements, bootstrap, observer)
+    con = sqlite3.connect(str(database))
+    try:
+        return _applyStatements(con, statements, bootstrap, observer)
+    finally:
+        con.close()
+
+def _applyStatements(con, statements, bootstrap, observer=None):
+    with pragmas(con, bootstrap), transaction(con):
+        timings = []
+        for statement in statements:
+            start = perf_counter()
+            if isinstance(statement, BatchInsert):
+                con.executemany(statement.sql, statement.rows)
+            else:
+                con.execute(statement)
+            timings.append(StatementTiming(statement, perf_counter() - start))
+            if observer is not None:
+                observer(Event('execute', statementName(statement), None, timings[-1].seconds, 1))
+        return timings
+
+def statementName(statement):
+    """
+    Shorten a statement to what it does and what it does it to, e.g. `CREATE TABLE IF NOT EXISTS contact`, for reporting.
+
+    Parameters:
+    statement (str): a SQLite statement.
+
+    Returns:
+    str: the statement up to its first parenthesis or `VALUES`, on one line.
+    """
+    head = statement.split('(', 1)[0].split(' VALUES', 1)[0]
+    return ' '.join(head.split())
+
+@contextmanager
+def transaction(con):
+    """
+    Context manager running its body in one explicit `BEGIN`/`COMMIT` transaction on `con`, rolling back if the body raises.
+
+    Parameters:
+    con (sqlite3.Connection): a connection with no transaction in progress.
+    """
+    if con.in_transaction:
+        raise ValueError('The connection has a transaction in progress. Commit or roll it back before applying statements.')
+    isolationLevel = con.isolation_level
+    con.isolation_level = None
+    try:
+        con.execute('BEGIN')
+        try:
+            yield con
+            con.execute('COMMIT')
+        except BaseException:
+            if con.in_transaction:
+                con.execute('ROLLBACK')
+            raise
+    finally:
+        con.isolation_level = isolationLevel
+
+@contextmanager
+def pragmas(con, bootstrap):
+    """
+    Context manager setting PRAGMAs on `con` for the duration of its body and restoring their previous values afterwards. Must be entered outside of any transaction, since PRAGMAs like `journal_mode` and `foreign_keys` can't be changed inside one.
+
+    Parameters:
+    con (sqlite3.Connection): the connection to set the PRAGMAs on.
+    bootstrap (bool or dict): True for `BOOTSTRAP_PRAGMAS`, False or None for none, or a dict of PRAGMA names to values.
+    """
+    if bootstrap is True:
+        values = BOOTSTRAP_PRAGMAS
+    else:
+        values = dict(bootstrap) if bootstrap else {}
+    for key, value in values.items():
+        checkPragma(key, value)
+    previous = {key: con.execute(f'PRAGMA {key}').fetchone()[0] for key in values}
+    try:
+        for key, value in values.items():
+            con.execute(f'PRAGMA {key} = {value}')
+        yield con
+    finally:
+        for key, value in previous.items():
+            con.execute(f'PRAGMA {key} = {value}')
@@ -0,0 +1,273 @@
+import os
+import json
+import hashlib
+from functools import lru_cache
+from collections import OrderedDict
+from pathlib import Path
+from .core import BatchInsert
+
+class DDLCache:
+    """
+    A persistent, content-addressed store of generated SQLite DDL.
+
+    Entries are keyed by a hash of the `.dbml` file contents together with every generation option and the versions of this package and PyDBML, so an entry can never be served for a different input. Each entry is a small JSON file holding the list of generated statements, along with the `sqlite_` settings of the `Project` block of the file, so a hit needs no parse for the PRAGMA preamble either. When the total size of the cache grows beyond `maxBytes`, the least recently used entries are deleted. The total is measured once and then kept up to date by every store, so the directory is only scanned again when it goes over the budget.
+
+    Parameters:
+    directory (str or Path): directory to keep cache entries in. Created on first write if it doesn't exist.
+    maxBytes (int): Default is 64 MiB. Upper bound on the total size of all entries on disk.
+    """
+    def __init__(self, directory, maxBytes=64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        # Total size of the entries on disk, None until first measured. Entries stored by other processes are only
+        # counted at the next scan, which is fine for a budget.
+        self._size = None
+
+    def key(self, target, **options):
+        """
+        Compute the cache key for a `.dbml` file and the options it is converted with.
+
+        Parameters:
+        target (Path): the `.dbml` file.
+        options: every generation option that affects the output, e.g. `emulationMode`, `tableExists` and `indexExists`.
+
+        Returns:
+        str: hex digest identifying the generated DDL.
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps({'versions': _versions(), 'options': options}, sort_keys=True).encode('utf8'))
+        h.update(b'\0')
+        h.update(Path(target).read_bytes())
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Look up the statements stored under `key`.
+
+        Parameters:
+        key (str): a key computed by `DDLCache.key`.
+
+        Returns:
+        list of str or None: the cached statements, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf8') as f:
+                statements = json.load(f, object_hook=_decode)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return statements
+
+    def put(self, key, statements):
+        """
+        Store `statements` under `key`, then evict old entries if the cache is over its size budget. Only the first store, and stores taking the cache over `maxBytes`, scan the directory.
+
+        Parameters:
+        key (str): a key computed by `DDLCache.key`.
+        statements (list of str): the generated SQLite statements.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf8') as f:
+            json.dump(_encode(statements), f)
+        size = tmp.stat().st_size
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)
+        self.stores += 1
+        if self._size is None:
+            self.evict()
+            return
+        self._size += size - replaced
+        if self._size > self.maxBytes:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in `maxBytes`.
+
+        Returns:
+        int: the number of entries deleted.
+        """
+        entries = []
+        total = 0
+        for path in self._entries():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._size = total
+        self.evictions += removed
+        return removed
+
+    def clear(self):
+        """
+        Delete every entry in the cache.
+        """
+        for path in self._entries():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self._size = None
+
+    def stats(self):
+        """
+        Report cache usage.
+
+        Returns:
+        dict: `hits`, `misses`, `stores` and `evictions` counted by this object, plus the current number of `entries` and their total `bytes` on disk.
+        """
+        sizes = []
+        for path in self._entries():
+            try:
+                sizes.append(path.stat().st_size)
+            except OSError:
+                pass
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'entries': len(sizes),
+            'bytes': sum(sizes),
+        }
+
+    def _path(self, key):
+        return self.directory / key[:2] / f'{key}.json'
+
+    def _entries(self):
+        if not self.directory.is_dir():
+            return []
+        return list(self.directory.glob('*/*.json'))
+
+class MemoryCache(DDLCache):
+    """
+    A `DDLCache` kept in memory instead of on disk, for a process converting the same files again and again, like `dbml_sqlite --watch` and `dbml_sqlite serve`. Keys cover the same inputs, so only files whose contents or options changed are converted again, and a file is only read and hashed again once its modification time or size changed.
+
+    Parameters:
+    maxEntries (int): Default is 256. Upper bound on the number of entries kept. The least recently used entries are dropped first.
+    """
+    def __init__(self, maxEntries=256):
+        self.maxEntries = maxEntries
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._store = OrderedDict()
+        self._digests = {}
+
+    def key(self, target, **options):
+        st = os.stat(target)
+        signature = (st.st_mtime_ns, st.st_size)
+        known = self._digests.get(str(target))
+        if known is None or known[0] != signature:
+            known = self._digests[str(target)] = (signature, hashlib.sha256(Path(target).read_bytes()).hexdigest())
+        h = hashlib.sha256()
+        h.update(json.dumps({'versions': _versions(), 'options': options, 'content': known[1]}, sort_keys=True).encode('utf8'))
+        return h.hexdigest()
+
+    def get(self, key):
+        statements = self._store.get(key)
+        if statements is None:
+            self.misses += 1
+            return None
+        self._store.move_to_end(key)
+        self.hits += 1
+        return statements
+
+    def put(self, key, statements):
+        self._store[key] = list(statements)
+        self._store.move_to_end(key)
+        self.stores += 1
+        self.evict()
+
+    def evict(self):
+        removed = 0
+        while len(self._store) > self.maxEntries:
+            self._store.popitem(last=False)
+            removed += 1
+        self.evictions += removed
+        return removed
+
+    def clear(self):
+        self._store.clear()
+        self._digests.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'entries': len(self._store),
+            'bytes': sum(len(_text(item).encode('utf8')) for statements in self._store.values() for item in statements),
+        }
+
+@lru_cache(maxsize=None)
+def _versions():
+    from . import __version__
+    return {'dbml_sqlite': __version__, 'pydbml': _distributionVersion('pydbml')}
+
+def _distributionVersion(name):
+    # importlib.metadata is new in Python 3.8; on 3.7 it comes from the importlib_metadata backport or setuptools.
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        try:
+            from importlib_metadata import version, PackageNotFoundError
+        except ImportError:
+            import pkg_resources
+            try:
+                return pkg_resources.get_distribution(name).version
+            except pkg_resources.DistributionNotFound:
+                return 'unknown'
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return 'unknown'
+
+def _text(item):
+    # Entries hold (phase, statement) pairs after the ('project', [key, value]) settings of the file, or plain
+    # statements when stored directly. Only statements count towards the size.
+    if isinstance(item, str):
+        return item
+    return '' if item[0] == 'project' else item[-1]
+
+def _encode(value):
+    # JSON would store a BatchInsert as its text alone, so it is stored with its parameters as an object.
+    if isinstance(value, BatchInsert):
+        return {'text': str(value), 'sql': value.sql, 'rows': value.rows}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    return value
+
+def _decode(obj):
+    return BatchInsert(obj['text'], obj['sql'], [tuple(row) for row in obj['rows']])
@@ -0,0 +1,245 @@
+import re
+import json
+import hashlib
+from contextlib import contextmanager
+from collections import namedtuple
+
+SQLITE_TYPES = ('NULL', 'INTEGER', 'REAL', 'TEXT', 'BLOB')
+
+# Mapping keys starting with this prefix are regular expressions instead of type names, see `TypeRegistry.update`.
+PATTERN_PREFIX = 're:'
+
+TypeMatch = namedtuple('TypeMatch', ['colType', 'sqliteType', 'rule'])
+
+DEFAULT_TYPES = {
+    'NULL': 'NULL', 'NONE': 'NULL', 'NIL': 'NULL',
+    'INTEGER': 'INTEGER', 'BOOL': 'INTEGER', 'BOOLEAN': 'INTEGER', 'INT': 'INTEGER', 'TINYINT': 'INTEGER', 'SMALLINT': 'INTEGER', 'MEDIUMINT': 'INTEGER', 'LONGINT': 'INTEGER', 'BIGINT': 'INTEGER', 'YEAR': 'INTEGER',
+    'INT2': 'INTEGER', 'INT4': 'INTEGER', 'INT8': 'INTEGER', 'SERIAL': 'INTEGER', 'SMALLSERIAL': 'INTEGER', 'BIGSERIAL': 'INTEGER', 'UNSIGNED BIG INT': 'INTEGER',
+    'REAL': 'REAL', 'FLOAT': 'REAL', 'DOUBLE': 'REAL', 'DECIMAL': 'REAL', 'NUMERIC': 'REAL', 'DOUBLE PRECISION': 'REAL', 'FLOAT4': 'REAL', 'FLOAT8': 'REAL', 'MONEY': 'REAL',
+    'TEXT': 'TEXT', 'STR': 'TEXT', 'DATE': 'TEXT', 'DATETIME': 'TEXT', 'TIMESTAMP': 'TEXT', 'TIME': 'TEXT', 'VARCHAR': 'TEXT', 'TINYTEXT': 'TEXT', 'SMALLTEXT': 'TEXT', 'MEDIUMTEXT': 'TEXT', 'LONGTEXT': 'TEXT',
+    'CHAR': 'TEXT', 'CHARACTER': 'TEXT', 'NCHAR': 'TEXT', 'NVARCHAR': 'TEXT', 'CLOB': 'TEXT', 'CITEXT': 'TEXT', 'JSON': 'TEXT', 'JSONB': 'TEXT', 'XML': 'TEXT', 'INTERVAL': 'TEXT', 'TIMESTAMPTZ': 'TEXT', 'TIMETZ': 'TEXT',
+    'BLOB': 'BLOB', 'TINYBLOB': 'BLOB', 'SMALLBLOB': 'BLOB', 'MEDIUMBLOB': 'BLOB', 'LONGBLOB': 'BLOB', 'BYTE': 'BLOB', 'BYTES': 'BLOB', 'UUID': 'BLOB', 'BYTEA': 'BLOB', 'BINARY': 'BLOB', 'VARBINARY': 'BLOB',
+}
+
+# Tried in order against the normalized type, see `normalizeColType`, after the names above.
+DEFAULT_PATTERNS = (
+    (r'(?:TINY|SMALL|MEDIUM|BIG)?INT(?:EGER)?\(\d+\)(?: UNSIGNED)?', 'INTEGER'),
+    (r'(?:DECIMAL|NUMERIC)\(\d+(?:,\d+)?\)|FLOAT\(\d+\)', 'REAL'),
+    (r'(?:VAR|N|NVAR)?CHAR\(\d+\)|CHARACTER(?: VARYING)?\(\d+\)', 'TEXT'),
+    (r'(?:DATETIME|TIMESTAMP|TIME)\(\d+\)|(?:TIMESTAMP|TIME)(?:\(\d+\))? WITH(?:OUT)? TIME ZONE', 'TEXT'),
+    (r'(?:VAR)?BINARY\(\d+\)', 'BLOB'),
+    # Arrays of any type are stored as text, e.g. JSON.
+    (r'[A-Z_][A-Z0-9_ ]*(?:\(\d+(?:,\d+)?\))?(?:\[\d*\])+', 'TEXT'),
+)
+
+_SPACE = re.compile(r'\s+')
+_OPENING_SPACE = re.compile(r' ?([(\[,]) ?')
+_CLOSING_SPACE = re.compile(r' ([)\]])')
+
+class TypeRegistry:
+    """
+    The rules turning DBML column types into SQLite types. Type names are looked up in a single dict, and parameterized types like `varchar(255)` or `decimal(10,2)` are matched against precompiled patterns in order. The result for every distinct type string is remembered, so a schema with many columns of the same few types resolves each of them with one dict lookup.
+
+    Parameters:
+    types (dict): Default is None, for `DEFAULT_TYPES`. Type names mapped to SQLite types.
+    patterns (iterable of (str, str)): Default is None, for `DEFAULT_PATTERNS`. Regular expressions for whole normalized types, see `normalizeColType`, and the SQLite type they map to.
+    """
+    def __init__(self, types=None, patterns=None):
+        self.reset(types, patterns)
+
+    def reset(self, types=None, patterns=None):
+        """
+        Replace every rule, as if the registry was made again.
+
+        Parameters:
+        types (dict): Default is None, for `DEFAULT_TYPES`. As for the constructor.
+        patterns (iterable of (str, str)): Default is None, for `DEFAULT_PATTERNS`. As for the constructor, e.g. the patterns `state()` returns.
+        """
+        self._types = {}
+        self._patterns = []
+        self._memo = {}
+        self._fingerprint = None
+        for name, sqliteType in (DEFAULT_TYPES if types is None else types).items():
+            self.add(name, sqliteType)
+        for pattern, sqliteType in reversed(DEFAULT_PATTERNS if patterns is None else tuple(patterns)):
+            self.addPattern(pattern, sqliteType)
+
+    def add(self, name, sqliteType):
+        """
+        Map a type name to a SQLite type, replacing any earlier rule for the same name.
+
+        Parameters:
+        name (str): the DBML type, matched regardless of case and spacing.
+        sqliteType (str): one of `SQLITE_TYPES`.
+        """
+        self._types[normalizeColType(name)] = _checkSQLiteType(sqliteType, name)
+        self._changed()
+
+    def addPattern(self, pattern, sqliteType):
+        """
+        Map every type matching a regular expression to a SQLite type. Patterns added later are tried first, so they can override the built-in ones.
+
+        Parameters:
+        pattern (str): a regular expression the whole normalized type must match, ignoring case. See `normalizeColType`.
+        sqliteType (str): one of `SQLITE_TYPES`.
+
+        Raises:
+        ValueError: if the pattern is not a valid regular expression.
+        """
+        try:
+            compiled = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f'Invalid type pattern "{pattern}": {e}.') from e
+        self._patterns.insert(0, (compiled, _checkSQLiteType(sqliteType, pattern)))
+        self._changed()
+
+    def update(self, mapping):
+        """
+        Add several rules at once.
+
+        Parameters:
+        mapping (dict): DBML types mapped to SQLite types. Keys starting with `PATTERN_PREFIX` ("re:") are patterns, added with `addPattern` in the order given, the others names added with `add`.
+        """
+        for key, sqliteType in mapping.items():
+            if key.startswith(PATTERN_PREFIX):
+                self.addPattern(key[len(PATTERN_PREFIX):], sqliteType)
+            else:
+                self.add(key, sqliteType)
+
+    def load(self, path):
+        """
+        Add the rules of a mapping file, see `readColTypes`.
+
+        Parameters:
+        path (str or Path): the file.
+        """
+        self.update(readColTypes(path))
+
+    def resolve(self, colType):
+        """
+        Find the SQLite type of a DBML column type, and the rule that gave it.
+
+        Parameters:
+        colType (str): column type from DBML specification.
+
+        Returns:
+        TypeMatch: `(colType, sqliteType, rule)`, where `rule` is the type name or the pattern that matched.
+
+        Raises:
+        ValueError: if no rule matches.
+        """
+        match = self._memo.get(colType)
+        if match is not None:
+            return match
+        normalized = normalizeColType(colType)
+        sqliteType = self._types.get(normalized)
+        if sqliteType is not None:
+            match = TypeMatch(colType, sqliteType, normalized)
+        else:
+            for compiled, sqliteType in self._patterns:
+                if compiled.fullmatch(normalized):
+                    match = TypeMatch(colType, sqliteType, f'{PATTERN_PREFIX}{compiled.pattern}')
+                    break
+            else:
+                raise ValueError(f'Could not figure out how to coerce "{colType.upper()}" to valid SQLite type.')
+        self._memo[colType] = match
+        return match
+
+    def coerce(self, colType):
+        """
+        Like `resolve`, but only return the SQLite type.
+
+        Parameters:
+        colType (str): column type from DBML specification.
+
+        Returns:
+        str: one of `SQLITE_TYPES`.
+        """
+        return self.resolve(colType).sqliteType
+
+    def state(self):
+        """
+        Return every rule, e.g. to set up a registry in another process with `reset`.
+
+        Returns:
+        (dict, list of (str, str)): the type names and the patterns, in the order they are tried, mapped to SQLite types.
+        """
+        return dict(self._types), [(compiled.pattern, sqliteType) for compiled, sqliteType in self._patterns]
+
+    def fingerprint(self):
+        """
+        Hash the rules, so cached DDL made with different rules is never mixed up.
+
+        Returns:
+        str: hex digest of `state()`.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.sha256(json.dumps(self.state(), sort_keys=True).encode('utf8')).hexdigest()
+        return self._fingerprint
+
+    @contextmanager
+    def extended(self, mapping=None):
+        """
+        Context manager adding rules for the duration of its body, and restoring the rules from before afterwards.
+
+        Parameters:
+        mapping (dict): Default is None. Rules to add, as for `update`.
+        """
+        types, patterns = dict(self._types), list(self._patterns)
+        try:
+            if mapping:
+                self.update(mapping)
+            yield self
+        finally:
+            if (types, patterns) != (self._types, self._patterns):
+                self._types, self._patterns = types, patterns
+                self._changed()
+
+    def _changed(self):
+        self._memo = {}
+        self._fingerprint = None
+
+def normalizeColType(colType):
+    """
+    Bring a column type into the form rules are matched against: upper case, without surrounding quotes, single spaces between words and no spaces around parentheses, brackets and commas. `decimal( 10, 2 )` becomes `DECIMAL(10,2)` and `"text []"` becomes `TEXT[]`.
+
+    Parameters:
+    colType (str): column type from DBML specification.
+
+    Returns:
+    str: the normalized type.
+    """
+    colType = _SPACE.sub(' ', colType.strip().strip('"').strip()).upper()
+    return _CLOSING_SPACE.sub(r'\1', _OPENING_SPACE.sub(r'\1', colType))
+
+def readColTypes(path):
+    """
+    Read a mapping file: a JSON object mapping DBML column types to SQLite types, in the form `TypeRegistry.update` takes, e.g. `{"money": "REAL", "re:GEOMETRY\\\\(\\\\w+\\\\)": "BLOB"}`.
+
+    Parameters:
+    path (str or Path): the file.
+
+    Returns:
+    dict: the mapping.
+
+    Raises:
+    ValueError: if the file is not a JSON object of strings, or a rule is invalid.
+    """
+    with open(path, encoding='utf8') as f:
+        try:
+            mapping = json.load(f)
+        except ValueError as e:
+            raise ValueError(f'"{path}" is not valid JSON: {e}.') from e
+    if not isinstance(mapping, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in mapping.items()):
+        raise ValueError(f'"{path}" must hold a JSON object mapping column types to SQLite types.')
+    TypeRegistry({}, ()).update(mapping)
+    return mapping
+
+def _checkSQLiteType(sqliteType, rule):
+    sqliteType = str(sqliteType).upper()
+    if sqliteType not in SQLITE_TYPES:
+        raise ValueError(f'"{rule}" maps to "{sqliteType}", which is not one of: {", ".join(SQLITE_TYPES)}.')
+    return sqliteType
+
+# The rules `coerceColType` and everything converting DBML use.
+TYPE_REGISTRY = TypeRegistry()
@@ -1,47 +1,250 @@
 import re
 import os
-import uuid
-from pydbml import PyDBML 
-from pydbml.classes import Enum
+import hashlib
+from functools import partial
+from collections import namedtuple
+from time import perf_counter
 from pathlib import Path
 from itertools import chain
+from . import native
+from .profiles import PROFILES, PROJECT_PREFIX, resolvePragmas, pragmaStatements
+from .coltypes import TYPE_REGISTRY, TypeMatch
 
-def toSQLite(dbml=".", emulation="full", tableExists=True, indexExists=True, join=True):
+PHASES = ('pragmas', 'schema', 'indexes')
+
+PARSERS = ('pydbml', 'native')
+
+EMULATIONS = ('full', 'half', 'integer')
+
+# Appended to the name of a table for the name of its label view, see `processLabelView`.
+LABEL_VIEW_SUFFIX = '_labeled'
+
+# Table options that can be set with a `sqlite:` line in the note of a table, in the order they are emitted.
+TABLE_OPTIONS = ('without rowid', 'strict')
+
+# The oldest SQLite version supporting each optional feature of the generated DDL.
+SQLITE_FEATURES = {
+    'partial index': (3, 8, 0),
+    'without rowid': (3, 8, 2),
+    'expression index': (3, 9, 0),
+    'strict': (3, 37, 0),
+    'upsert': (3, 24, 0),
+}
+
+# Enum rows are inserted with multi-row INSERTs of at most this many rows, the limit of SQLite's compound SELECTs that
+# multi-row VALUES were built on before 3.8.8, and at most this many bytes, SQLite's default maximum statement length.
+ENUM_BATCH_ROWS = 500
+MAX_SQL_LENGTH = 1000000
+
+_PROJECT_SETTING = re.compile(r'^\s*project\b[^{]*\{[^}]*^\s*sqlite_\w+\s*:', re.IGNORECASE | re.MULTILINE)
+
+_DIRECTIVE = re.compile(r'^\s*sqlite\s*:(.*)$', re.IGNORECASE | re.MULTILINE)
+_INDEX_DIRECTIVE = re.compile(r'^(?:on\s+(?P<on>.+?))?\s*(?:\bwhere\s+(?P<where>.+))?$', re.IGNORECASE | re.DOTALL)
+
+Event = namedtuple('Event', ['kind', 'name', 'file', 'seconds', 'count'])
+
+ForeignKeyIndex = namedtuple('ForeignKeyIndex', ['table', 'index', 'columns', 'refs'])
+
+class BatchInsert(str):
+    """
+    A multi-row `INSERT` statement that also carries its parameterized form, so it can be executed with `executemany` instead of having SQLite parse every literal. It is a str of the literal statement everywhere else.
+
+    Attributes:
+    sql (str): the statement for a single row, with `?` placeholders.
+    rows (list of tuple): the parameters of every row.
+    """
+    def __new__(cls, text, sql, rows):
+        statement = super().__new__(cls, text)
+        statement.sql = sql
+        statement.rows = rows
+        return statement
+
+    def __reduce__(self):
+        return (BatchInsert, (str(self), self.sql, self.rows))
+
+def toSQLite(dbml=".", emulation="full", tableExists=True, indexExists=True, join=True, workers=1, cache=None, phase=None, observer=None, parser="pydbml", fkIndexes=False, sqliteVersion=None, profile=None, pragmas=None, labelViews=False):
     """
     Given a DBML file, convert contents to valid SQLite.
 
     Parameters:
     dbml (str): a valid string for converting to a Path object. Should point to a `.dbml` file containing valid DBML *or* a directory containing such files. Default is a period, in which case current working directory will be searched and all such files will be parsed.
-    emulation (str): specifies emulation mode for enum functionality since it is not directly supported by SQLite. Default is "full", and the other option is "half". 
+    emulation (str): specifies emulation mode for enum functionality since it is not directly supported by SQLite. Default is "full", and the other options are "half" and "integer". 
     tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
     indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
-    join (bool): Default is True. If True, function will `join` the result list of string segments with an empty string and return the resulting string to you. Otherwise, the one-dimensional list of string segments will be returned to you directly.
+    join (bool): Default is True. If True, function will `join` the list of generated statements with an empty string and return the resulting string to you. Otherwise, the list of statements will be returned to you directly.
+    workers (int): Default is 1. Number of processes used to parse and convert the files when `dbml` is a directory. Pass None to use one process per CPU. Output order does not depend on this setting.
+    cache (DDLCache): Default is None. If given, generated DDL is looked up in and stored to this cache, and unchanged files are not parsed again.
+    phase (str): Default is None, which generates everything: the PRAGMA preamble, if any, then the enums and tables of all files, then all indexes. Pass "pragmas" for only the preamble, "schema" for only the enums and tables, or "indexes" for only the indexes.
+    observer (function): Default is None. If given, it is called with an `Event` for every file parsed, cache hit, and enum, table and index emitted, carrying how long that step took. See `Stats` for a ready-made observer.
+    parser (str): Default is "pydbml". Pass "native" to parse with the built-in parser for the DBML subset this package converts, which is many times faster and falls back to PyDBML for any other syntax. Output is the same either way.
+    fkIndexes (bool): Default is False. If True, an index is also created for every foreign key column that no index in the DBML already covers, since SQLite does not index them by itself. See `foreignKeyIndexes`.
+    sqliteVersion (str or tuple): Default is None. The oldest SQLite version the DDL must run on, e.g. "3.31.1". Tables and indexes using options that version lacks (see `SQLITE_FEATURES`) raise a ValueError instead of producing DDL it would reject. None checks nothing.
+    profile (str): Default is None. Name of a PRAGMA profile in `PROFILES` ("read-heavy", "write-heavy" or "embedded-small") to start the output with. A DBML `Project` block can choose one with `sqlite_profile` too, and override single PRAGMAs with `sqlite_<name>` keys. See `pragmaPreamble`.
+    pragmas (dict): Default is None. PRAGMA names mapped to values, overriding those of the profile and the `Project` block.
+    labelViews (bool): Default is False. If True, every table with enum columns also gets a view showing their labels instead of their ids, see `processLabelView`. Needs the "integer" emulation mode.
 
     Returns: 
     str or list of str: a valid sequence of SQLite syntax.
     """
-    results = []
+    results = list(iterSQLite(dbml, emulation, tableExists=tableExists, indexExists=indexExists, workers=workers, cache=cache, phase=phase, observer=observer, parser=parser, fkIndexes=fkIndexes, sqliteVersion=sqliteVersion, profile=profile, pragmas=pragmas, labelViews=labelViews))
+    if join:
+        results = "".join(results)
+    return results
+
+def iterSQLite(dbml=".", emulation="full", tableExists=True, indexExists=True, workers=1, cache=None, phase=None, observer=None, parser="pydbml", fkIndexes=False, sqliteVersion=None, profile=None, pragmas=None, labelViews=False):
+    """
+    Like `toSQLite`, but lazily yields one complete SQLite statement at a time instead of building the whole output in memory. The path is checked immediately; parse errors surface while iterating.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files. Default is a period, the current working directory.
+    emulation (str): Default is "full". Emulation mode for enums, "full", "half" or "integer".
+    tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
+    indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
+    workers (int): Default is 1. Number of processes used to convert the files when `dbml` is a directory. Pass None to use one process per CPU.
+    cache (DDLCache): Default is None. If given, generated DDL is looked up in and stored to this cache.
+    phase (str): Default is None for all statements. Pass "pragmas", "schema" or "indexes" to only get statements of that phase.
+    observer (function): Default is None. Called with an `Event` per step, as for `toSQLite`.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    sqliteVersion (str or tuple): Default is None. The oldest SQLite version the DDL must run on, as for `toSQLite`.
+    profile (str): Default is None. Name of a PRAGMA profile to start the output with, as for `toSQLite`.
+    pragmas (dict): Default is None. PRAGMAs overriding the profile, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+
+    Returns:
+    iterator of str: SQLite statements, each terminated by a newline.
+    """
+    _checkPhase(phase)
+    tagged = iterPhased(dbml, emulation, tableExists=tableExists, indexExists=indexExists, workers=workers, cache=cache, observer=observer, parser=parser, fkIndexes=fkIndexes, sqliteVersion=sqliteVersion, profile=profile, pragmas=pragmas, labelViews=labelViews)
+    return (statement for p, statement in tagged if phase is None or p == phase)
+
+def iterPhased(dbml=".", emulation="full", tableExists=True, indexExists=True, workers=1, cache=None, observer=None, parser="pydbml", fkIndexes=False, sqliteVersion=None, profile=None, pragmas=None, labelViews=False):
+    """
+    Lazily yield every statement for `dbml` together with the phase it belongs to. The "pragmas" preamble comes first, then all "schema" statements (enum tables and their rows, tables), then all "indexes" statements, so data can be loaded between the last two phases without paying for index maintenance on every row. PRAGMAs must be set outside of a transaction, see `applyPreamble`.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files. Default is a period, the current working directory.
+    emulation (str): Default is "full". Emulation mode for enums, "full", "half" or "integer".
+    tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
+    indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
+    workers (int): Default is 1. Number of processes used to convert the files when `dbml` is a directory. Pass None to use one process per CPU.
+    cache (DDLCache): Default is None. If given, generated DDL is looked up in and stored to this cache.
+    observer (function): Default is None. Called with an `Event` per step, as for `toSQLite`.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    sqliteVersion (str or tuple): Default is None. The oldest SQLite version the DDL must run on, as for `toSQLite`.
+    profile (str): Default is None. Name of a PRAGMA profile to start the output with, as for `toSQLite`.
+    pragmas (dict): Default is None. PRAGMAs overriding the profile, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+
+    Returns:
+    iterator of (str, str): `(phase, statement)` pairs.
+    """
+    _checkParser(parser)
+    _checkEmulation(emulation, labelViews)
+    sqliteVersion = _versionTuple(sqliteVersion)
+    targets = dbmlTargets(dbml)
+    # Cache hits carry the Project settings of their file, so the preamble doesn't parse those files again.
+    cached = _lookup(targets, cache, observer, emulation, tableExists, indexExists, parser, fkIndexes, sqliteVersion, labelViews) if cache is not None else None
+    preamble = [('pragmas', statement) for statement in _preamble(targets, profile, pragmas, parser, cached)]
+    if Path(dbml).is_file():
+        return chain(preamble, _taggedFile(targets[0], emulation, tableExists, indexExists, None, cache, observer, parser, fkIndexes, sqliteVersion, labelViews, cached[0] if cached is not None else None))
+    return chain(preamble, _phaseOrder(chain.from_iterable(_convertTargets(targets, emulation, tableExists, indexExists, workers, cache, observer, parser, fkIndexes, sqliteVersion, labelViews, cached))))
+
+def _phaseOrder(tagged):
+    # Streams schema statements, holding back later phases until the end.
+    later = []
+    for phase, statement in tagged:
+        if phase == 'schema':
+            yield phase, statement
+        else:
+            later.append((phase, statement))
+    yield from later
+
+def _checkPhase(phase):
+    if phase is not None and phase not in PHASES:
+        raise ValueError(f'Unknown phase "{phase}". Expected one of: {", ".join(PHASES)}.')
+
+def _checkEmulation(emulation, labelViews=False):
+    if emulation not in EMULATIONS:
+        raise ValueError(f'Unknown emulation mode "{emulation}". Expected one of: {", ".join(EMULATIONS)}.')
+    if labelViews and emulation != 'integer':
+        raise ValueError(f'Label views need the "integer" emulation mode, not "{emulation}".')
+
+def _checkParser(parser):
+    if parser not in PARSERS:
+        raise ValueError(f'Unknown parser "{parser}". Expected one of: {", ".join(PARSERS)}.')
+
+def pragmaPreamble(dbml=".", profile=None, pragmas=None, parser="pydbml"):
+    """
+    Generate the PRAGMA statements that start the output of `toSQLite` for a profile, the settings of the DBML `Project` block and per key overrides.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files. Default is a period, the current working directory. Only files with a `Project` block that has `sqlite_` keys are parsed.
+    profile (str): Default is None. Name of a profile in `PROFILES`. Takes precedence over `sqlite_profile` in the `Project` block.
+    pragmas (dict): Default is None. PRAGMA names mapped to values, overriding the profile and the `Project` block.
+    parser (str): Default is "pydbml". Parser for the files with a `Project` block, as for `toSQLite`.
+
+    Returns:
+    list of str: `PRAGMA name = value;` statements with persistent settings like `page_size` first. Empty if nothing is set.
+
+    Raises:
+    ValueError: for an unknown profile, an invalid PRAGMA, or two files setting different values for the same key.
+    """
+    _checkParser(parser)
+    return _preamble(dbmlTargets(dbml), profile, pragmas, parser)
+
+def _preamble(targets, profile, pragmas, parser, cached=None):
+    project = {}
+    for i, target in enumerate(targets):
+        entry = cached[i][1] if cached is not None else None
+        if entry is not None:
+            settings = _entrySettings(entry)
+        elif _PROJECT_SETTING.search(Path(target).read_text(encoding='utf8')):
+            settings = _projectSettings(parseDBMLFile(target, parser))
+        else:
+            continue
+        for key, value in settings:
+            if key in project and project[key] != value:
+                raise ValueError(f'"{target}" sets {key} to "{value}", but another file sets it to "{project[key]}".')
+            project[key] = value
+    return pragmaStatements(resolvePragmas(profile, pragmas, project))
+
+def parseDBMLFile(target, parser="pydbml"):
+    """
+    Parse a `.dbml` file into the tables and enums the `process*` functions consume.
+
+    Parameters:
+    target (Path): the file to parse.
+    parser (str): Default is "pydbml". Pass "native" to use the built-in parser for the DBML subset this package converts, which is many times faster and falls back to PyDBML for any other syntax.
+
+    Returns:
+    PyDBMLParseResults or ParseResults: the parsed file, with `tables` and `enums`.
+    """
+    _checkParser(parser)
+    if parser == 'native':
+        return native.parseFile(target)
+    from pydbml import PyDBML
+    return PyDBML.parse_file(str(target))
+
+def dbmlTargets(dbml):
+    """
+    Resolve the `dbml` argument of `toSQLite` to the list of files it refers to.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files.
+
+    Returns:
+    list of Path: the file itself, or the `.dbml` files in the directory sorted by name.
+    """
     p = Path(dbml)
-    p.resolve()
     if not p.exists():
         raise ValueError(f'Argument "{dbml}" does not refer to an existing file or directory.')
     if p.is_file():
-        if validDBMLFile(dbml):
-            results.append(processFile(p, emulation, tableExists=tableExists, indexExists=indexExists, join=False))
-            results = list(chain.from_iterable(results))
-            if join:
-                results = "".join(results)
-            return results
-        else:
+        if not validDBMLFile(str(dbml)):
             raise ValueError(f'Argument "{dbml}" is a path to a file, but it does not have a `.dbml` extension.')
-    elif p.is_dir():
-        targets = [f for f in p.glob('*.dbml')]
-        for target in targets:
-            results.append(processFile(target, emulation, tableExists=tableExists, indexExists=indexExists, join=False))
-        results = list(chain.from_iterable(results))
-        if join:
-            results = "".join(results)
-        return results
+        return [p]
+    return sorted(p.glob('*.dbml'))
 
 def validDBMLFile(s):
     """
@@ -58,121 +261,595 @@ def validDBMLFile(s):
     else:
         return False
 
-def processFile(target, emulationMode, tableExists=True, indexExists=True, idxNameFunc=uuid.uuid4, join=True):
+def processFiles(targets, emulationMode, tableExists=True, indexExists=True, workers=1, cache=None, observer=None, parser="pydbml", fkIndexes=False, sqliteVersion=None, labelViews=False):
+    """
+    Convert several `.dbml` files, optionally in parallel, keeping the results in the order of `targets`.
+
+    Parameters:
+    targets (list of Path): Files with contents to convert to SQLite.
+    emulationMode (str): Specifies "half", "full" or "integer" emulation for enum functionality in SQLite.
+    tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
+    indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
+    workers (int): Default is 1. Number of processes to convert files with. Pass None to use one process per CPU. With 1 (or a single target) everything runs in the current process.
+    cache (DDLCache): Default is None. If given, only files missing from the cache are converted, and their results are stored in it.
+    observer (function): Default is None. Called with an `Event` per step, as for `toSQLite`. Events of files converted in worker processes are collected there and replayed in this process.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    sqliteVersion (str or tuple): Default is None. The oldest SQLite version the DDL must run on, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+
+    Returns:
+    list of list of str: one list of statements per target, in the same order as `targets`.
+
+    Raises:
+    ValueError: if any file fails to convert. The message names the offending file.
+    """
+    _checkParser(parser)
+    _checkEmulation(emulationMode, labelViews)
+    sqliteVersion = _versionTuple(sqliteVersion)
+    results = _convertTargets(targets, emulationMode, tableExists, indexExists, workers, cache, observer, parser, fkIndexes, sqliteVersion, labelViews)
+    return [[statement for _, statement in tagged] for tagged in results]
+
+def _installColTypes(state):
+    # Worker processes start with the default rules, whether forked or spawned, so they get those of the parent.
+    TYPE_REGISTRY.reset(*state)
+
+def _convertTargets(targets, emulationMode, tableExists, indexExists, workers, cache, observer=None, parser="pydbml", fkIndexes=False, sqliteVersion=None, labelViews=False, cached=None):
+    # Yields one list of (phase, statement) pairs per target, in order, as soon as each is available. `cached` holds
+    # the (key, entry) pairs of `_lookup` when the caller already looked the targets up.
+    results = [None] * len(targets)
+    keys = [None] * len(targets)
+    if cache is not None:
+        if cached is None:
+            cached = _lookup(targets, cache, observer, emulationMode, tableExists, indexExists, parser, fkIndexes, sqliteVersion, labelViews)
+        for i, (key, entry) in enumerate(cached):
+            keys[i] = key
+            results[i] = _entryStatements(entry) if entry is not None else None
+    missing = [i for i, r in enumerate(results) if r is None]
+    convert = partial(_processTarget, emulationMode=emulationMode, tableExists=tableExists, indexExists=indexExists, observe=observer is not None, parser=parser, fkIndexes=fkIndexes, sqliteVersion=sqliteVersion, labelViews=labelViews)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(missing))
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_installColTypes, initargs=(TYPE_REGISTRY.state(),))
+        converted = pool.map(convert, [targets[i] for i in missing])
+    else:
+        pool = None
+        converted = (convert(targets[i]) for i in missing)
+    try:
+        for i in range(len(targets)):
+            tagged = results[i]
+            results[i] = None
+            if tagged is None:
+                tagged, events, settings = next(converted)
+                for event in events:
+                    observer(event)
+                if cache is not None:
+                    cache.put(keys[i], _entry(settings, tagged))
+            yield tagged
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def _processTarget(target, emulationMode, tableExists, indexExists, observe=False, parser="pydbml", fkIndexes=False, sqliteVersion=None, labelViews=False):
+    # Observers can't cross process boundaries, so events are collected and returned along with the statements.
+    events = []
+    settings = []
+    try:
+        return list(_taggedFile(target, emulationMode, tableExists, indexExists, None, None, events.append if observe else None, parser, fkIndexes, sqliteVersion, labelViews, settings=settings)), events, settings
+    except Exception as e:
+        raise ValueError(f'Could not convert "{target}": {e}') from e
+
+def _lookup(targets, cache, observer, emulationMode, tableExists, indexExists, parser, fkIndexes, sqliteVersion, labelViews):
+    # Returns a (key, entry) pair per target, with None as the entry of a miss.
+    cached = []
+    for target in targets:
+        start = perf_counter()
+        key = _cacheKey(cache, target, emulationMode, tableExists, indexExists, parser, fkIndexes, sqliteVersion, labelViews)
+        entry = cache.get(key)
+        if entry is not None:
+            _notify(observer, 'cache', str(target), str(target), start, len(_entryStatements(entry)))
+        cached.append((key, entry))
+    return cached
+
+def _cacheKey(cache, target, emulationMode, tableExists, indexExists, parser, fkIndexes, sqliteVersion, labelViews):
+    return cache.key(target, format='phased+project', emulationMode=emulationMode, tableExists=tableExists, indexExists=indexExists, parser=parser, fkIndexes=fkIndexes, sqliteVersion=_versionTuple(sqliteVersion), labelViews=labelViews, colTypes=TYPE_REGISTRY.fingerprint())
+
+def processFile(target, emulationMode, tableExists=True, indexExists=True, idxNameFunc=None, join=True, cache=None, phase=None, observer=None, parser="pydbml", fkIndexes=False, sqliteVersion=None, labelViews=False):
     """
     Given a target `.dbml` file, parse and generate a valid SQLite string.
 
     Parameters:
     target (Path): File with contents to convert to SQLite.
-    emulationMode (str): Specifies "half" or "full" emulation for enum functionality in SQLite.
-        tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
+    emulationMode (str): Specifies "half", "full" or "integer" emulation for enum functionality in SQLite.
+    tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
     indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
-    join (bool): Default is True. If True, function will `join` the result list of string segments with an empty string and return the resulting string to you. Otherwise, the one-dimensional list of string segments will be returned to you directly.
+    idxNameFunc (function): Default is None. Passed on to `processIndex` for naming indexes that have no name in the DBML.
+    join (bool): Default is True. If True, function will `join` the list of generated statements with an empty string and return the resulting string to you. Otherwise, the list of statements will be returned to you directly.
+    cache (DDLCache): Default is None. If given, a cache hit for the file contents and options skips parsing entirely, and a miss stores the result. Ignored when `idxNameFunc` is given, since its names can't be derived from the file contents.
+    phase (str): Default is None for all statements. Pass "schema" or "indexes" to only get statements of that phase.
+    observer (function): Default is None. Called with an `Event` per step, as for `toSQLite`.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    sqliteVersion (str or tuple): Default is None. The oldest SQLite version the DDL must run on, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
 
     Returns:
-    str: A valid SQLite string.
+    str or list of str: A valid SQLite string.
     """
-    parsed = PyDBML.parse_file(str(target))
-    statements = []
-    if emulationMode == 'full':
-        for enum in parsed.enums:
-            statements.append(processEnum(enum, tableExists, False))
-    for table in parsed.tables:
-        statements.append(processTable(table, emulationMode, tableExists, False))
-    for table in parsed.tables:
-        for index in table.indexes:
-            statements.append(processIndex(table, index, idxNameFunc, indexExists=indexExists, join=False))
-    statements = list(chain.from_iterable(statements))
+    statements = list(iterFile(target, emulationMode, tableExists=tableExists, indexExists=indexExists, idxNameFunc=idxNameFunc, cache=cache, phase=phase, observer=observer, parser=parser, fkIndexes=fkIndexes, sqliteVersion=sqliteVersion, labelViews=labelViews))
     if join:
         statements = "".join(statements)
     return statements
 
-def processIndex(table, index, idxNameFunc=uuid.uuid4, indexExists=True, join=True):
+def iterFile(target, emulationMode, tableExists=True, indexExists=True, idxNameFunc=None, cache=None, phase=None, observer=None, parser="pydbml", fkIndexes=False, sqliteVersion=None, labelViews=False):
+    """
+    Generator form of `processFile`: parse a `.dbml` file and yield its SQLite statements one at a time.
+
+    Parameters:
+    target (Path): File with contents to convert to SQLite.
+    emulationMode (str): Specifies "half", "full" or "integer" emulation for enum functionality in SQLite.
+    tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
+    indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
+    idxNameFunc (function): Default is None. Passed on to `processIndex` for naming indexes that have no name in the DBML.
+    cache (DDLCache): Default is None. See `processFile`.
+    phase (str): Default is None for all statements. Pass "schema" or "indexes" to only get statements of that phase.
+    observer (function): Default is None. Called with an `Event` per step, as for `toSQLite`.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    sqliteVersion (str or tuple): Default is None. The oldest SQLite version the DDL must run on, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+
+    Yields:
+    str: one complete SQLite statement, terminated by a newline.
+    """
+    _checkPhase(phase)
+    _checkParser(parser)
+    _checkEmulation(emulationMode, labelViews)
+    sqliteVersion = _versionTuple(sqliteVersion)
+    for p, statement in _taggedFile(target, emulationMode, tableExists, indexExists, idxNameFunc, cache, observer, parser, fkIndexes, sqliteVersion, labelViews):
+        if phase is None or p == phase:
+            yield statement
+
+def _taggedFile(target, emulationMode, tableExists, indexExists, idxNameFunc, cache, observer=None, parser="pydbml", fkIndexes=False, sqliteVersion=None, labelViews=False, cached=None, settings=None):
+    # `cached` is the (key, entry) pair of `_lookup` when the caller already looked the file up, and `settings`, if
+    # given, is extended with the Project settings of the file once it is parsed.
+    key = None
+    if cache is not None and idxNameFunc is None:
+        if cached is None:
+            cached = _lookup([target], cache, observer, emulationMode, tableExists, indexExists, parser, fkIndexes, sqliteVersion, labelViews)[0]
+        key, entry = cached
+        if entry is not None:
+            for phase, statement in _entryStatements(entry):
+                yield phase, statement
+            return
+    tagged = [] if key is not None else None
+    # Time spent in the consumer between statements is left out of the "file" event.
+    busy = 0
+    start = perf_counter()
+    parsed = parseDBMLFile(target, parser)
+    _notify(observer, 'parse', str(target), str(target), start, len(parsed.tables))
+    if settings is not None:
+        settings.extend(_projectSettings(parsed))
+    count = 0
+    for item in _fileStatements(parsed, emulationMode, tableExists, indexExists, idxNameFunc, observer, str(target), fkIndexes, sqliteVersion, labelViews):
+        busy += perf_counter() - start
+        count += 1
+        if tagged is not None:
+            tagged.append(item)
+        yield item
+        start = perf_counter()
+    busy += perf_counter() - start
+    if observer is not None:
+        observer(Event('file', str(target), str(target), busy, count))
+    if key is not None:
+        cache.put(key, _entry(_projectSettings(parsed), tagged))
+
+def _projectSettings(parsed):
+    # The `sqlite_` items of the Project block of a parsed file, as [key, value] pairs.
+    items = parsed.project.items if parsed.project is not None else {}
+    return [[key, value] for key, value in items.items() if key.lower().startswith(PROJECT_PREFIX)]
+
+def _entry(settings, tagged):
+    # A cache entry holds the Project settings of the file as ('project', [key, value]) items before its statements.
+    return [('project', setting) for setting in settings] + tagged
+
+def _entrySettings(entry):
+    return [setting for phase, setting in entry if phase == 'project']
+
+def _entryStatements(entry):
+    return [(phase, statement) for phase, statement in entry if phase != 'project']
+
+def _fileStatements(parsed, emulationMode, tableExists, indexExists, idxNameFunc, observer=None, file=None, fkIndexes=False, sqliteVersion=None, labelViews=False):
+    # Yields (phase, statement) pairs for a parsed file; every "schema" statement comes before any "indexes" one.
+    if emulationMode in ('full', 'integer'):
+        for enum in parsed.enums:
+            start = perf_counter()
+            statements = processEnum(enum, tableExists, False, sqliteVersion)
+            _notify(observer, 'enum', enum.name, file, start, len(enum.items))
+            for statement in statements:
+                yield 'schema', statement
+    for table in parsed.tables:
+        start = perf_counter()
+        statement = processTable(table, emulationMode, tableExists, sqliteVersion=sqliteVersion)
+        _notify(observer, 'table', table.name, file, start, len(table.columns))
+        yield 'schema', statement
+        if labelViews and enumColumns(table):
+            start = perf_counter()
+            statement = processLabelView(table, tableExists)
+            _notify(observer, 'view', labelViewName(table), file, start, len(enumColumns(table)))
+            yield 'schema', statement
+    for table in parsed.tables:
+        for index in tableIndexes(table):
+            start = perf_counter()
+            statement = processIndex(table, index, idxNameFunc, indexExists=indexExists, sqliteVersion=sqliteVersion)
+            _notify(observer, 'index', index.name or f'{table.name}({", ".join(col.name for col in index.subjects)})', file, start, len(index.subjects))
+            yield 'indexes', statement
+        if fkIndexes:
+            for fk in foreignKeyIndexes(table):
+                start = perf_counter()
+                statement = processIndex(table, fk.index, indexExists=indexExists)
+                _notify(observer, 'fkindex', f'{table.name}({", ".join(fk.columns)})', file, start, len(fk.refs))
+                yield 'indexes', statement
+
+def _notify(observer, kind, name, file, start, count):
+    if observer is not None:
+        observer(Event(kind, name, file, perf_counter() - start, count))
+
+def processIndex(table, index, idxNameFunc=None, indexExists=True, join=True, sqliteVersion=None):
     """
     Given objects produced by the PyDBML library (or appropriately mocked), generate valid SQLite DDL for creating indexes.
 
     Parameters:
     table (Table): a Table object generated by the PyDBML library. This object should represent the SQLite table relevant to the index you want to create.
     index (Index): an Index object generated by the PyDBML library. This object should represent the SQLite index you want to create.
-    idxNameFunc (function): defaults to `uuid.uuid4`. Can mock that function by passing a different function that returns a more predictable result. The result of calling this argument in either case is used as the name of an index if one is not provided for any `CREATE INDEX` statements.
+    idxNameFunc (function): Default is None. If an index has no name in the DBML, it is named after a hash of its table, columns and uniqueness, so the same DBML always produces the same DDL. Pass a function to use the result of calling it as the name instead.
     indexExists (bool): Default is True. If True, the generated `CREATE INDEX` SQLite statement will have `IF NOT EXISTS` language included.
     join (bool): Default is True. If True, function will `join` the result list of string segments with an empty string and return the resulting string to you. otherwise, the one-dimensional list of string segments will be returned to you directly.
+    sqliteVersion (str or tuple): Default is None. If given, raise a ValueError when the index is partial or indexes expressions and that SQLite version is too old for it.
 
     Returns: 
     str or list of str: SQLite DDL for creating an index.
+
+    The note of the index can turn it into an expression index, a partial index or both with a line like `sqlite: on lower(email) where deleted_at IS NULL`. See `indexOptions`.
     """
+    on, where = indexOptions(index)
+    if getattr(index, 'pk', False) and (on or where):
+        raise ValueError(f'Primary key index on table "{table.name}" can\'t be partial or index expressions.')
+    if on:
+        _requireSQLite('expression index', sqliteVersion, f'Index on table "{table.name}"')
+    if where:
+        _requireSQLite('partial index', sqliteVersion, f'Index on table "{table.name}"')
     parts = []
     parts.append(f'CREATE{" UNIQUE" if index.unique else ""} INDEX ')
     if indexExists:
         parts.append('IF NOT EXISTS ')
     if index.name != "" and index.name != None:
         parts.append(index.name)
+    elif idxNameFunc is None:
+        parts.append(indexName(table, index))
     else:
         parts.append('_' + ''.join(str(idxNameFunc()).split('-')))
     parts.append(f' ON {table.name} (')
-    for i, col in enumerate(index.subjects):
+    if on:
+        parts.append(on)
+    for i, col in enumerate(index.subjects if not on else []):
         parts.append(col.name)
         if i < len(index.subjects) - 1:
             parts.append(', ')
-    parts.append(');\n')
+    parts.append(')')
+    if where:
+        parts.append(f' WHERE {where}')
+    parts.append(';\n')
     if join:
         parts = "".join(parts)
     return parts
 
-def processEnum(enum, tableExists=True, join=True):
+def foreignKeyIndexes(table):
+    """
+    Find the foreign key columns of a table that no index covers. SQLite does not index the child side of a foreign key by itself, so without one every `ON DELETE`/`ON UPDATE` action and integrity check on the parent table scans the whole child table. A column counts as covered when it leads an index declared in the DBML that is neither partial nor an expression index, or is a `pk` or `unique` column, which SQLite indexes itself. Several references from the same column need only one index.
+
+    Parameters:
+    table (Table): Table object generated by PyDBML, with the references it holds in `refs`.
+
+    Returns:
+    list of ForeignKeyIndex: one per uncovered column, in the order of the references. `index` can be passed to `processIndex` and is named by `indexName`, exactly like an unnamed index on the same column declared in the DBML, and `refs` lists the references it serves.
+    """
+    covered = [[col.name for col in index.subjects] for index in table.indexes if indexOptions(index) == (None, None)]
+    covered.extend([col.name] for col in table.columns if col.pk or col.unique)
+    missing = {}
+    for ref in table.refs:
+        columns = (ref.col.name,)
+        if any(set(leading[:len(columns)]) == set(columns) for leading in covered):
+            continue
+        if columns not in missing:
+            missing[columns] = ForeignKeyIndex(table, _fkIndex(table, [ref.col]), columns, [])
+        missing[columns].refs.append(ref)
+    return list(missing.values())
+
+def _fkIndex(table, columns):
+    index = native.Index([col.name for col in columns])
+    index.subjects = list(columns)
+    index.table = table
+    return index
+
+def tableIndexes(table):
+    """
+    The indexes of a table that are created with `CREATE INDEX`. That is all of them, except that the primary key index of a `without rowid` table becomes the `PRIMARY KEY` constraint of the table itself.
+
+    Parameters:
+    table (Table): Table object generated by PyDBML.
+
+    Returns:
+    list of Index: the indexes to pass to `processIndex`.
+    """
+    if 'without rowid' not in tableOptions(table):
+        return list(table.indexes)
+    return [index for index in table.indexes if not index.pk]
+
+def tableOptions(table):
+    """
+    Read the SQLite table options of a table from `sqlite:` lines in its note, e.g. `Note: 'sqlite: strict, without rowid'`.
+
+    Parameters:
+    table (Table): Table object generated by PyDBML.
+
+    Returns:
+    list of str: the options given, in the order of `TABLE_OPTIONS`.
+
+    Raises:
+    ValueError: if a `sqlite:` line names anything else.
     """
-    Take an Enum object generated by the PyDBML library and use it to generate SQLite DDL for creating an enum table for "full" enum emulation mode only.   
+    options = set()
+    for directive in _directives(table):
+        for option in directive.split(','):
+            option = ' '.join(option.split()).lower()
+            if option not in TABLE_OPTIONS:
+                raise ValueError(f'Unknown SQLite option "{option}" in the note of table "{table.name}". Expected any of: {", ".join(TABLE_OPTIONS)}.')
+            options.add(option)
+    return [option for option in TABLE_OPTIONS if option in options]
+
+def indexOptions(index):
+    """
+    Read the expressions and the condition of an index from a `sqlite:` line in its note, e.g. `note: 'sqlite: on lower(email) where deleted_at IS NULL'`. Either part may be left out.
+
+    Parameters:
+    index (Index): Index object generated by PyDBML.
+
+    Returns:
+    (str, str): the expressions to index instead of the columns, and the `WHERE` condition that makes the index partial. Either is None when not given.
+
+    Raises:
+    ValueError: if a `sqlite:` line is not of that form, or there is more than one.
+    """
+    directives = _directives(index)
+    if not directives:
+        return None, None
+    match = _INDEX_DIRECTIVE.match(directives[0])
+    if len(directives) > 1 or not directives[0] or match is None:
+        raise ValueError(f'Invalid SQLite options "{"; ".join(directives)}" in the note of an index. Expected "on EXPRESSIONS", "where CONDITION" or both.')
+    return match.group('on'), match.group('where')
+
+def _directives(obj):
+    note = getattr(obj, 'note', None)
+    text = getattr(note, 'text', note)
+    if not text:
+        return []
+    return [m.group(1).strip() for m in _DIRECTIVE.finditer(str(text))]
+
+def _versionTuple(version):
+    if version is None or isinstance(version, tuple):
+        return version
+    try:
+        return tuple(int(part) for part in str(version).split('.'))
+    except ValueError:
+        raise ValueError(f'Invalid SQLite version "{version}". Expected a version like "3.31.1".')
+
+def _requireSQLite(feature, sqliteVersion, subject):
+    version = _versionTuple(sqliteVersion)
+    required = SQLITE_FEATURES[feature]
+    if version is not None and version < required:
+        raise ValueError(f'{subject} uses {feature.upper()}, which needs SQLite {".".join(map(str, required))} or newer, but the target is SQLite {".".join(map(str, version))}.')
+
+def indexName(table, index):
+    """
+    Derive a stable name for an index that has no name in the DBML.
+
+    Parameters:
+    table (Table): Table object generated by PyDBML that the index belongs to.
+    index (Index): Index object generated by PyDBML.
+
+    Returns:
+    str: an underscore followed by 32 hex digits hashed from the table name, the indexed columns, whether the index is unique and its `indexOptions`, if any.
+    """
+    subject = f'{table.name}({",".join(col.name for col in index.subjects)}){" UNIQUE" if index.unique else ""}'
+    on, where = indexOptions(index)
+    if on:
+        subject += f' ON {on}'
+    if where:
+        subject += f' WHERE {where}'
+    return '_' + hashlib.sha256(subject.encode('utf8')).hexdigest()[:32]
+
+def processEnum(enum, tableExists=True, join=True, sqliteVersion=None):
+    """
+    Take an Enum object generated by the PyDBML library and use it to generate SQLite DDL for creating an enum table for "full" and "integer" enum emulation modes only.   
     
     Parameters:
     enum (Enum): Enum object generated by PyDBML library representing an SQL enum.
     tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
     join (bool): Default is True. If True, function will `join` the result list of string segments with an empty string and return the resulting string to you. Otherwise, the one-dimensional list of string segments will be returned to you directly.
+    sqliteVersion (str or tuple): Default is None. If given and older than 3.24.0, rows that are already there are skipped with `INSERT OR IGNORE` instead of `ON CONFLICT DO NOTHING`.
 
     Returns:
-    str or list of str: SQLite DDL for creating a table to emulate SQL enum functionality.
+    str or list of str: SQLite DDL for creating a table to emulate SQL enum functionality. The rows are inserted by `BatchInsert` statements, see `enumInserts`.
     """
     segments = []
     segments.append(f'CREATE TABLE {"IF NOT EXISTS" if tableExists else ""} {enum.name} (\n  id INTEGER PRIMARY KEY,\n  type TEXT NOT NULL UNIQUE,\n  seq INTEGER NOT NULL UNIQUE\n);\n')
-    for i, v in enumerate(enum.items):
-        segments.append(f'INSERT INTO {enum.name}(type, seq) VALUES (\'{v.name}\', {i + 1});\n')
+    segments.extend(enumInserts(enum.name, [(v.name, i + 1) for i, v in enumerate(enum.items)], sqliteVersion))
     if join:
         segments = "".join(segments)
     return segments
 
-def processTable(table, emulationMode, tableExists=True, join=True):
+def enumInserts(name, rows, sqliteVersion=None):
+    """
+    Generate the statements inserting rows into an enum table, as few as SQLite's limits allow: each inserts up to `ENUM_BATCH_ROWS` rows and is at most `MAX_SQL_LENGTH` bytes long. Rows whose label or `seq` is already in the table are skipped, so the statements can run again.
+
+    Parameters:
+    name (str): name of the enum table.
+    rows (list of (str, int)): the label and `seq` of every row.
+    sqliteVersion (str or tuple): Default is None. If given and older than 3.24.0, which introduced `ON CONFLICT` clauses on `INSERT`, `INSERT OR IGNORE` is used instead.
+
+    Returns:
+    list of BatchInsert: one multi-row `INSERT` statement per batch, each terminated by a newline.
+    """
+    version = _versionTuple(sqliteVersion)
+    if version is not None and version < SQLITE_FEATURES['upsert']:
+        head, conflict = f'INSERT OR IGNORE INTO {name}(type, seq) VALUES', ''
+    else:
+        head, conflict = f'INSERT INTO {name}(type, seq) VALUES', 'ON CONFLICT DO NOTHING'
+    sql = f'{head} (?, ?) {conflict}'.rstrip()
+    tail = '\n' + conflict if conflict else ''
+    statements = []
+    values = []
+    batch = []
+    def flush():
+        statements.append(BatchInsert(head + '\n' + ',\n'.join(values) + tail + ';\n', sql, batch))
+    size = len(head) + len(tail) + 2
+    for label, seq in rows:
+        value = "  ('" + str(label).replace("'", "''") + f"', {seq})"
+        length = len(value.encode('utf8')) + 2
+        if batch and (len(batch) == ENUM_BATCH_ROWS or size + length > MAX_SQL_LENGTH):
+            flush()
+            values, batch = [], []
+            size = len(head) + len(tail) + 2
+        values.append(value)
+        batch.append((str(label), seq))
+        size += length
+    if batch:
+        flush()
+    return statements
+
+def processTable(table, emulationMode, tableExists=True, join=True, sqliteVersion=None):
     """
     Generate SQLite DDL for creating a table.
     
     Parameters:
     table (Table): Table object generated by PyDBML, representing SQLite table you want to make.
-    emulationMode (str): if SQL enums are defined by dbml parsed by PyDBML, there are two ways to emulate them. Passing "full" for this parameter emulates enum by making a separate enum table. Passing "half" simply uses SQLite CHECK statements within column definitions utilizing enum types. 
+    emulationMode (str): if SQL enums are defined by dbml parsed by PyDBML, there are three ways to emulate them. Passing "full" for this parameter emulates enum by making a separate enum table. Passing "half" simply uses SQLite CHECK statements within column definitions utilizing enum types. Passing "integer" also makes a separate enum table, but stores the integer id of the label instead of the label itself. 
     tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
     join (bool): Default is True. If True, function will `join` the result list of string segments with an empty string and return the resulting string to you. Otherwise, the one-dimensional list of string segments will be returned to you directly.
+    sqliteVersion (str or tuple): Default is None. If given, raise a ValueError when the table uses an option that SQLite version is too old for.
 
     Return: 
     str or list of str: SQLite DDL for generating a table.
+
+    The note of the table can make it `STRICT` and/or `WITHOUT ROWID`, see `tableOptions`. A `WITHOUT ROWID` table needs a primary key, which can be a `[pk]` column or a `[pk]` index in the DBML but not both, and can't have an `AUTOINCREMENT` column. A `STRICT` table can't have `NULL` typed columns.
     """
+    options = tableOptions(table)
+    for option in options:
+        _requireSQLite(option, sqliteVersion, f'Table "{table.name}"')
+    primaryKey = None
+    if 'without rowid' in options:
+        primaryKey = next((index for index in table.indexes if index.pk), None)
+        if primaryKey is None and not any(col.pk for col in table.columns):
+            raise ValueError(f'Table "{table.name}" is WITHOUT ROWID, which requires a primary key.')
+        if primaryKey is not None and any(col.pk for col in table.columns):
+            raise ValueError(f'Table "{table.name}" is WITHOUT ROWID and has both a [pk] column and a [pk] index, but can only have one primary key.')
+        if any(col.autoinc for col in table.columns):
+            raise ValueError(f'Table "{table.name}" is WITHOUT ROWID, which does not allow AUTOINCREMENT.')
+    if 'strict' in options:
+        for col in table.columns:
+            if isinstance(col.type, str) and coerceColType(col.type) == 'NULL':
+                raise ValueError(f'Column "{col.name}" of table "{table.name}" has type NULL, which STRICT tables do not allow.')
     segments = []
     segments.append('CREATE TABLE ')
     if tableExists:
         segments.append('IF NOT EXISTS ')
     segments.append(f'{table.name} (\n')
     for i, col in enumerate(table.columns):
-        segments.append(processColumn(col, emulationMode, False))
+        segments.extend(processColumn(col, emulationMode, False))
         if i < len(table.columns) - 1:
             segments.append(',\n')
     for j, ref in enumerate(table.refs):
         if j == 0:
             segments.append(',\n')
-        segments.append(processRef(ref, False))
+        segments.extend(processRef(ref, False))
         if j < len(table.refs) - 1:
             segments.append(',\n')
-    segments.append('\n);\n')
-    segments = list(chain.from_iterable(segments))
+    if primaryKey is not None:
+        segments.append(f',\n  PRIMARY KEY ({", ".join(col.name for col in primaryKey.subjects)})')
+    segments.append('\n)')
+    if options:
+        segments.append(' ' + ', '.join(option.upper() for option in options))
+    segments.append(';\n')
+    if join:
+        segments = "".join(segments)
+    return segments
+
+def processLabelView(table, tableExists=True, join=True):
+    """
+    Generate SQLite DDL for a view of a table in "integer" enum emulation mode that shows the labels of its enum columns instead of the ids stored in them. The view is named by `labelViewName` and has the same columns in the same order.
+
+    Parameters:
+    table (Table): Table object generated by PyDBML, with at least one enum column.
+    tableExists (bool): Default is True. If True, the generated `CREATE VIEW` SQLite statement will have `IF NOT EXISTS` language included.
+    join (bool): Default is True. If True, function will `join` the result list of string segments with an empty string and return the resulting string to you. Otherwise, the one-dimensional list of string segments will be returned to you directly.
+
+    Returns:
+    str or list of str: SQLite DDL for creating the view.
+
+    Raises:
+    ValueError: if the table has no enum columns.
+    """
+    if not enumColumns(table):
+        raise ValueError(f'Table "{table.name}" has no enum columns to show the labels of.')
+    columns = []
+    joins = []
+    for col in table.columns:
+        if isinstance(col.type, str):
+            columns.append(f'  t.{col.name}')
+        else:
+            alias = f'e{len(joins) + 1}'
+            columns.append(f'  {alias}.type AS {col.name}')
+            joins.append(f'  JOIN {col.type.name} AS {alias} ON {alias}.id = t.{col.name}')
+    segments = []
+    segments.append('CREATE VIEW ')
+    if tableExists:
+        segments.append('IF NOT EXISTS ')
+    segments.append(f'{labelViewName(table)} AS\nSELECT\n')
+    segments.append(',\n'.join(columns))
+    segments.append(f'\nFROM {table.name} AS t\n')
+    segments.append('\n'.join(joins))
+    segments.append(';\n')
     if join:
         segments = "".join(segments)
     return segments
 
+def labelViewName(table):
+    """
+    Name the label view of a table, see `processLabelView`.
+
+    Parameters:
+    table (Table): Table object generated by PyDBML.
+
+    Returns:
+    str: the name of the table with `LABEL_VIEW_SUFFIX` appended.
+    """
+    return table.name + LABEL_VIEW_SUFFIX
+
+def enumColumns(table):
+    """
+    Find the columns of a table whose type is an enum.
+
+    Parameters:
+    table (Table): Table object generated by PyDBML.
+
+    Returns:
+    list of Column: the enum columns, in table order.
+    """
+    return [col for col in table.columns if not isinstance(col.type, str) and _isEnum(col.type)]
+
 def processRef(ref, join=True):
     """
     Convert a Ref object parsed by PyDBML from dbml into SQLite DDL. 
@@ -201,7 +878,7 @@ def processColumn(column, emulationMode, join=True):
 
     Parameters:
     column (Column): the Column object generated by PyDBML library.
-    emulationMode (str): "half" or "full" emulation of SQL enums for SQLite. The former uses `CHECK` statements within column definitions, and the latter uses separate tables.
+    emulationMode (str): "half", "full" or "integer" emulation of SQL enums for SQLite. The first uses `CHECK` statements within column definitions, the others separate tables, referenced by label ("full") or by their `INTEGER PRIMARY KEY` ("integer").
     join (bool): Default is True. If True, function will `join` the result list of string segments with an empty string and return the resulting string to you. Otherwise, the one-dimensional list of string segments will be returned to you directly.
 
     Returns:
@@ -228,9 +905,11 @@ def processColumn(column, emulationMode, join=True):
                 segments.append(str(column.default))
             if isinstance(column.default, str):
                 segments.append("'")
-    elif isinstance(column.type, Enum):
+    elif _isEnum(column.type):
         if emulationMode == 'full':
             segments.append(f' TEXT NOT NULL REFERENCES {column.type.name}(type)')
+        elif emulationMode == 'integer':
+            segments.append(f' INTEGER NOT NULL REFERENCES {column.type.name}(id)')
         else:
             segments.append(f' TEXT CHECK( {column.name} IN ( ')
             enums = []
@@ -244,9 +923,16 @@ def processColumn(column, emulationMode, join=True):
         segments = "".join(segments)
     return segments
 
+def _isEnum(colType):
+    # Only reached for non-string types, so pydbml is not imported just to convert plain columns.
+    if isinstance(colType, native.Enum):
+        return True
+    from pydbml.classes import Enum
+    return isinstance(colType, Enum)
+
 def coerceColType(colType):
     """ 
-    Given a colType, coerce to closest native SQLite type and return that, otherwise raise a ValueError.
+    Given a colType, coerce to closest native SQLite type and return that, otherwise raise a ValueError. The rules are those of `TYPE_REGISTRY`, see `TypeRegistry`.
 
     Parameters:
     colType (str): column type from DBML specification.
@@ -254,27 +940,27 @@ def coerceColType(colType):
     Returns:
     str: valid SQLite column type. 
     """
-    colType = colType.upper()
-    nativeTypes = ('NULL', 'INTEGER', 'REAL', 'TEXT', 'BLOB')
-    if colType in nativeTypes:
-        return colType
-    nils = ('NONE', 'NIL')
-    if colType in nils:
-        return 'NULL'
-    integers = ('BOOL', 'BOOLEAN', 'INT', 'TINYINT', 'SMALLINT', 'MEDIUMINT', 'LONGINT', 'BIGINT', 'YEAR')
-    if colType in integers:
-        return 'INTEGER'
-    reals = ('FLOAT', 'DOUBLE', 'DECIMAL', 'NUMERIC')
-    if colType in reals:
-        return 'REAL'
-    texts = ('STR', 'DATE', 'DATETIME', 'TIMESTAMP', 'TIME', 'VARCHAR', 'TINYTEXT', 'SMALLTEXT', 'MEDIUMTEXT', 'LONGTEXT')
-    if colType in texts:
-        return 'TEXT'
-    blobs = ('TINYBLOB', 'SMALLBLOB', 'MEDIUMBLOB', 'LONGBLOB', 'BYTE', 'BYTES', 'UUID')
-    if colType in blobs:
-        return 'BLOB'
-    res = re.search(r'VARCHAR\([0-9]+\)', colType)
-    if res:
-        return 'TEXT'
-    else:
-        raise ValueError(f'Could not figure out how to coerce "{colType}" to valid SQLite type.')
+    return TYPE_REGISTRY.coerce(colType)
+
+def explainColTypes(dbml=".", parser="pydbml"):
+    """
+    Report which rule of `TYPE_REGISTRY` every distinct column type in the DBML resolves with.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files. Default is a period, the current working directory.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+
+    Returns:
+    list of TypeMatch: one `(colType, sqliteType, rule)` tuple per distinct type, in the order they first appear. Both `sqliteType` and `rule` are None for a type no rule matches.
+    """
+    _checkParser(parser)
+    matches = {}
+    for target in dbmlTargets(dbml):
+        for table in parseDBMLFile(target, parser).tables:
+            for col in table.columns:
+                if isinstance(col.type, str) and col.type not in matches:
+                    try:
+                        matches[col.type] = TYPE_REGISTRY.resolve(col.type)
+                    except ValueError:
+                        matches[col.type] = TypeMatch(col.type, None, None)
+    return list(matches.values())
@@ -0,0 +1,287 @@
+import re
+import copy
+import sqlite3
+from itertools import chain
+from .core import dbmlTargets, parseDBMLFile, processTable, processEnum, processColumn, processIndex, indexName, foreignKeyIndexes, enumInserts, _fileStatements, _checkEmulation
+from .apply import applyStatements
+
+_CHECK = re.compile(r'\bCHECK\s*\(', re.IGNORECASE)
+_INDEX_ON = re.compile(r'\sON\s', re.IGNORECASE)
+_REBUILD_PREFIX = '_dbml_sqlite_new_'
+
+def diffSQLite(dbml, database, emulation="full", dropTables=False, parser="pydbml", fkIndexes=False, labelViews=False):
+    """
+    Compare the schema described by DBML with the schema of an existing SQLite database and generate only the statements needed to bring the database up to date.
+
+    New tables are created, new columns are added with `ALTER TABLE ... ADD COLUMN` and removed ones dropped with `ALTER TABLE ... DROP COLUMN` where SQLite allows it, indexes are created or dropped, and enum tables have their rows inserted, deleted or renumbered. A table is only rebuilt (create a copy, move the rows, drop, rename, create its triggers again) when SQLite can't alter it in place, e.g. when a column's type or constraints or the table options (`STRICT`, `WITHOUT ROWID`) change. Tables that are not in the DBML are left alone unless `dropTables` is True. When any table is altered or rebuilt, all views are dropped first and created again at the end, since SQLite refuses to rename a table or drop a column while a view reads it.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`.
+    database (str, Path or sqlite3.Connection): the database to compare against. It is only read.
+    emulation (str): Default is "full". Emulation mode for enums, "full", "half" or "integer".
+    dropTables (bool): Default is False. If True, tables in the database that are not in the DBML are dropped.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`. Pass the same value the database was created with, or those indexes are dropped.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`. Missing or outdated label views are created.
+
+    Returns:
+    list of str: the migration statements in the order they must be executed. Empty if the database is up to date.
+    """
+    if isinstance(database, sqlite3.Connection):
+        return _diff(dbml, database, emulation, dropTables, parser, fkIndexes, labelViews)
+    con = sqlite3.connect(str(database))
+    try:
+        return _diff(dbml, con, emulation, dropTables, parser, fkIndexes, labelViews)
+    finally:
+        con.close()
+
+def migrateSQLite(dbml, database, emulation="full", dropTables=False, parser="pydbml", fkIndexes=False, labelViews=False):
+    """
+    Compute the statements of `diffSQLite` and execute them on the database with `applyMigration`.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`.
+    database (str, Path or sqlite3.Connection): the database to migrate.
+    emulation (str): Default is "full". Emulation mode for enums, "full", "half" or "integer".
+    dropTables (bool): Default is False. If True, tables in the database that are not in the DBML are dropped.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+
+    Returns:
+    list of str: the statements that were executed.
+    """
+    if not isinstance(database, sqlite3.Connection):
+        con = sqlite3.connect(str(database))
+        try:
+            return migrateSQLite(dbml, con, emulation, dropTables, parser, fkIndexes, labelViews)
+        finally:
+            con.close()
+    statements = _diff(dbml, database, emulation, dropTables, parser, fkIndexes, labelViews)
+    if statements:
+        applyMigration(statements, database)
+    return statements
+
+def applyMigration(statements, database, observer=None):
+    """
+    Execute migration statements, e.g. those of `diffSQLite`, in a single transaction, with foreign key enforcement off so tables can be rebuilt. Before committing, `PRAGMA foreign_key_check` verifies that no row breaks a foreign key, as in the procedure the SQLite documentation gives for altering tables; otherwise everything is rolled back.
+
+    Parameters:
+    statements (iterable of str): complete SQLite statements, one per item.
+    database (str, Path or sqlite3.Connection): the database to migrate. A connection must not have a transaction in progress.
+    observer (function): Default is None. If given, it is called with an `Event` of kind "execute" after every statement.
+
+    Returns:
+    list of StatementTiming: one `(sql, seconds)` pair per executed statement.
+
+    Raises:
+    sqlite3.IntegrityError: if a foreign key is broken after the statements ran. Nothing is changed then.
+    """
+    if not isinstance(database, sqlite3.Connection):
+        con = sqlite3.connect(str(database))
+        try:
+            return applyMigration(statements, con, observer)
+        finally:
+            con.close()
+    return applyStatements(_checkForeignKeys(statements, database), database, bootstrap={'foreign_keys': 'OFF'}, observer=observer)
+
+def _checkForeignKeys(statements, con):
+    # Runs inside the transaction once every statement was executed; raising from the iterable rolls it back.
+    yield from statements
+    violations = con.execute('PRAGMA foreign_key_check').fetchall()
+    if violations:
+        shown = ', '.join(f'{table} row {rowid} references {parent}' for table, rowid, parent, _ in violations[:5])
+        more = f' and {len(violations) - 5} more' if len(violations) > 5 else ''
+        raise sqlite3.IntegrityError(f'The migration would break foreign keys: {shown}{more}. Nothing was changed.')
+
+def _diff(dbml, con, emulation, dropTables, parser, fkIndexes, labelViews):
+    _checkEmulation(emulation, labelViews)
+    models = [parseDBMLFile(target, parser) for target in dbmlTargets(dbml)]
+    tables = {}
+    enums = {}
+    indexes = {}
+    for parsed in models:
+        if emulation in ('full', 'integer'):
+            for enum in parsed.enums:
+                enums[enum.name] = enum
+        for table in parsed.tables:
+            tables[table.name] = table
+            for index in table.indexes:
+                indexes[index.name or indexName(table, index)] = (table, index)
+            if fkIndexes:
+                for fk in foreignKeyIndexes(table):
+                    indexes[indexName(table, fk.index)] = (table, fk.index)
+    desired = sqlite3.connect(':memory:')
+    try:
+        applyStatements((statement for parsed in models for _, statement in _fileStatements(parsed, emulation, False, False, None, fkIndexes=fkIndexes, sqliteVersion=sqlite3.sqlite_version, labelViews=labelViews)), desired)
+        want = _inspect(desired)
+        wantViews = _views(desired)
+    finally:
+        desired.close()
+    have = _inspect(con)
+    haveViews = _views(con)
+
+    statements = []
+    tail = []
+    altered = False
+    for name, new in want.items():
+        old = have.get(name)
+        if old is None:
+            if name in enums:
+                statements.extend(processEnum(enums[name], False, False))
+            else:
+                statements.append(processTable(tables[name], emulation, False))
+            rebuilt = True
+        else:
+            alterations = _alterColumns(name, old, new, tables, emulation)
+            rebuilt = alterations is None
+            altered = altered or rebuilt or bool(alterations)
+            if rebuilt:
+                statements.extend(_rebuild(name, old, new, tables, enums, emulation))
+            else:
+                for idx, meta in old['indexes'].items():
+                    if meta['origin'] == 'c' and new['indexes'].get(idx) != meta:
+                        statements.append(f'DROP INDEX {idx};\n')
+                statements.extend(alterations)
+            if name in enums:
+                tail.extend(_syncEnum(con, enums[name]))
+        for idx, meta in new['indexes'].items():
+            if meta['origin'] == 'c' and (rebuilt or old['indexes'].get(idx) != meta):
+                table, index = indexes[idx]
+                tail.append(processIndex(table, index, indexExists=False))
+    statements.extend(tail)
+    views = {}
+    if altered:
+        statements = [f'DROP VIEW {name};\n' for name in haveViews] + statements
+        views = haveViews
+        haveViews = {}
+    views.update(wantViews)
+    for name, sql in views.items():
+        if haveViews.get(name) == sql:
+            continue
+        if name in haveViews:
+            statements.append(f'DROP VIEW {name};\n')
+        statements.append(sql + ';\n')
+    if dropTables:
+        for name in have:
+            if name not in want:
+                statements.append(f'DROP TABLE {name};\n')
+    return statements
+
+def _inspect(con):
+    schema = {}
+    q = "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+    definitions = dict(con.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL").fetchall())
+    for name, sql in con.execute(q).fetchall():
+        columns = {r[1]: tuple(r[2:6]) for r in con.execute('SELECT * FROM pragma_table_info(?)', (name,))}
+        fks = sorted(r[2:7] for r in con.execute('SELECT * FROM pragma_foreign_key_list(?)', (name,)))
+        indexes = {}
+        for r in con.execute('SELECT * FROM pragma_index_list(?)', (name,)).fetchall():
+            cols = tuple(i[2] for i in con.execute('SELECT * FROM pragma_index_info(?)', (r[1],)))
+            indexes[r[1]] = {'unique': r[2], 'origin': r[3], 'partial': r[4], 'columns': cols}
+            if r[4] or None in cols:
+                # Expressions and conditions don't show up in the pragmas, so these indexes are compared by their definition.
+                indexes[r[1]]['definition'] = ' '.join(_INDEX_ON.split(definitions[r[1]], 1)[1].split())
+        triggers = [r[0] for r in con.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ? ORDER BY rowid", (name,))]
+        schema[name] = {'columns': columns, 'fks': fks, 'indexes': indexes, 'checks': _checks(sql), 'options': _tableOptions(sql), 'triggers': triggers}
+    return schema
+
+def _views(con):
+    return dict(con.execute("SELECT name, sql FROM sqlite_master WHERE type = 'view' ORDER BY rowid").fetchall())
+
+def _checks(sql):
+    checks = []
+    for m in _CHECK.finditer(sql or ''):
+        depth = 0
+        for i in range(m.end() - 1, len(sql)):
+            if sql[i] == '(':
+                depth += 1
+            elif sql[i] == ')':
+                depth -= 1
+                if depth == 0:
+                    checks.append(' '.join(sql[m.start():i + 1].split()))
+                    break
+    return sorted(checks)
+
+def _tableOptions(sql):
+    # The table options (WITHOUT ROWID, STRICT) follow the closing parenthesis of the column definitions.
+    tail = (sql or '').rstrip().rstrip(';').rsplit(')', 1)[-1]
+    return sorted(' '.join(option.split()).upper() for option in tail.split(',') if option.strip())
+
+def _constraintIndexes(info):
+    return sorted((m['origin'], m['unique'], m['columns']) for m in info['indexes'].values() if m['origin'] != 'c')
+
+def _alterColumns(name, old, new, tables, emulation):
+    # Returns the ALTER TABLE statements that turn `old` into `new`, or None if the table must be rebuilt.
+    added = [c for c in new['columns'] if c not in old['columns']]
+    dropped = [c for c in old['columns'] if c not in new['columns']]
+    if any(old['columns'][c] != new['columns'][c] for c in new['columns'] if c in old['columns']):
+        return None
+    if old['fks'] != new['fks'] or old['options'] != new['options'] or _constraintIndexes(old) != _constraintIndexes(new):
+        return None
+    fkColumns = {fk[1] for fk in new['fks']}
+    constrained = {c for m in new['indexes'].values() if m['origin'] != 'c' for c in m['columns']}
+    definitions = {}
+    for col in added:
+        colType, notNull, default, pk = new['columns'][col]
+        if pk or col in fkColumns or col in constrained or (notNull and default is None):
+            return None
+        if default is not None and (default.startswith('(') or default.upper().startswith('CURRENT_')):
+            return None
+        column = next(c for c in tables[name].columns if c.name == col)
+        definitions[col] = processColumn(column, emulation).strip()
+    if sorted(old['checks'] + list(chain.from_iterable(_checks(d) for d in definitions.values()))) != new['checks']:
+        return None
+    if dropped and sqlite3.sqlite_version_info < (3, 35, 0):
+        return None
+    oldConstrained = {c for m in old['indexes'].values() if m['origin'] != 'c' for c in m['columns']}
+    for col in dropped:
+        if old['columns'][col][3] or col in oldConstrained or col in {fk[1] for fk in old['fks']}:
+            return None
+        if any(re.search(rf'\b{re.escape(col)}\b', check) for check in old['checks']):
+            return None
+    statements = [f'ALTER TABLE {name} DROP COLUMN {col};\n' for col in dropped]
+    statements.extend(f'ALTER TABLE {name} ADD COLUMN {definitions[col]};\n' for col in added)
+    return statements
+
+def _rebuild(name, old, new, tables, enums, emulation):
+    tmp = _REBUILD_PREFIX + name
+    if name in enums:
+        enum = copy.copy(enums[name])
+        enum.name = tmp
+        create = processEnum(enum, False, False)[0]
+    else:
+        table = copy.copy(tables[name])
+        table.name = tmp
+        create = processTable(table, emulation, False)
+    statements = [create]
+    common = ', '.join(c for c in new['columns'] if c in old['columns'])
+    if common:
+        statements.append(f'INSERT INTO {tmp} ({common}) SELECT {common} FROM {name};\n')
+    statements.append(f'DROP TABLE {name};\n')
+    statements.append(f'ALTER TABLE {tmp} RENAME TO {name};\n')
+    # Dropping the table dropped its triggers too.
+    statements.extend(sql + ';\n' for sql in old['triggers'])
+    return statements
+
+def _syncEnum(con, enum):
+    try:
+        current = dict(con.execute(f'SELECT type, seq FROM {enum.name}').fetchall())
+    except sqlite3.Error:
+        current = {}
+    wanted = {item.name: i + 1 for i, item in enumerate(enum.items)}
+    statements = []
+    removed = [label for label in current if label not in wanted]
+    if removed:
+        statements.append(f'DELETE FROM {enum.name} WHERE type IN ({", ".join(_quote(l) for l in removed)});\n')
+    moved = [label for label in wanted if label in current and current[label] != wanted[label]]
+    # seq is UNIQUE, so renumbered rows go through negative values to avoid collisions.
+    for label in moved:
+        statements.append(f'UPDATE {enum.name} SET seq = {-wanted[label]} WHERE type = {_quote(label)};\n')
+    if moved:
+        statements.append(f'UPDATE {enum.name} SET seq = -seq WHERE seq < 0;\n')
+    statements.extend(enumInserts(enum.name, [(label, seq) for label, seq in wanted.items() if label not in current], sqlite3.sqlite_version))
+    return statements
+
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
@@ -0,0 +1,210 @@
+import csv
+import json
+import sqlite3
+from itertools import islice
+from time import perf_counter
+from pathlib import Path
+from .core import iterPhased, coerceColType, Event
+from .apply import pragmas as bootstrapPragmas, transaction, splitPreamble, applyPreamble, _applyStatements
+
+def loadSQLite(dbml, database, sources, emulation="full", tableExists=True, indexExists=True, batchSize=10000, bootstrap=True, workers=1, cache=None, observer=None, parser="pydbml", fkIndexes=False, profile=None, pragmas=None, labelViews=False):
+    """
+    Create the schema described by DBML, bulk load data files into its tables, and only then build the indexes, so rows are inserted without paying for index maintenance.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`.
+    database (str, Path or sqlite3.Connection): the database to create and fill. A path is opened (and created if needed) and closed again afterwards.
+    sources (dict): maps table names to the `.csv`, `.jsonl` or `.ndjson` file with that table's rows. CSV files need a header row naming the columns.
+    emulation (str): Default is "full". Emulation mode for enums, "full", "half" or "integer".
+    tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
+    indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
+    batchSize (int): Default is 10000. Number of rows handed to each `executemany` call.
+    bootstrap (bool or dict): Default is True. PRAGMAs set for the whole load and restored afterwards, as for `applySQLite`.
+    workers (int): Default is 1. Number of processes used to convert a directory of files.
+    cache (DDLCache): Default is None. If given, generated DDL is looked up in and stored to this cache.
+    observer (function): Default is None. Called with an `Event` for every conversion step and executed statement, as for `applySQLite`, and one of kind "load" per source file.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    profile (str): Default is None. Name of a PRAGMA profile, as for `applySQLite`.
+    pragmas (dict): Default is None. PRAGMAs overriding the profile, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+
+    Returns:
+    dict: the number of rows loaded per table.
+    """
+    if not isinstance(database, sqlite3.Connection):
+        con = sqlite3.connect(str(database))
+        try:
+            return loadSQLite(dbml, con, sources, emulation, tableExists, indexExists, batchSize, bootstrap, workers, cache, observer, parser, fkIndexes, profile, pragmas, labelViews)
+        finally:
+            con.close()
+    deferred = []
+    tagged = iterPhased(dbml, emulation, tableExists=tableExists, indexExists=indexExists, workers=workers, cache=cache, observer=observer, parser=parser, fkIndexes=fkIndexes, sqliteVersion=sqlite3.sqlite_version, profile=profile, pragmas=pragmas, labelViews=labelViews)
+    preamble, tagged = splitPreamble(tagged)
+    applyPreamble(preamble, database, observer)
+    def schema():
+        for phase, statement in tagged:
+            if phase == 'schema':
+                yield statement
+            else:
+                deferred.append(statement)
+    with bootstrapPragmas(database, bootstrap):
+        _applyStatements(database, schema(), False, observer)
+        counts = {}
+        for table, source in sources.items():
+            start = perf_counter()
+            counts[table] = _loadRows(database, table, source, batchSize)
+            if observer is not None:
+                observer(Event('load', table, str(source), perf_counter() - start, counts[table]))
+        _applyStatements(database, deferred, False, observer)
+    return counts
+
+def loadRows(database, table, source, batchSize=10000):
+    """
+    Bulk insert the rows of a `.csv`, `.jsonl` or `.ndjson` file into an existing table, in one transaction, with `executemany` in batches of `batchSize` rows. Values are converted to the SQLite type `coerceColType` gives for each column's declared type; empty CSV fields become NULL, CSV rows must have as many fields as the header, INTEGER columns refuse values with a fractional part, and JSON objects and arrays are stored as JSON text, as are `true` and `false` in TEXT columns and every non-string JSON value in BLOB columns. The columns of a JSONL file are the keys of its first record; keys missing from later records are NULL, and keys the first record lacks are refused. Enum columns of integer emulation take labels, looked up in the enum table, or ids as numbers.
+
+    Parameters:
+    database (str, Path or sqlite3.Connection): the database containing `table`.
+    table (str): name of the table to fill.
+    source (str or Path): the data file. CSV files need a header row naming the columns.
+    batchSize (int): Default is 10000. Number of rows handed to each `executemany` call.
+
+    Returns:
+    int: the number of rows inserted.
+
+    Raises:
+    ValueError: if the file or a value in it doesn't fit the table. The message names the row and column. Nothing is inserted then.
+    """
+    if not isinstance(database, sqlite3.Connection):
+        con = sqlite3.connect(str(database))
+        try:
+            return _loadRows(con, table, source, batchSize)
+        finally:
+            con.close()
+    return _loadRows(database, table, source, batchSize)
+
+def _loadRows(con, table, source, batchSize):
+    declared = {r[1]: r[2] for r in con.execute('SELECT * FROM pragma_table_info(?)', (table,))}
+    if not declared:
+        raise ValueError(f'Table "{table}" does not exist.')
+    source = Path(source)
+    with open(source, newline='', encoding='utf8') as f:
+        if source.suffix.lower() == '.csv':
+            reader = csv.reader(f)
+            columns = next(reader, [])
+            rows = _csvRows(reader, columns, source)
+        elif source.suffix.lower() in ('.jsonl', '.ndjson'):
+            records = (json.loads(line) for line in f if line.strip())
+            first = next(records, None)
+            columns = list(first) if first is not None else []
+            rows = _recordRows(_prepend(first, records), columns, source)
+        else:
+            raise ValueError(f'Cannot load "{source}": expected a .csv, .jsonl or .ndjson file.')
+        unknown = [c for c in columns if c not in declared]
+        if unknown:
+            raise ValueError(f'Cannot load "{source}" into "{table}": unknown column(s) {", ".join(unknown)}.')
+        enums = _enumIds(con, table)
+        converters = [_enumConverter(*enums[c]) if c in enums else _CONVERTERS[coerceColType(declared[c] or 'NULL')] for c in columns]
+        sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" for _ in columns)})'
+        count = 0
+        with transaction(con):
+            while True:
+                chunk = list(islice(rows, batchSize))
+                if not chunk:
+                    break
+                try:
+                    batch = [[None if v is None else convert(v) for convert, v in zip(converters, row)] for row in chunk]
+                except (ValueError, TypeError):
+                    # Only failing batches pay for finding the value at fault.
+                    _raiseConversion(chunk, converters, columns, count, source, table)
+                con.executemany(sql, batch)
+                count += len(batch)
+    return count
+
+def _csvRows(reader, columns, source):
+    for n, row in enumerate(reader, 1):
+        if len(row) != len(columns):
+            raise ValueError(f'Cannot load "{source}": row {n} has {len(row)} field(s), but the header names {len(columns)} column(s).')
+        yield [None if v == '' else v for v in row]
+
+def _recordRows(records, columns, source):
+    known = set(columns)
+    for n, record in enumerate(records, 1):
+        if not record.keys() <= known:
+            extra = ', '.join(k for k in record if k not in known)
+            raise ValueError(f'Cannot load "{source}": row {n} has key(s) {extra} that the first row lacks. The first row decides the columns, so give it every key, with null where there is no value.')
+        yield [record.get(c) for c in columns]
+
+def _raiseConversion(chunk, converters, columns, offset, source, table):
+    for n, row in enumerate(chunk, offset + 1):
+        for convert, column, v in zip(converters, columns, row):
+            if v is None:
+                continue
+            try:
+                convert(v)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f'Cannot load "{source}" into "{table}": row {n}, column {column}: {e}') from e
+
+def _enumIds(con, table):
+    # With integer emulation, enum columns reference the id of a table of (id, type, seq) rows.
+    enums = {}
+    for r in con.execute('SELECT * FROM pragma_foreign_key_list(?)', (table,)).fetchall():
+        if r[4] != 'id' or [c[1] for c in con.execute('SELECT * FROM pragma_table_info(?)', (r[2],))] != ['id', 'type', 'seq']:
+            continue
+        enums[r[3]] = (r[2], dict(con.execute(f'SELECT type, id FROM {r[2]} ORDER BY seq').fetchall()))
+    return enums
+
+def _enumConverter(enum, ids):
+    def convert(v):
+        if not isinstance(v, str):
+            return _integer(v)
+        try:
+            return ids[v]
+        except KeyError:
+            labels = ', '.join(list(ids)[:10]) + (', ...' if len(ids) > 10 else '')
+            raise ValueError(f'"{v}" is not a label of {enum}, expected one of: {labels}.') from None
+    return convert
+
+def _prepend(first, rest):
+    if first is not None:
+        yield first
+    yield from rest
+
+def _integer(v):
+    if isinstance(v, str):
+        if v.lower() in ('true', 'false'):
+            return int(v.lower() == 'true')
+        try:
+            return int(v)
+        except ValueError:
+            v = float(v)
+    if isinstance(v, float) and not v.is_integer():
+        raise ValueError(f'{v!r} is not an integer.')
+    return int(v)
+
+def _text(v):
+    # JSON values are stored the way JSON spells them, not as Python reprs.
+    if isinstance(v, (dict, list, bool)):
+        return json.dumps(v)
+    return str(v)
+
+def _untyped(v):
+    return json.dumps(v) if isinstance(v, (dict, list)) else v
+
+def _blob(v):
+    if isinstance(v, str):
+        return v.encode('utf8')
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        return bytes(v)
+    # bytes() would turn the number 5 into five NUL bytes, so other JSON values are stored as their JSON text.
+    if isinstance(v, (bool, int, float, dict, list)):
+        return json.dumps(v).encode('utf8')
+    raise ValueError(f'{v!r} can\'t be stored as a BLOB.')
+
+_CONVERTERS = {
+    'NULL': _untyped,
+    'INTEGER': _integer,
+    'REAL': float,
+    'TEXT': _text,
+    'BLOB': _blob,
+}
@@ -0,0 +1,674 @@
+import re
+
+class UnsupportedSyntax(ValueError):
+    """
+    Raised by `parseDBML` for input outside of the subset of DBML the native parser handles, including input PyDBML would reject. `parseFile` catches it and hands the file to PyDBML instead.
+    """
+
+class Note:
+    """Text of a `note` setting. Empty notes are falsy, like PyDBML's."""
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+    def __bool__(self):
+        return bool(self.text)
+
+    def __repr__(self):
+        return f'Note({self.text!r})'
+
+class Column:
+    """A table column, with the attributes of PyDBML's `Column`. `type` is the type as written, or an `EnumType` if it names an enum."""
+    def __init__(self, name, type_, unique=False, not_null=False, pk=False, autoinc=False, default=None, note=None):
+        self.name = name
+        self.type = type_
+        self.unique = unique
+        self.not_null = not_null
+        self.pk = pk
+        self.autoinc = autoinc
+        self.default = default
+        self.note = note or Note('')
+        self.table = None
+
+    def __repr__(self):
+        return f'Column({self.name!r}, {self.type!r})'
+
+class Index:
+    """An index, with the attributes of PyDBML's `Index`. `subjects` holds the `Column`s named by `subject_names`."""
+    def __init__(self, subject_names, name=None, unique=False, type_=None, pk=False, note=None):
+        self.subject_names = subject_names
+        self.subjects = []
+        self.name = name if name else None
+        self.table = None
+        self.unique = unique
+        self.type = type_
+        self.pk = pk
+        self.note = note or Note('')
+
+    def __repr__(self):
+        return f'Index({self.subject_names!r})'
+
+class TableReference:
+    """A foreign key of a table, with the attributes of PyDBML's `TableReference`."""
+    def __init__(self, col, ref_table, ref_col, name=None, on_update=None, on_delete=None):
+        self.col = col
+        self.ref_table = ref_table
+        self.ref_col = ref_col
+        self.name = name
+        self.on_update = on_update
+        self.on_delete = on_delete
+
+    def __repr__(self):
+        return f'TableReference({self.col.name!r}, {self.ref_table.name!r}, {self.ref_col.name!r})'
+
+class Table:
+    """A table, with the attributes of PyDBML's `Table`."""
+    def __init__(self, name, alias=None, note=None, header_color=None):
+        self.name = name
+        self.columns = []
+        self.indexes = []
+        self.column_dict = {}
+        self.alias = alias if alias else None
+        self.note = note or Note('')
+        self.header_color = header_color
+        self.refs = []
+
+    def add_column(self, c):
+        c.table = self
+        self.columns.append(c)
+        self.column_dict[c.name] = c
+
+    def add_index(self, i):
+        for subject in i.subject_names:
+            col = self.column_dict.get(subject)
+            if col is None:
+                raise UnsupportedSyntax(f'Index of table "{self.name}" names unknown column "{subject}".')
+            i.subjects.append(col)
+        i.table = self
+        self.indexes.append(i)
+
+    def get(self, k, default=None):
+        return self.column_dict.get(k, default)
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __repr__(self):
+        return f'Table({self.name!r}, {self.columns!r})'
+
+class EnumItem:
+    """One item of an enum."""
+    def __init__(self, name, note=None):
+        self.name = name
+        self.note = note or Note('')
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'EnumItem({self.name!r})'
+
+class Enum:
+    """An enum, with the attributes of PyDBML's `Enum`."""
+    def __init__(self, name, items):
+        self.name = name
+        self.items = items
+
+    def get_type(self):
+        return EnumType(self.name, self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __repr__(self):
+        return f'Enum({self.name!r}, {self.items!r})'
+
+class EnumType(Enum):
+    """An enum used as the type of a column."""
+    def __str__(self):
+        return self.name
+
+class ParseResults:
+    """What `parseDBML` returns: the parsed `tables` (also by name in `table_dict`) and `enums`."""
+    def __init__(self, tables, enums):
+        self.tables = tables
+        self.table_dict = {table.name: table for table in tables}
+        self.enums = enums
+        self.project = None
+        self.table_groups = []
+
+    def __getitem__(self, k):
+        return self.tables[k] if isinstance(k, int) else self.table_dict[k]
+
+    def __iter__(self):
+        return iter(self.tables)
+
+def parseFile(target):
+    """
+    Parse a `.dbml` file with the native parser, falling back to PyDBML if it uses syntax the native parser doesn't handle.
+
+    Parameters:
+    target (str or Path): the file to parse.
+
+    Returns:
+    ParseResults or PyDBMLParseResults: the parsed schema, with `tables` and `enums` of the same shape either way.
+    """
+    with open(target, encoding='utf8') as f:
+        source = f.read()
+    try:
+        return parseDBML(source)
+    except UnsupportedSyntax:
+        from pydbml import PyDBML
+        return PyDBML.parse_file(str(target))
+
+def parseDBML(source):
+    """
+    Parse DBML with the native parser. It handles tables (with aliases, settings, notes and `indexes` blocks), columns with settings and inline refs, enums and standalone refs, and builds objects with the same attributes PyDBML's classes have, so the `process*` functions give identical output for either. It is many times faster than PyDBML's general pyparsing grammar.
+
+    Parameters:
+    source (str): DBML text.
+
+    Returns:
+    ParseResults: the parsed schema.
+
+    Raises:
+    UnsupportedSyntax: if `source` uses anything else, such as `Project` or `TableGroup` blocks, multi-line or escaped strings, or is not valid DBML at all.
+    """
+    if source.startswith('\ufeff'):
+        source = source[1:]
+    if not source:
+        raise UnsupportedSyntax('Empty source.')
+    return _Parser(source).parse()
+
+_TOKEN = re.compile(r'''
+    (?P<space>[ \t\r]+)
+  | (?P<comment>//[^\n]*)
+  | (?P<nl>\n)
+  | (?P<name>[A-Za-z0-9_]+)
+  | (?P<triple>\'\'\')
+  | (?P<dq>"[^"\n\\]*")
+  | (?P<sq>'[^'\n\\]*')
+  | (?P<expr>`[^`\n\\]*`)
+  | (?P<color>\#[0-9A-Fa-f]*)
+  | (?P<punct>[{}\[\](),.:<>-])
+  | (?P<other>.)
+''', re.VERBOSE)
+
+_RELATIONS = ('>', '-', '<')
+_ON_OPTIONS = ('no action', 'restrict', 'cascade', 'set null', 'set default')
+_TYPE_ARGS = re.compile(r'[A-Za-z0-9_]+(?:[ \t]*,[ \t]*[A-Za-z0-9_]+)*[ \t]*')
+
+def _tokenize(source):
+    # Tokens are (kind, text, start, end); punctuation is its own kind. Spaces are dropped, newlines and comments kept.
+    tokens = []
+    for m in _TOKEN.finditer(source):
+        kind = m.lastgroup
+        if kind == 'space':
+            continue
+        if kind == 'punct':
+            kind = m.group()
+        elif kind == 'other' or kind == 'triple':
+            line = source.count('\n', 0, m.start()) + 1
+            raise UnsupportedSyntax(f'Unexpected {m.group()!r} on line {line}.')
+        tokens.append((kind, m.group(), m.start(), m.end()))
+    tokens.append(('eof', '', len(source), len(source)))
+    return tokens
+
+class _Parser:
+    # Recursive descent over the token list. Wherever PyDBML's grammar allows newlines and comments
+    # the parser calls `blank`; everywhere else a newline token is a syntax error, as it is for PyDBML.
+    def __init__(self, source):
+        self.source = source
+        self.tokens = _tokenize(source)
+        self.i = 0
+        self.tables = []
+        self.enums = []
+        self.blueprints = []
+        self.pending = []
+
+    def parse(self):
+        while True:
+            self.blank()
+            kind, text = self.tokens[self.i][:2]
+            if kind == 'eof':
+                break
+            keyword = text.lower() if kind == 'name' else None
+            if keyword == 'table':
+                self.table()
+            elif keyword == 'enum':
+                self.enum()
+            elif keyword == 'ref':
+                self.ref()
+            else:
+                self.fail(f'Unsupported {text!r}')
+        return self.resolve()
+
+    def fail(self, message):
+        line = self.source.count('\n', 0, self.tokens[self.i][2]) + 1
+        raise UnsupportedSyntax(f'{message} on line {line}.')
+
+    def peek(self, offset=0):
+        return self.tokens[self.i + offset][0]
+
+    def take(self, kind):
+        token = self.tokens[self.i]
+        if token[0] != kind:
+            self.fail(f'Expected {kind!r}, found {token[1]!r}')
+        self.i += 1
+        return token
+
+    def blank(self):
+        tokens = self.tokens
+        while tokens[self.i][0] in ('nl', 'comment'):
+            self.i += 1
+
+    def comment(self):
+        if self.tokens[self.i][0] == 'comment':
+            self.i += 1
+
+    def lineEnd(self):
+        # A newline (or the end of the text), optionally preceded by a comment.
+        self.comment()
+        if self.peek() == 'nl':
+            self.i += 1
+        elif self.peek() != 'eof':
+            self.fail('Expected end of line')
+
+    def blockEnd(self):
+        # After a closing brace PyDBML requires a newline or the end of the text; not even a comment may follow.
+        if self.peek() == 'nl':
+            self.i += 1
+        elif self.peek() != 'eof':
+            self.fail('Expected end of line')
+
+    def isWord(self, word, offset=0):
+        kind, text = self.tokens[self.i + offset][:2]
+        return kind == 'name' and text.lower() == word
+
+    def isSetting(self, word):
+        # `word:` with no space before the colon, as PyDBML's literals like "note:" require.
+        token, colon = self.tokens[self.i], self.tokens[self.i + 1]
+        return token[0] == 'name' and token[1].lower() == word and colon[0] == ':' and colon[2] == token[3]
+
+    def isPhrase(self, words):
+        # Keywords like "not null" that PyDBML matches literally, with exactly one space in between.
+        tokens = self.tokens[self.i:self.i + len(words)]
+        if len(tokens) < len(words) or any(t[0] != 'name' or t[1].lower() != w for t, w in zip(tokens, words)):
+            return False
+        return all(self.source[a[3]:b[2]] == ' ' for a, b in zip(tokens, tokens[1:]))
+
+    def ident(self):
+        kind, text = self.tokens[self.i][:2]
+        if kind == 'name':
+            self.i += 1
+            return text
+        if kind == 'dq':
+            self.i += 1
+            return text[1:-1]
+        self.fail(f'Expected a name, found {text!r}')
+
+    def string(self):
+        kind, text = self.tokens[self.i][:2]
+        if kind not in ('sq', 'dq'):
+            self.fail(f'Expected a string, found {text!r}')
+        self.i += 1
+        return text[1:-1]
+
+    def settingValue(self, value):
+        # Consumes `word:`, the blank space PyDBML allows after it and whatever `value` parses.
+        self.i += 2
+        self.blank()
+        return value()
+
+    def separator(self, closing):
+        # Between settings: returns True after a comma, False after the closing bracket.
+        self.blank()
+        kind = self.peek()
+        if kind == ',':
+            self.i += 1
+            return True
+        if kind == closing:
+            self.i += 1
+            return False
+        self.fail(f'Expected "," or "{closing}"')
+
+    def table(self):
+        self.i += 1
+        name = self.ident()
+        alias = None
+        if self.isWord('as') and self.tokens[self.i][1] == 'as':
+            self.i += 1
+            alias = self.ident()
+        note = None
+        color = None
+        if self.peek() == '[':
+            self.i += 1
+            while True:
+                self.blank()
+                if self.isSetting('note'):
+                    note = Note(self.settingValue(self.string))
+                elif self.isSetting('headercolor'):
+                    color = self.settingValue(self.color)
+                else:
+                    self.fail('Unsupported table setting')
+                if not self.separator(']'):
+                    break
+        self.blank()
+        self.take('{')
+        table = Table(name, alias=alias, note=note, header_color=color)
+        while True:
+            self.blank()
+            if self.peek() in ('name', 'dq') and self.peek(1) in ('name', 'dq'):
+                self.column(table)
+            else:
+                break
+        if not table.columns:
+            self.fail('Expected a column')
+        sawNote = sawIndexes = False
+        while True:
+            self.blank()
+            if self.isWord('indexes') and not sawIndexes:
+                self.indexes(table)
+                sawIndexes = True
+            elif self.isWord('note') and not sawNote:
+                table.note = self.noteElement()
+                sawNote = True
+            else:
+                break
+        self.take('}')
+        self.blockEnd()
+        self.tables.append(table)
+        for column, blueprints in self.pending:
+            for relation, refTable, refCol in blueprints:
+                self.blueprints.append((relation, table.name, column, refTable, refCol, None, None, None))
+        self.pending = []
+
+    def color(self):
+        kind, text = self.tokens[self.i][:2]
+        if kind != 'color' or len(text) not in (4, 7):
+            self.fail('Expected a color')
+        self.i += 1
+        return text
+
+    def noteElement(self):
+        if self.isSetting('note'):
+            return Note(self.settingValue(self.string))
+        self.i += 1
+        self.blank()
+        self.take('{')
+        self.blank()
+        text = self.string()
+        self.blank()
+        self.take('}')
+        return Note(text)
+
+    def column(self, table):
+        name = self.ident()
+        colType = self.columnType()
+        settings = {}
+        while self.isWord('unique') or self.isWord('pk'):
+            settings['unique' if self.isWord('unique') else 'pk'] = True
+            self.i += 1
+        self.comment()
+        blueprints = []
+        if self.peek() == '[':
+            self.columnSettings(settings, blueprints)
+        self.comment()
+        self.take('nl')
+        column = Column(name, colType, **settings)
+        table.add_column(column)
+        if blueprints:
+            self.pending.append((column.name, blueprints))
+
+    def columnType(self):
+        kind, text = self.tokens[self.i][:2]
+        if kind != 'name':
+            self.fail('Unsupported column type')
+        self.i += 1
+        if self.peek() != '(':
+            return text
+        start = self.tokens[self.i][3]
+        self.i += 1
+        while self.peek() in ('name', ','):
+            self.i += 1
+        end = self.tokens[self.i][2]
+        self.take(')')
+        args = self.source[start:end].lstrip(' \t\r')
+        if not _TYPE_ARGS.fullmatch(args):
+            self.fail('Unsupported type arguments')
+        return f'{text}({args})'
+
+    def columnSettings(self, settings, blueprints):
+        self.i += 1
+        while True:
+            self.blank()
+            if self.isPhrase(('not', 'null')):
+                settings['not_null'] = True
+                self.i += 2
+            elif self.isWord('null'):
+                settings['not_null'] = False
+                self.i += 1
+            elif self.isPhrase(('primary', 'key')):
+                settings['pk'] = True
+                self.i += 2
+            elif self.isWord('pk'):
+                settings['pk'] = True
+                self.i += 1
+            elif self.isWord('unique'):
+                settings['unique'] = True
+                self.i += 1
+            elif self.isWord('increment'):
+                settings['autoinc'] = True
+                self.i += 1
+            elif self.isSetting('note'):
+                settings['note'] = Note(self.settingValue(self.string))
+            elif self.isSetting('default'):
+                settings['default'] = self.settingValue(self.default)
+            elif self.isSetting('ref') and self.tokens[self.i][1] == 'ref':
+                self.i += 2
+                relation = self.relation()
+                refTable = self.ident()
+                self.take('.')
+                blueprints.append((relation, refTable, self.ident()))
+            else:
+                self.fail('Unsupported column setting')
+            if not self.separator(']'):
+                break
+
+    def relation(self):
+        kind = self.peek()
+        if kind not in _RELATIONS:
+            self.fail('Expected a relation')
+        self.i += 1
+        return kind
+
+    def default(self):
+        kind, text, start, end = self.tokens[self.i]
+        self.i += 1
+        if kind in ('sq', 'dq'):
+            return text[1:-1]
+        if kind == 'expr':
+            return f'({text[1:-1]})'
+        if kind == 'name':
+            word = text.lower()
+            if word == 'true':
+                return True
+            if word == 'false':
+                return False
+            if word == 'null':
+                # PyDBML keeps NULL as the string it matched.
+                return 'NULL'
+            if text.isdigit():
+                dot, fraction = self.tokens[self.i], self.tokens[self.i + 1]
+                if dot[0] == '.' and dot[2] == end and fraction[0] == 'name' and fraction[2] == dot[3] and fraction[1].isdigit():
+                    self.i += 2
+                    return float(f'{text}.{fraction[1]}')
+                return int(text)
+        self.i -= 1
+        self.fail('Unsupported default value')
+
+    def indexes(self, table):
+        self.i += 1
+        self.blank()
+        self.take('{')
+        count = 0
+        while True:
+            self.blank()
+            kind = self.peek()
+            if kind == '}':
+                break
+            if kind == '(':
+                self.i += 1
+                subjects = [self.ident()]
+                while self.peek() == ',':
+                    self.i += 1
+                    subjects.append(self.ident())
+                self.take(')')
+            else:
+                subjects = [self.ident()]
+            self.comment()
+            settings = {}
+            if self.peek() == '[':
+                self.indexSettings(settings)
+            self.comment()
+            table.add_index(Index(subjects, **settings))
+            count += 1
+        if not count:
+            self.fail('Expected an index')
+        self.i += 1
+
+    def indexSettings(self, settings):
+        self.i += 1
+        self.blank()
+        if self.isWord('pk'):
+            self.i += 1
+            self.blank()
+            self.take(']')
+            settings['pk'] = True
+            return
+        while True:
+            if self.isWord('unique'):
+                settings['unique'] = True
+                self.i += 1
+            elif self.isSetting('type'):
+                settings['type_'] = self.settingValue(self.indexType)
+            elif self.isSetting('name'):
+                settings['name'] = self.settingValue(self.string)
+            elif self.isSetting('note'):
+                settings['note'] = Note(self.settingValue(self.string))
+            else:
+                self.fail('Unsupported index setting')
+            if not self.separator(']'):
+                break
+            self.blank()
+
+    def indexType(self):
+        if self.isWord('btree') or self.isWord('hash'):
+            self.i += 1
+            return self.tokens[self.i - 1][1].lower()
+        self.fail('Unsupported index type')
+
+    def enum(self):
+        self.i += 1
+        name = self.ident()
+        self.blank()
+        self.take('{')
+        items = []
+        while True:
+            mark = self.i
+            self.blank()
+            if self.peek() not in ('name', 'dq'):
+                self.i = mark
+                break
+            itemName = self.ident()
+            self.comment()
+            note = None
+            if self.peek() == '[':
+                self.i += 1
+                self.blank()
+                if not self.isSetting('note'):
+                    self.fail('Unsupported enum item setting')
+                note = Note(self.settingValue(self.string))
+                self.blank()
+                self.take(']')
+                self.comment()
+            items.append(EnumItem(itemName, note))
+        if not items:
+            self.fail('Expected an enum item')
+        # PyDBML requires exactly one newline between the last item and the closing brace.
+        self.take('nl')
+        self.take('}')
+        self.blockEnd()
+        self.enums.append(Enum(name, items))
+
+    def ref(self):
+        self.i += 1
+        name = self.ident() if self.peek() in ('name', 'dq') else None
+        if self.peek() == ':':
+            self.i += 1
+            self.refBody(name)
+            self.lineEnd()
+            return
+        self.blank()
+        self.take('{')
+        self.blank()
+        self.refBody(name)
+        self.blank()
+        self.take('}')
+        self.blockEnd()
+
+    def refBody(self, name):
+        table1 = self.ident()
+        self.take('.')
+        col1 = self.ident()
+        relation = self.relation()
+        table2 = self.ident()
+        self.take('.')
+        col2 = self.ident()
+        self.comment()
+        onUpdate = onDelete = None
+        if self.peek() == '[':
+            self.i += 1
+            while True:
+                self.blank()
+                if self.isSetting('update'):
+                    onUpdate = self.settingValue(self.onOption)
+                elif self.isSetting('delete'):
+                    onDelete = self.settingValue(self.onOption)
+                else:
+                    self.fail('Unsupported ref setting')
+                if not self.separator(']'):
+                    break
+            self.comment()
+        self.blueprints.append((relation, table1, col1, table2, col2, name if name else None, onUpdate, onDelete))
+
+    def onOption(self):
+        for option in _ON_OPTIONS:
+            words = tuple(option.split())
+            if self.isPhrase(words):
+                self.i += len(words)
+                return option
+        self.fail('Unsupported ref action')
+
+    def resolve(self):
+        # Mirrors PyDBML: refs become TableReferences on the referencing table, and columns whose type names an enum get that enum as their type.
+        tableDict = {table.name: table for table in self.tables}
+        for relation, table1, col1, table2, col2, name, onUpdate, onDelete in self.blueprints:
+            t1 = tableDict.get(table1)
+            t2 = tableDict.get(table2)
+            c1 = t1.get(col1) if t1 is not None else None
+            c2 = t2.get(col2) if t2 is not None else None
+            if c1 is None or c2 is None:
+                raise UnsupportedSyntax(f'Reference {table1}.{col1} {relation} {table2}.{col2} names an unknown table or column.')
+            if relation in ('>', '-'):
+                t1.refs.append(TableReference(c1, t2, c2, name, onUpdate, onDelete))
+            else:
+                t2.refs.append(TableReference(c2, t1, c1, name, onUpdate, onDelete))
+        enumDict = {enum.name: enum for enum in self.enums}
+        for table in self.tables:
+            for column in table.columns:
+                if column.type in enumDict:
+                    column.type = enumDict[column.type].get_type()
+        return ParseResults(self.tables, self.enums)
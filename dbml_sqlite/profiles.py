@@ -0,0 +1,121 @@
+import re
+
+# Settings stored in the database file itself. They only apply to a database that has no tables yet, or once it is rebuilt with VACUUM.
+PERSISTENT_PRAGMAS = ('page_size', 'auto_vacuum')
+
+# The order PRAGMAs are emitted in. Persistent settings come first, since they must precede the first CREATE TABLE and page_size can't change once the database is in WAL mode.
+PRAGMA_ORDER = ('page_size', 'auto_vacuum', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'wal_autocheckpoint')
+
+PROFILES = {
+    # Concurrent readers next to a writer, large page cache and memory mapped reads.
+    'read-heavy': {
+        'page_size': '4096',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': '-65536',
+        'mmap_size': '268435456',
+        'temp_store': 'MEMORY',
+    },
+    # Appends without a rollback journal and fsync per transaction, checkpointing in larger batches.
+    'write-heavy': {
+        'page_size': '4096',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': '-32768',
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': '10000',
+    },
+    # Small file and memory footprint: small pages, freed pages returned to the file system, no memory mapping.
+    'embedded-small': {
+        'page_size': '1024',
+        'auto_vacuum': 'FULL',
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': '-256',
+        'mmap_size': '0',
+        'temp_store': 'FILE',
+    },
+}
+
+# Keys of a DBML `Project` block starting with this prefix are read as settings, e.g. `sqlite_profile: 'read-heavy'` or `sqlite_cache_size: '-20000'`.
+PROJECT_PREFIX = 'sqlite_'
+
+_PRAGMA_KEY = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+_PRAGMA_VALUE = re.compile(r'^-?[A-Za-z0-9_.]+$')
+_PRAGMA_STATEMENT = re.compile(r'^\s*PRAGMA\s+(\w+)\s*=\s*([^\s;]+)\s*;?\s*$', re.IGNORECASE)
+
+def resolvePragmas(profile=None, pragmas=None, project=None):
+    """
+    Work out the PRAGMAs to set from a named profile and per key overrides.
+
+    Parameters:
+    profile (str): Default is None. One of the names in `PROFILES`, or None to start from no settings. Takes precedence over a profile chosen in `project`.
+    pragmas (dict): Default is None. PRAGMA names mapped to values, overriding both the profile and `project`.
+    project (dict): Default is None. The items of a DBML `Project` block. `sqlite_profile` chooses a profile when `profile` is None, and every other key starting with `sqlite_` sets the PRAGMA named by the rest of the key, overriding the profile.
+
+    Returns:
+    dict: PRAGMA names mapped to values, in the order they must be set in.
+
+    Raises:
+    ValueError: for an unknown profile or an invalid PRAGMA name or value.
+    """
+    project = {key[len(PROJECT_PREFIX):].lower(): str(value) for key, value in (project or {}).items() if key.lower().startswith(PROJECT_PREFIX)}
+    if profile is None:
+        profile = project.get('profile')
+    project.pop('profile', None)
+    values = {}
+    if profile is not None:
+        if profile not in PROFILES:
+            raise ValueError(f'Unknown profile "{profile}". Expected one of: {", ".join(PROFILES)}.')
+        values.update(PROFILES[profile])
+    values.update(project)
+    values.update({str(key).lower(): str(value) for key, value in (pragmas or {}).items()})
+    for key, value in values.items():
+        checkPragma(key, value)
+    order = {key: i for i, key in enumerate(PRAGMA_ORDER)}
+    return dict(sorted(values.items(), key=lambda item: order.get(item[0], len(PRAGMA_ORDER))))
+
+def pragmaStatements(values):
+    """
+    Render PRAGMA settings as statements.
+
+    Parameters:
+    values (dict): PRAGMA names mapped to values, as returned by `resolvePragmas`.
+
+    Returns:
+    list of str: one `PRAGMA name = value;` statement per setting, each terminated by a newline, in the order of `values`.
+    """
+    return [f'PRAGMA {key} = {value};\n' for key, value in values.items()]
+
+def parsePragma(statement):
+    """
+    Read the name and value back from a statement made by `pragmaStatements`.
+
+    Parameters:
+    statement (str): a `PRAGMA name = value;` statement.
+
+    Returns:
+    (str, str): the PRAGMA name in lower case and its value.
+
+    Raises:
+    ValueError: if the statement is not of that form.
+    """
+    m = _PRAGMA_STATEMENT.match(statement)
+    if m is None:
+        raise ValueError(f'Expected a statement of the form "PRAGMA name = value;", got "{statement.strip()}".')
+    checkPragma(m.group(1), m.group(2))
+    return m.group(1).lower(), m.group(2)
+
+def checkPragma(key, value):
+    """
+    Refuse PRAGMA names and values that could be anything other than a plain setting, since they are put into SQL as they are.
+
+    Parameters:
+    key (str): the PRAGMA name.
+    value (str): its value.
+
+    Raises:
+    ValueError: if either contains anything but letters, digits, underscores and, for the value, a leading minus sign or dots.
+    """
+    if not _PRAGMA_KEY.match(str(key)) or not _PRAGMA_VALUE.match(str(value)):
+        raise ValueError(f'Refusing to set invalid PRAGMA "{key} = {value}".')
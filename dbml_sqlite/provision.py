@@ -0,0 +1,132 @@
+import os
+import glob
+import sqlite3
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from collections import namedtuple
+from .core import iterPhased, Event
+from .apply import applyStatements, applyPreamble, splitPreamble
+
+ProvisionResult = namedtuple('ProvisionResult', ['target', 'ok', 'method', 'seconds', 'error'])
+
+# Set in every worker process by `_initWorker`, so the statements are sent to each process once instead of with every target.
+_job = None
+
+def provisionSQLite(dbml, targets, emulation="full", tableExists=True, indexExists=True, bootstrap=False, workers=1, cache=None, observer=None, parser="pydbml", fkIndexes=False, profile=None, pragmas=None, labelViews=False):
+    """
+    Create the schema described by DBML in many SQLite databases at once, e.g. one per tenant. The DBML is converted once and executed once, on a template database, which is then copied into every new or empty target with the backup API. Targets that already have tables get the statements executed instead, so their data is kept.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`.
+    targets (iterable of str or Path): database files, created if they don't exist, or glob patterns like `tenants/*.db` matching existing ones. See `expandTargets`.
+    emulation (str): Default is "full". Emulation mode for enums, "full", "half" or "integer".
+    tableExists (bool): Default is True. If True, all generated `CREATE TABLE` SQLite statements will have `IF NOT EXISTS` language included.
+    indexExists (bool): Default is True. If True, all generated `CREATE INDEX` SQLite statements will have `IF NOT EXISTS` language included.
+    bootstrap (bool or dict): Default is False. PRAGMAs set while the statements are executed, as for `applySQLite`.
+    workers (int): Default is 1. Number of processes used to convert a directory of files and to provision the targets. Pass None to use one process per CPU.
+    cache (DDLCache): Default is None. If given, generated DDL is looked up in and stored to this cache.
+    observer (function): Default is None. Called with an `Event` for every conversion step, as for `toSQLite`, and one of kind "provision" per target.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    profile (str): Default is None. Name of a PRAGMA profile, as for `toSQLite`. Its preamble is applied to every target with `applyPreamble`.
+    pragmas (dict): Default is None. PRAGMAs overriding the profile, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+
+    Returns:
+    list of ProvisionResult: one `(target, ok, method, seconds, error)` tuple per target, in order. `method` is "clone" or "apply", and `error` the message of the exception that made the target fail, or None.
+    """
+    tagged = iterPhased(dbml, emulation, tableExists=tableExists, indexExists=indexExists, workers=workers, cache=cache, observer=observer, parser=parser, fkIndexes=fkIndexes, sqliteVersion=sqlite3.sqlite_version, profile=profile, pragmas=pragmas, labelViews=labelViews)
+    preamble, tagged = splitPreamble(tagged)
+    return provisionStatements([statement for _, statement in tagged], targets, preamble, bootstrap, workers, observer)
+
+def provisionStatements(statements, targets, preamble=(), bootstrap=False, workers=1, observer=None):
+    """
+    Execute the same SQLite statements in many databases, copying a template database built from them into every new or empty target with the backup API instead of executing them again.
+
+    Parameters:
+    statements (list of str): complete SQLite statements, one per item, as for `applyStatements`.
+    targets (iterable of str or Path): database files or glob patterns, see `expandTargets`.
+    preamble (list of str): Default is empty. PRAGMA statements applied to the template and to every target with `applyPreamble`.
+    bootstrap (bool or dict): Default is False. PRAGMAs set while the statements are executed, as for `applySQLite`.
+    workers (int): Default is 1. Number of processes provisioning the targets. Pass None to use one process per CPU.
+    observer (function): Default is None. If given, it is called with an `Event` of kind "provision" per target.
+
+    Returns:
+    list of ProvisionResult: one `(target, ok, method, seconds, error)` tuple per target, in order.
+
+    Raises:
+    sqlite3.Error: if the statements fail on the template database, in which case no target is touched.
+    """
+    targets = expandTargets(targets)
+    statements = list(statements)
+    preamble = list(preamble)
+    with tempfile.TemporaryDirectory(prefix='dbml_sqlite_') as directory:
+        template = str(Path(directory) / 'template.db')
+        con = sqlite3.connect(template)
+        try:
+            applyPreamble(preamble, con)
+            applyStatements(statements, con, bootstrap=bootstrap)
+        finally:
+            con.close()
+        job = (template, statements, preamble, bootstrap)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(targets))
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker, initargs=(job,)) as pool:
+                results = list(pool.map(_provisionTarget, targets, chunksize=max(1, len(targets) // (workers * 4))))
+        else:
+            results = [_provisionTarget(target, job) for target in targets]
+    if observer is not None:
+        for result in results:
+            observer(Event('provision', result.target, result.target, result.seconds, 1))
+    return results
+
+def expandTargets(targets):
+    """
+    Turn database paths and glob patterns into the list of database files they name.
+
+    Parameters:
+    targets (iterable of str or Path): paths, used as they are whether the file exists or not, and glob patterns (containing `*`, `?` or `[`), replaced by the existing files they match in sorted order. `**` matches any number of directories.
+
+    Returns:
+    list of str: every database once, in the order given.
+    """
+    expanded = []
+    for target in targets:
+        target = str(target)
+        if glob.has_magic(target):
+            expanded.extend(sorted(glob.glob(target, recursive=True)))
+        else:
+            expanded.append(target)
+    return list(dict.fromkeys(expanded))
+
+def _initWorker(job):
+    global _job
+    _job = job
+
+def _provisionTarget(target, job=None):
+    template, statements, preamble, bootstrap = job or _job
+    start = perf_counter()
+    method = 'clone'
+    try:
+        con = sqlite3.connect(target)
+        try:
+            if con.execute('SELECT count(*) FROM sqlite_master').fetchone()[0]:
+                method = 'apply'
+                applyPreamble(preamble, con)
+                applyStatements(statements, con, bootstrap=bootstrap)
+            else:
+                source = sqlite3.connect(f'{Path(template).as_uri()}?mode=ro', uri=True)
+                try:
+                    source.backup(con)
+                finally:
+                    source.close()
+                applyPreamble(preamble, con)
+        finally:
+            con.close()
+    except (sqlite3.Error, OSError, ValueError) as e:
+        return ProvisionResult(target, False, method, perf_counter() - start, str(e))
+    return ProvisionResult(target, True, method, perf_counter() - start, None)
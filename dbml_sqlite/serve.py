@@ -0,0 +1,219 @@
+import io
+import os
+import sys
+import json
+import socket
+import getpass
+import tempfile
+import threading
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
+
+COMMANDS = ('convert', 'validate', 'apply', 'ping', 'shutdown')
+
+# Requests change the working directory and capture stdout and stderr of the whole process, so they run one at a time.
+_lock = threading.Lock()
+
+def defaultSocket():
+    """
+    Work out where `dbml_sqlite serve` listens unless told otherwise.
+
+    Returns:
+    str: the `DBML_SQLITE_SOCKET` environment variable if set, or `dbml_sqlite-<user>.sock` in the temporary directory.
+    """
+    path = os.environ.get('DBML_SQLITE_SOCKET')
+    if path:
+        return path
+    return os.path.join(tempfile.gettempdir(), f'dbml_sqlite-{getpass.getuser()}.sock')
+
+def handleRequest(request, cache):
+    """
+    Run one request of the `dbml_sqlite serve` protocol in this process, with the output of every file kept in `cache` between requests.
+
+    Parameters:
+    request (dict): `command`, one of `COMMANDS`; `args`, the arguments of the `dbml_sqlite` command line as a list of str; and `cwd`, the directory relative paths in them are resolved in. "convert" runs them as they are, "validate" only checks that SRC converts, without printing, writing or executing anything, and "apply" requires `--execute`.
+    cache (MemoryCache): where the statements of converted files are kept. A `--cache` directory in `args` takes precedence.
+
+    Returns:
+    dict: `ok` (bool), `exit` (int), the exit status the command line would have had, and the `stdout` and `stderr` text it would have printed.
+    """
+    command = request.get('command') if isinstance(request, dict) else None
+    args = request.get('args', []) if isinstance(request, dict) else None
+    if command not in COMMANDS:
+        return _response(2, stderr=f'Unknown command "{command}". Expected one of: {", ".join(COMMANDS)}.\n')
+    if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+        return _response(2, stderr='"args" must be a list of strings.\n')
+    if command in ('ping', 'shutdown'):
+        return _response(0)
+    cwd = request.get('cwd')
+    if cwd and not os.path.isdir(cwd):
+        return _response(2, stderr=f'The working directory "{cwd}" doesn\'t exist.\n')
+    import click
+    from .terminal import cli
+    with _lock, _workingDirectory(cwd):
+        try:
+            params = cli.make_context('dbml_sqlite', list(args), resilient_parsing=True).params
+        except click.ClickException:
+            # Reported by running the command below.
+            params = {}
+        if params.get('watch'):
+            return _response(2, stderr='--watch can\'t be used through `dbml_sqlite serve`.\n')
+        if command == 'validate':
+            if params.get('write') != None or params.get('execute') or params.get('sources'):
+                return _response(2, stderr='validate doesn\'t write or execute anything; leave out --write, --execute and --load.\n')
+            args = args + ['--no-print']
+        if command == 'apply' and not params.get('execute'):
+            return _response(2, stderr='apply requires --execute.\n')
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                result = cli.main(args, prog_name='dbml_sqlite', standalone_mode=False, obj={'cache': cache})
+                # The command returns whether it succeeded; --help and the like return their exit status instead.
+                status = 0 if result is True else 1 if result is False or result is None else result
+            except click.ClickException as e:
+                e.show()
+                status = e.exit_code
+            except click.Abort:
+                status = 1
+        return _response(status, stdout.getvalue(), stderr.getvalue())
+
+def serveSocket(path=None, cache=None):
+    """
+    Answer requests on a Unix socket until a "shutdown" request arrives. Every request is one line of JSON, see `handleRequest`, answered by one line of JSON. Several clients can be connected at once, but their requests run one after the other.
+
+    Parameters:
+    path (str): Default is None, for `defaultSocket()`. A stale socket file left by a server that is gone is replaced.
+    cache (MemoryCache): Default is None, for a new one.
+
+    Raises:
+    OSError: if another server is listening on `path` already.
+    """
+    import socketserver
+    from .cache import MemoryCache
+    path = path or defaultSocket()
+    cache = cache if cache is not None else MemoryCache()
+    if os.path.exists(path):
+        try:
+            sendRequest('ping', path=path)
+        except OSError:
+            os.remove(path)
+        else:
+            raise OSError(f'A server is already listening on {path}.')
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                request, response = _answer(line, cache)
+                self.wfile.write(json.dumps(response).encode('utf8') + b'\n')
+                self.wfile.flush()
+                if request.get('command') == 'shutdown':
+                    threading.Thread(target=self.server.shutdown).start()
+                    return
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(path)
+
+def serveStdio(input=None, output=None, cache=None):
+    """
+    Answer requests read from `input` on `output`, one line of JSON each, until `input` ends or a "shutdown" request arrives. Suits a build tool that starts the server as a child process and talks to it over pipes.
+
+    Parameters:
+    input (text file): Default is None, for standard input.
+    output (text file): Default is None, for standard output.
+    cache (MemoryCache): Default is None, for a new one.
+    """
+    from .cache import MemoryCache
+    input = input if input is not None else sys.stdin
+    output = output if output is not None else sys.stdout
+    cache = cache if cache is not None else MemoryCache()
+    for line in input:
+        if not line.strip():
+            continue
+        request, response = _answer(line, cache)
+        output.write(json.dumps(response) + '\n')
+        output.flush()
+        if request.get('command') == 'shutdown':
+            return
+
+def sendRequest(command, args=(), path=None, cwd=None):
+    """
+    Send one request to a server started with `dbml_sqlite serve` and wait for the answer.
+
+    Parameters:
+    command (str): one of `COMMANDS`.
+    args (list of str): Default is empty. Arguments of the `dbml_sqlite` command line.
+    path (str): Default is None, for `defaultSocket()`.
+    cwd (str): Default is None, for the current directory. Where the server resolves relative paths in `args`.
+
+    Returns:
+    dict: the answer, see `handleRequest`.
+
+    Raises:
+    OSError: if no server is listening on `path`.
+    """
+    request = {'command': command, 'args': list(args), 'cwd': cwd or os.getcwd()}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(path or defaultSocket())
+        s.sendall(json.dumps(request).encode('utf8') + b'\n')
+        with s.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise OSError('The server closed the connection without answering.')
+    return json.loads(line)
+
+def clientMain(args=None):
+    """
+    Entry point of `dbml_sqlite client` and the `dbml_sqlite_client` script: send the rest of the command line to the server and print its output as if `dbml_sqlite` had run here. Doesn't load click, pydbml or sqlite3, so it starts in a few milliseconds; `dbml_sqlite client` gets here through `dbml_sqlite.__main__.main`, which doesn't import click either.
+
+    Parameters:
+    args (list of str): Default is None, for `sys.argv[1:]`. Leading `--socket PATH` and one of `--validate`, `--apply`, `--ping` or `--shutdown` are read by the client, an optional `--` ends them, and everything after is passed on.
+
+    Returns:
+    int: the exit status of the command, or 2 if no server is listening.
+    """
+    args = sys.argv[1:] if args is None else list(args)
+    path = None
+    command = 'convert'
+    while args:
+        if args[0] == '--socket' and len(args) > 1:
+            path = args[1]
+            args = args[2:]
+        elif args[0] in ('--validate', '--apply', '--ping', '--shutdown'):
+            command = args.pop(0)[2:]
+        else:
+            if args[0] == '--':
+                args.pop(0)
+            break
+    try:
+        response = sendRequest(command, args, path)
+    except OSError as e:
+        sys.stderr.write(f'Could not reach a dbml_sqlite server at {path or defaultSocket()}: {e}. Start one with `dbml_sqlite serve`.\n')
+        return 2
+    sys.stdout.write(response.get('stdout', ''))
+    sys.stderr.write(response.get('stderr', ''))
+    sys.stdout.flush()
+    return response.get('exit', 1)
+
+def _answer(line, cache):
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return {}, _response(2, stderr=f'Requests must be one line of JSON each: {e}\n')
+    if not isinstance(request, dict):
+        return {}, _response(2, stderr='Requests must be JSON objects.\n')
+    return request, handleRequest(request, cache)
+
+def _response(status, stdout='', stderr=''):
+    return {'ok': status == 0, 'exit': status, 'stdout': stdout, 'stderr': stderr}
+
+@contextmanager
+def _workingDirectory(path):
+    previous = os.getcwd()
+    if path:
+        os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
@@ -0,0 +1,46 @@
+KINDS = ('cache', 'parse', 'enum', 'table', 'view', 'index', 'fkindex', 'file', 'execute', 'load', 'provision')
+
+class Stats:
+    """
+    An observer collecting the `Event`s of a conversion so they can be summarized per kind of step. Pass an instance as the `observer` argument of `toSQLite`, `applySQLite`, `loadSQLite` and friends.
+
+    Event kinds are "cache" (a file served from the DDL cache), "parse" (PyDBML parsing a file, counting its tables), "enum", "table" and "index" (emitting one of them, counting items, columns and indexed columns), "file" (all work for one file, counting its statements), "execute" (one statement run on SQLite) and "load" (one data file loaded, counting its rows). "file" events include the time of the "parse", "enum", "table" and "index" events of that file.
+    """
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def summary(self):
+        """
+        Aggregate the collected events per kind.
+
+        Returns:
+        dict: maps each kind seen to a dict with the number of `events`, their total `count`, total `seconds`, and the `slowest` event's name and `slowestSeconds`. Kinds are ordered as they happen in a conversion.
+        """
+        summary = {}
+        for event in self.events:
+            s = summary.get(event.kind)
+            if s is None:
+                s = summary[event.kind] = {'events': 0, 'count': 0, 'seconds': 0.0, 'slowest': None, 'slowestSeconds': 0.0}
+            s['events'] += 1
+            s['count'] += event.count
+            s['seconds'] += event.seconds
+            if s['slowest'] is None or event.seconds > s['slowestSeconds']:
+                s['slowest'] = event.name
+                s['slowestSeconds'] = event.seconds
+        order = {kind: i for i, kind in enumerate(KINDS)}
+        return dict(sorted(summary.items(), key=lambda item: order.get(item[0], len(KINDS))))
+
+    def format(self):
+        """
+        Render `summary` as a plain text table.
+
+        Returns:
+        str: one header line and one line per kind, without a trailing newline.
+        """
+        lines = [f'{"step":<9} {"events":>7} {"count":>8} {"total ms":>10} {"max ms":>9}  slowest']
+        for kind, s in self.summary().items():
+            lines.append(f'{kind:<9} {s["events"]:>7} {s["count"]:>8} {s["seconds"] * 1000:>10.2f} {s["slowestSeconds"] * 1000:>9.2f}  {s["slowest"]}')
+        return '\n'.join(lines)
@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+from collections import deque
+from .core import iterPhased
+from .apply import applyStatements, applyPreamble, splitPreamble
+
+class SchemaTemplate:
+    """
+    A schema converted from DBML and executed once, on an in-memory database, that hands out fresh connections to copies of it. Copying the finished database is much cheaper than having SQLite parse and plan every statement again, which adds up in test suites and short-lived workers that start from an empty schema many times.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`.
+    emulation (str): Default is "full". Emulation mode for enums, "full", "half" or "integer".
+    poolSize (int): Default is 0. Number of in-memory connections kept ready by `prewarm`, which the constructor calls once.
+    cache (DDLCache): Default is None. If given, generated DDL is looked up in and stored to this cache.
+    observer (function): Default is None. Called with an `Event` for every conversion step and executed statement, as for `applySQLite`.
+    parser (str): Default is "pydbml". Pass "native" for the built-in parser, as for `toSQLite`.
+    fkIndexes (bool): Default is False. If True, foreign key columns no index covers get one, as for `toSQLite`.
+    profile (str): Default is None. Name of a PRAGMA profile, as for `toSQLite`. Its preamble is applied to the template and to every connection handed out.
+    pragmas (dict): Default is None. PRAGMAs overriding the profile, as for `toSQLite`.
+    labelViews (bool): Default is False. If True, tables with enum columns get a view with their labels, as for `toSQLite`.
+    """
+    def __init__(self, dbml, emulation="full", poolSize=0, cache=None, observer=None, parser="pydbml", fkIndexes=False, profile=None, pragmas=None, labelViews=False):
+        if not isinstance(poolSize, int) or poolSize < 0:
+            raise ValueError(f'poolSize must be a non-negative integer, got {poolSize!r}.')
+        tagged = iterPhased(dbml, emulation, cache=cache, observer=observer, parser=parser, fkIndexes=fkIndexes, sqliteVersion=sqlite3.sqlite_version, profile=profile, pragmas=pragmas, labelViews=labelViews)
+        preamble, tagged = splitPreamble(tagged)
+        self.preamble = preamble
+        self.statements = [statement for _, statement in tagged]
+        self.poolSize = poolSize
+        self._pool = deque()
+        self._lock = threading.Lock()
+        # Only ever read from, under `_lock`, so it can serve backups to connections of any thread.
+        self._source = sqlite3.connect(':memory:', check_same_thread=False)
+        applyPreamble(self.preamble, self._source, observer=observer)
+        applyStatements(self.statements, self._source, observer=observer)
+        # Connection.serialize is new in Python 3.11; older versions copy with the backup API.
+        self.image = self._source.serialize() if hasattr(self._source, 'serialize') else None
+        self.prewarm()
+
+    def connect(self, database=':memory:', **kwargs):
+        """
+        Open a connection to a fresh copy of the template. Plain in-memory connections come from the pool while it has any.
+
+        Parameters:
+        database (str or Path): Default is ":memory:". The database to open. A file is overwritten with the template, so it should be new or disposable.
+        kwargs: passed on to `sqlite3.connect`. Connections opened with any are never taken from the pool.
+
+        Returns:
+        sqlite3.Connection: a connection with the schema created and the preamble applied, and no transaction in progress.
+        """
+        if database == ':memory:' and not kwargs:
+            try:
+                return self._pool.popleft()
+            except IndexError:
+                pass
+        con = sqlite3.connect(str(database), **kwargs)
+        try:
+            if database == ':memory:' and self.image is not None:
+                con.deserialize(self.image)
+                applyPreamble(self.preamble, con)
+            else:
+                self.copyInto(con)
+        except BaseException:
+            con.close()
+            raise
+        return con
+
+    def copyInto(self, con):
+        """
+        Replace the contents of a database with the template, using the backup API, and apply the preamble to it.
+
+        Parameters:
+        con (sqlite3.Connection): the connection to copy the template into. It must not have a transaction in progress.
+        """
+        with self._lock:
+            self._source.backup(con)
+        applyPreamble(self.preamble, con)
+
+    def prewarm(self, count=None):
+        """
+        Open in-memory connections ahead of time, so `connect` can hand them out right away. They are opened with `check_same_thread=False`, so they can be prepared on one thread and used on another.
+
+        Parameters:
+        count (int): Default is None. Number of connections to add to the pool. By default, as many as it takes to hold `poolSize`.
+
+        Returns:
+        int: the number of connections added.
+        """
+        if count is None:
+            count = self.poolSize - len(self._pool)
+        for _ in range(max(count, 0)):
+            self._pool.append(self.connect(':memory:', check_same_thread=False))
+        return max(count, 0)
+
+    def close(self):
+        """
+        Close the template database and every pooled connection. Connections handed out already stay open, and `connect` raises `sqlite3.ProgrammingError` from now on.
+        """
+        while self._pool:
+            self._pool.popleft().close()
+        self.image = None
+        self._source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def schemaFixture(dbml, name=None, scope="function", poolSize=1, **options):
+    """
+    Make a pytest fixture that provides a connection to a fresh copy of the schema in every test. The `SchemaTemplate` behind it is built the first time the fixture is used, and the pool is refilled after every test. For example, in `conftest.py`: `db = schemaFixture('schema.dbml')`.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`.
+    name (str): Default is None. Name of the fixture. By default, the name it is assigned to in the test module or `conftest.py`.
+    scope (str): Default is "function". pytest scope of the connection.
+    poolSize (int): Default is 1. Connections kept ready, as for `SchemaTemplate`.
+    options: passed on to `SchemaTemplate`, e.g. `emulation` or `profile`.
+
+    Returns:
+    function: the pytest fixture.
+    """
+    import pytest
+    templates = []
+    def connection():
+        if not templates:
+            templates.append(SchemaTemplate(dbml, poolSize=poolSize, **options))
+        con = templates[0].connect()
+        try:
+            yield con
+        finally:
+            con.close()
+            templates[0].prewarm()
+    return pytest.fixture(scope=scope, name=name)(connection)
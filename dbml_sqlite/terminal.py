@@ -1,32 +1,387 @@
+import os
+import sys
+import glob
 import click
-from .core import toSQLite
+from time import perf_counter
+from itertools import chain
+from .core import iterPhased, explainColTypes, PHASES, PARSERS, PROFILES, Event
+from .coltypes import TYPE_REGISTRY, TypeRegistry, readColTypes
 import sqlite3
 
+# The cache, apply, load, diff and stats modules (and what they import) are only loaded by the options using them,
+# since the CLI is often invoked many times in a row from build scripts.
+
+def _parseLoad(ctx, param, value):
+    sources = {}
+    for item in value:
+        table, sep, path = item.partition('=')
+        if not sep or not table or not path:
+            raise click.BadParameter(f'"{item}" is not of the form TABLE=PATH.')
+        sources[table] = path
+    return sources
+
+def _parsePragmas(ctx, param, value):
+    values = {}
+    for item in value:
+        key, sep, setting = item.partition('=')
+        if not sep or not key or not setting:
+            raise click.BadParameter(f'"{item}" is not of the form NAME=VALUE.')
+        values[key.strip()] = setting.strip()
+    return values
+
+def _readColTypes(ctx, param, value):
+    if value == None:
+        return {}
+    try:
+        return readColTypes(value)
+    except (OSError, ValueError) as e:
+        raise click.BadParameter(str(e))
+
+def _parseColTypes(ctx, param, value):
+    values = {}
+    for item in value:
+        # Split on the last "=", since patterns may contain one.
+        name, sep, sqliteType = item.rpartition('=')
+        if not sep or not name.strip() or not sqliteType.strip():
+            raise click.BadParameter(f'"{item}" is not of the form NAME=TYPE.')
+        values[name.strip()] = sqliteType.strip()
+    try:
+        TypeRegistry({}, ()).update(values)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    return values
+
 @click.command()
 @click.argument('src', type=click.Path(exists=True))
 @click.option('--print/--no-print', '-p/-n', '_print', default=True, help='Whether to print output to console.', show_default=True)
 @click.option('--write', '-w', type=click.Path(writable=True), help='(Optional) File you want output written to.')
-@click.option('--execute', '-x', type=click.Path(writable=True), help='(Optional) SQLite database file for executing output DDL on. Will create file if it doesn\'t exist.')
-@click.option('--full/--half', '-f/-h', default=True, help='Full emulation mode (separate tables) or half emulation mode (check statements) for any enums defined in your dbml.', show_default=True)
+@click.option('--execute', '-x', multiple=True, type=click.Path(writable=True), help='(Optional, repeatable) SQLite database file for executing output DDL on. Will create file if it doesn\'t exist. Given several times or as a glob pattern, the schema is built once and copied into every new or empty database, using --workers processes.')
+@click.option('--full', '-f', 'emulation', flag_value='full', default=True, help='Full emulation mode for any enums defined in your dbml: separate tables, referenced by label.  [default]')
+@click.option('--half', '-h', 'emulation', flag_value='half', help='Half emulation mode for any enums defined in your dbml: check statements.')
+@click.option('--integer', '-e', 'emulation', flag_value='integer', help='Integer emulation mode for any enums defined in your dbml: separate tables, referenced by integer id.')
 @click.option('--if-table-exists', '-t', 'table', is_flag=True, help='(Optional) Add IF NOT EXISTS language to CREATE TABLE statements.')
 @click.option('--if-index-exists', '-i', 'index', is_flag=True, help='(Optional) Add IF NOT EXISTS language to CREATE INDEX statements.')
-def cli(src, _print, write, execute, full, table, index):
-    """Converts DBML contained in SRC file to SQLite DDL and does with that string of SQLite DDL what you want."""
-    o = None
+@click.option('--workers', '-j', type=click.IntRange(min=1), default=1, help='Number of processes used to convert a directory of dbml files, and to provision several --execute databases.', show_default=True)
+@click.option('--cache', '-c', 'cacheDir', type=click.Path(file_okay=False, writable=True), help='(Optional) Directory for caching generated DDL between runs. Unchanged files are not parsed again.')
+@click.option('--bootstrap', '-b', is_flag=True, help='(Optional) With --execute, relax journal_mode, synchronous and foreign_keys PRAGMAs while creating the schema, then restore them.')
+@click.option('--label-views', 'labelViews', is_flag=True, help='(Optional) With --integer, create a view for every table with enum columns that shows their labels instead of their ids.')
+@click.option('--phase', type=click.Choice(PHASES), help='(Optional) Only output the statements of one phase: tables and enums ("schema") or indexes ("indexes").')
+@click.option('--load', '-l', 'sources', multiple=True, callback=_parseLoad, metavar='TABLE=PATH', help='(Optional, repeatable) With --execute, bulk load a .csv or .jsonl file into TABLE after creating the tables and before creating the indexes.')
+@click.option('--batch-size', 'batchSize', type=click.IntRange(min=1), default=10000, help='Rows per executemany batch when loading data.', show_default=True)
+@click.option('--parser', type=click.Choice(PARSERS), default='pydbml', help='Parser for the dbml. "native" is a much faster built-in parser for the subset of DBML this tool converts; it falls back to PyDBML for anything else.', show_default=True)
+@click.option('--fk-indexes', '-k', 'fkIndexes', is_flag=True, help='(Optional) Create an index for every foreign key column that no index in the dbml covers, and report which ones were added.')
+@click.option('--sqlite-version', 'sqliteVersion', metavar='VERSION', help='(Optional) Oldest SQLite version the output must run on, e.g. 3.31.1. Tables and indexes using options it lacks (STRICT, WITHOUT ROWID, partial or expression indexes) are refused. Defaults to the installed SQLite with --execute.')
+@click.option('--profile', 'pragmaProfile', type=click.Choice(list(PROFILES)), help='(Optional) Start the output with the PRAGMAs of this profile. A Project block in the dbml can choose one with sqlite_profile, and set single PRAGMAs with sqlite_NAME keys.')
+@click.option('--pragma', 'pragmaValues', multiple=True, callback=_parsePragmas, metavar='NAME=VALUE', help='(Optional, repeatable) Set a PRAGMA in the preamble, overriding the profile and the Project block.')
+@click.option('--types', 'typesFile', type=click.Path(exists=True, dir_okay=False), callback=_readColTypes, help='(Optional) JSON file mapping column types to SQLite types, added to the built-in rules. Keys starting with "re:" are regular expressions the whole type must match.')
+@click.option('--type', 'typeValues', multiple=True, callback=_parseColTypes, metavar='NAME=TYPE', help='(Optional, repeatable) Map a column type, or with a "re:" prefix a pattern, to a SQLite type, overriding the built-in rules and --types.')
+@click.option('--explain-types', 'explainTypes', is_flag=True, help='(Optional) Print the SQLite type every column type in SRC maps to, and the rule that decided it, to stderr.')
+@click.option('--stats', '-s', 'showStats', is_flag=True, help='(Optional) Print how long parsing, emitting, executing and loading took to stderr when done.')
+@click.option('--watch', is_flag=True, help='(Optional) Keep running and convert SRC again whenever one of its .dbml files changes, reusing the output of the unchanged ones. With --execute, each change is migrated into the database.')
+@click.option('--debounce', type=click.FloatRange(min=0), default=0.3, help='Seconds the files must stay unchanged before --watch converts them again, so a burst of saves causes one rebuild.', show_default=True)
+@click.option('--cprofile', 'profilePath', type=click.Path(dir_okay=False, writable=True), help='(Optional) File to dump cProfile statistics of the whole run to, for reading with pstats or snakeviz.')
+def cli(src, _print, write, execute, emulation, table, index, workers, cacheDir, bootstrap, labelViews, phase, sources, batchSize, parser, fkIndexes, sqliteVersion, pragmaProfile, pragmaValues, typesFile, typeValues, explainTypes, showStats, watch, debounce, profilePath):
+    """Converts DBML contained in SRC file to SQLite DDL and does with that string of SQLite DDL what you want.
+
+    Run `dbml_sqlite migrate --help` to update an existing database instead."""
+    targets = list(execute)
+    execute = None
+    if len(targets) == 1 and not glob.has_magic(targets[0]):
+        execute = targets.pop()
+    if sources and execute == None:
+        raise click.UsageError('--load requires exactly one --execute database.' if targets else '--load requires --execute.')
+    if watch and (targets or sources):
+        raise click.UsageError('--watch supports a single --execute database and no --load.')
+    if sqliteVersion == None and (execute != None or targets):
+        sqliteVersion = sqlite3.sqlite_version
+    cache = None
+    shared = (click.get_current_context().obj or {}).get('cache')
+    if cacheDir != None:
+        from .cache import DDLCache
+        cache = DDLCache(cacheDir)
+    elif shared != None:
+        # Passed in by `dbml_sqlite serve`, which keeps the output of every file it converted between requests.
+        cache = shared
+    elif watch:
+        # Keeps the output of every file in memory, so a rebuild only converts the files that changed.
+        from .cache import MemoryCache
+        cache = MemoryCache()
+    stats = None
+    if showStats:
+        from .stats import Stats
+        stats = Stats()
+    observer = stats
+    covered = []
+    if fkIndexes:
+        def observer(event):
+            if event.kind in ('fkindex', 'cache'):
+                covered.append(event)
+            if stats != None:
+                stats(event)
+    # The rules are only extended for this run, which matters under `dbml_sqlite serve`.
+    with TYPE_REGISTRY.extended({**typesFile, **typeValues}):
+        if explainTypes:
+            _explainTypes(src, parser)
+        profile = None
+        if profilePath != None:
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            converted = _convert(src, _print, write, execute, emulation, table, index, workers, cache, bootstrap, phase, sources, batchSize, observer, parser, fkIndexes, sqliteVersion, pragmaProfile, pragmaValues, labelViews, targets)
+        finally:
+            if profile != None:
+                profile.disable()
+                profile.dump_stats(profilePath)
+        if fkIndexes and converted and phase != 'schema':
+            added = _fkIndexReport(covered, parser)
+            for name in added:
+                click.echo(f'Added an index on {name} to cover its foreign key.', err=True)
+            if not added:
+                click.echo('Every foreign key column is already covered by an index.', err=True)
+        if stats != None:
+            click.echo(stats.format(), err=True)
+            if cache != None:
+                click.echo(' '.join(f'{k}={v}' for k, v in cache.stats().items()), err=True)
+        if watch:
+            def rebuild():
+                return _convert(src, _print, write, None, emulation, table, index, workers, cache, bootstrap, phase, {}, batchSize, observer, parser, fkIndexes, sqliteVersion, pragmaProfile, pragmaValues, labelViews)
+            _watch(src, debounce, rebuild, execute, emulation, parser, fkIndexes, labelViews)
+    # Exits with 1 like `dbml_sqlite client` does when the DBML didn't convert; --watch only stops when asked to.
+    if converted != True and not watch:
+        click.get_current_context().exit(1)
+    return True
+
+def _explainTypes(src, parser):
+    try:
+        matches = explainColTypes(src, parser)
+    except Exception:
+        # Reported by the conversion that follows.
+        return
+    for match in matches:
+        if match.sqliteType == None:
+            click.secho(f'{match.colType} -> ? (no rule matches)', fg="red", err=True)
+        else:
+            click.echo(f'{match.colType} -> {match.sqliteType} ({match.rule})', err=True)
+
+def _watch(src, debounce, rebuild, execute, mode, parser, fkIndexes, labelViews):
+    from .watch import watchDBML
+    click.echo(f'Watching {src} for changes. Press Ctrl+C to stop.', err=True)
+    try:
+        for changed in watchDBML(src, debounce=debounce):
+            click.echo(f'Changed: {", ".join(changed)}', err=True)
+            start = perf_counter()
+            if not rebuild():
+                continue
+            click.echo(f'Converted again in {perf_counter() - start:.3f}s.', err=True)
+            if execute != None:
+                _migrateWatched(src, execute, mode, parser, fkIndexes, labelViews)
+    except KeyboardInterrupt:
+        pass
+
+def _migrateWatched(src, database, mode, parser, fkIndexes, labelViews):
+    # Brings the database up to date like `migrate --apply`, since running the full DDL again would skip changed tables.
+    from .diff import diffSQLite, applyMigration
+    try:
+        statements = diffSQLite(src, database, mode, parser=parser, fkIndexes=fkIndexes, labelViews=labelViews)
+        if statements:
+            applyMigration(statements, database)
+    except sqlite3.Error as e:
+        click.secho(f'Error migrating {database}: {e}', fg="red", bold=True)
+        return
+    except ValueError as e:
+        click.secho(f'Error generating SQLite DDL from dbml. Did you provide a valid dbml file?\n{e}', fg="red", bold=True)
+        return
+    if statements:
+        click.echo(f'Applied {len(statements)} migration statements to {database}.', err=True)
+    else:
+        click.echo(f'{database} is already up to date.', err=True)
+
+def _convert(src, _print, write, execute, mode, table, index, workers, cache, bootstrap, phase, sources, batchSize, observer, parser, fkIndexes=False, sqliteVersion=None, profile=None, pragmas=None, labelViews=False, targets=None):
     try:
-        mode = 'full' if full else 'half'
-        o = toSQLite(src, mode, tableExists=table, indexExists=index)
+        statements = iterPhased(src, mode, tableExists=table, indexExists=index, workers=workers, cache=cache, observer=observer, parser=parser, fkIndexes=fkIndexes, sqliteVersion=sqliteVersion, profile=profile, pragmas=pragmas, labelViews=labelViews)
+        # Pull the first statement before opening any outputs so a bad SRC doesn't leave empty files behind.
+        first = next(statements, None)
+        statements = chain([first] if first != None else [], statements)
+    except ValueError as e:
+        click.secho(f'Error generating SQLite DDL from dbml. Did you provide a valid dbml file?\n{e}', fg="red", bold=True)
+        return
     except:
         click.secho('Error generating SQLite DDL from dbml. Did you provide a valid dbml file?', fg="red", bold=True)
-    else:
-        if _print:
-            click.echo(o)
-        if write != None:
-            with open(write, 'w') as f:
-                f.write(o)
+        return
+    # Output goes to a temporary file that only replaces `write` once complete, so a failed run, e.g. a bad save under
+    # --watch, leaves the previous output in place.
+    partial = f'{write}.{os.getpid()}.tmp' if write != None else None
+    f = open(partial, 'w') if write != None else None
+    complete = False
+    provisioned = True
+    preamble = []
+    deferred = []
+    def emit(tagged):
+        for p, statement in tagged:
+            if phase != None and p != phase:
+                continue
+            if _print:
+                click.echo(statement, nl=False)
+            if f != None:
+                f.write(statement)
+            if p == 'pragmas':
+                preamble.append(statement)
+            elif sources and p != 'schema':
+                deferred.append(statement)
+            else:
+                yield statement
+    try:
         if execute != None:
+            from .apply import applyStatements, applyPreamble, splitPreamble, pragmas as bootstrapPragmas
+            from .load import loadRows
             con = sqlite3.connect(execute)
-            with con:
-                con.executescript(o)
-            con.close()
+            try:
+                # PRAGMAs can't be set inside the transaction the statements run in, so the preamble goes first on its own.
+                head, statements = splitPreamble(statements)
+                for _ in emit(('pragmas', statement) for statement in head):
+                    pass
+                if any(t.sql == 'VACUUM;\n' for t in applyPreamble(preamble, con, observer=observer)):
+                    click.echo('Ran VACUUM so the changed page_size or auto_vacuum takes effect.', err=True)
+                with bootstrapPragmas(con, bootstrap):
+                    applyStatements(emit(statements), con, observer=observer)
+                    for name, source in sources.items():
+                        start = perf_counter()
+                        try:
+                            count = loadRows(con, name, source, batchSize)
+                        except (OSError, ValueError) as e:
+                            click.secho(f'Error loading "{source}" into {name}: {e}', fg="red", bold=True)
+                            return
+                        if observer != None:
+                            observer(Event('load', name, source, perf_counter() - start, count))
+                        click.echo(f'Loaded {count} rows into {name}.', err=True)
+                    applyStatements(deferred, con, observer=observer)
+            finally:
+                con.close()
+        elif targets:
+            from .provision import provisionStatements
+            results = provisionStatements(list(emit(statements)), targets, preamble, bootstrap, workers, observer)
+            for result in results:
+                if result.ok:
+                    click.echo(f'Provisioned {result.target} ({"cloned from the template" if result.method == "clone" else "executed the statements"}).', err=True)
+                else:
+                    click.secho(f'Error provisioning {result.target}: {result.error}', fg="red", bold=True, err=True)
+            click.echo(f'Provisioned {sum(result.ok for result in results)} of {len(results)} databases.', err=True)
+            provisioned = all(result.ok for result in results)
+        else:
+            for _ in emit(statements):
+                pass
+        complete = True
+    except sqlite3.Error as e:
+        click.secho(f'Error executing SQLite DDL: {e}', fg="red", bold=True)
+        return
+    except ValueError as e:
+        click.secho(f'Error generating SQLite DDL from dbml. Did you provide a valid dbml file?\n{e}', fg="red", bold=True)
+        return
+    except:
+        click.secho('Error generating SQLite DDL from dbml. Did you provide a valid dbml file?', fg="red", bold=True)
+        return
+    finally:
+        if f != None:
+            f.close()
+            if complete:
+                os.replace(partial, write)
+            else:
+                os.remove(partial)
+    if _print:
+        click.echo()
+    # The output is complete even when some databases failed, but the run didn't succeed.
+    if not provisioned:
+        return
+    return True
+
+def _fkIndexReport(events, parser):
+    # Files served from the cache weren't converted, so they are analyzed again to report their foreign key indexes.
+    from pathlib import Path
+    from .core import parseDBMLFile, foreignKeyIndexes
+    added = []
+    for event in events:
+        if event.kind == 'fkindex':
+            added.append(event.name)
+        else:
+            for table in parseDBMLFile(Path(event.file), parser).tables:
+                added.extend(f'{table.name}({", ".join(fk.columns)})' for fk in foreignKeyIndexes(table))
+    return added
+
+@click.command()
+@click.argument('src', type=click.Path(exists=True))
+@click.argument('database', type=click.Path(exists=True, dir_okay=False, writable=True))
+@click.option('--print/--no-print', '-p/-n', '_print', default=True, help='Whether to print the migration statements to console.', show_default=True)
+@click.option('--write', '-w', type=click.Path(writable=True), help='(Optional) File you want the migration statements written to.')
+@click.option('--apply', '-a', '_apply', is_flag=True, help='(Optional) Execute the migration statements on DATABASE in a single transaction.')
+@click.option('--full', '-f', 'emulation', flag_value='full', default=True, help='Full emulation mode for any enums defined in your dbml: separate tables, referenced by label.  [default]')
+@click.option('--half', '-h', 'emulation', flag_value='half', help='Half emulation mode for any enums defined in your dbml: check statements.')
+@click.option('--integer', '-e', 'emulation', flag_value='integer', help='Integer emulation mode for any enums defined in your dbml: separate tables, referenced by integer id.')
+@click.option('--drop-tables', '-d', 'dropTables', is_flag=True, help='(Optional) Drop tables in DATABASE that are not in the dbml.')
+@click.option('--parser', type=click.Choice(PARSERS), default='pydbml', help='Parser for the dbml. "native" is a much faster built-in parser for the subset of DBML this tool converts; it falls back to PyDBML for anything else.', show_default=True)
+@click.option('--fk-indexes', '-k', 'fkIndexes', is_flag=True, help='(Optional) Expect an index on every foreign key column that no index in the dbml covers, as created by `dbml_sqlite --fk-indexes`.')
+@click.option('--label-views', 'labelViews', is_flag=True, help='(Optional) With --integer, create or update a view for every table with enum columns that shows their labels, as created by `dbml_sqlite --label-views`.')
+@click.option('--types', 'typesFile', type=click.Path(exists=True, dir_okay=False), callback=_readColTypes, help='(Optional) JSON file mapping column types to SQLite types, added to the built-in rules, as for `dbml_sqlite --types`. Keys starting with "re:" are regular expressions the whole type must match.')
+@click.option('--type', 'typeValues', multiple=True, callback=_parseColTypes, metavar='NAME=TYPE', help='(Optional, repeatable) Map a column type, or with a "re:" prefix a pattern, to a SQLite type, overriding the built-in rules and --types.')
+def migrate(src, database, _print, write, _apply, emulation, dropTables, parser, fkIndexes, labelViews, typesFile, typeValues):
+    """Compares the DBML in SRC with the existing SQLite DATABASE and generates only the statements needed to bring DATABASE up to date."""
+    from .diff import diffSQLite, applyMigration
+    try:
+        with TYPE_REGISTRY.extended({**typesFile, **typeValues}):
+            statements = diffSQLite(src, database, emulation, dropTables=dropTables, parser=parser, fkIndexes=fkIndexes, labelViews=labelViews)
+    except sqlite3.Error as e:
+        click.secho(f'Error reading SQLite database: {e}', fg="red", bold=True)
+        return
+    except ValueError as e:
+        click.secho(f'Error generating SQLite DDL from dbml. Did you provide a valid dbml file?\n{e}', fg="red", bold=True)
+        return
+    except:
+        click.secho('Error generating SQLite DDL from dbml. Did you provide a valid dbml file?', fg="red", bold=True)
+        return
+    o = "".join(statements)
+    if _print:
+        click.echo(o)
+    if write != None:
+        with open(write, 'w') as f:
+            f.write(o)
+    if _apply and statements:
+        try:
+            applyMigration(statements, database)
+        except sqlite3.Error as e:
+            click.secho(f'Error executing SQLite DDL: {e}', fg="red", bold=True)
+
+@click.command()
+@click.option('--socket', 'socketPath', type=click.Path(dir_okay=False), help='(Optional) Unix socket to listen on. Defaults to $DBML_SQLITE_SOCKET, or dbml_sqlite-USER.sock in the temporary directory.')
+@click.option('--stdio', is_flag=True, help='(Optional) Read requests from stdin and answer on stdout instead of listening on a socket.')
+def serve(socketPath, stdio):
+    """Keeps running and answers convert, validate and apply requests from `dbml_sqlite client`, keeping the output of every converted file in memory between requests.
+
+    Requests and answers are single lines of JSON, see the README."""
+    from .serve import serveSocket, serveStdio, defaultSocket
+    if stdio:
+        serveStdio()
+        return
+    path = socketPath or defaultSocket()
+    click.echo(f'Listening on {path}. Stop with `dbml_sqlite client --shutdown` or Ctrl+C.', err=True)
+    try:
+        serveSocket(path)
+    except OSError as e:
+        click.secho(f'Error starting the server: {e}', fg="red", bold=True, err=True)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+SUBCOMMANDS = {
+    'migrate': migrate,
+    'serve': serve,
+}
 
+def main(args=None):
+    """Runs the `dbml_sqlite` command line, once `dbml_sqlite.__main__.main` has handed `dbml_sqlite client ...` to the client. `dbml_sqlite migrate ...` and `dbml_sqlite serve ...` run those subcommands; anything else is handed to `cli`. A SRC named like a subcommand is converted when `--` comes first, as in `dbml_sqlite -- migrate`."""
+    args = sys.argv[1:] if args is None else list(args)
+    if args and args[0] == '--':
+        # Left in for click, which then takes everything after it as arguments, not options.
+        return cli.main(args, prog_name='dbml_sqlite')
+    if args and args[0] in SUBCOMMANDS:
+        return SUBCOMMANDS[args[0]].main(args[1:], prog_name=f'dbml_sqlite {args[0]}')
+    return cli.main(args, prog_name='dbml_sqlite')
@@ -0,0 +1,57 @@
+import time
+from pathlib import Path
+
+def snapshotDBML(dbml):
+    """
+    Record the modification time and size of the `.dbml` files `dbml` refers to, so a later snapshot tells whether any of them changed.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`.
+
+    Returns:
+    dict: the path of every file as a str mapped to its `(mtime_ns, size)`. Files that can't be read, and a `dbml` that doesn't exist, are left out.
+    """
+    p = Path(dbml)
+    snapshot = {}
+    for target in (sorted(p.glob('*.dbml')) if p.is_dir() else [p]):
+        try:
+            st = target.stat()
+        except OSError:
+            continue
+        snapshot[str(target)] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+def watchDBML(dbml, interval=0.5, debounce=0.3, stop=None):
+    """
+    Poll `.dbml` files for changes, without depending on any file system notification service. A change is only reported once the files stayed the same for `debounce` seconds, so an editor saving several files at once, or one file in several writes, causes a single rebuild.
+
+    Parameters:
+    dbml (str): a `.dbml` file or a directory containing such files, as for `toSQLite`. Files added to or removed from the directory count as changes.
+    interval (float): Default is 0.5. Seconds between polls.
+    debounce (float): Default is 0.3. Seconds the files must stay unchanged before the change is reported.
+    stop (threading.Event): Default is None. Watching ends once it is set. Without one, it goes on until the consumer stops iterating.
+
+    Yields:
+    list of str: the files added, changed or removed since the last report, sorted.
+    """
+    wait = stop.wait if stop is not None else _sleep
+    last = snapshotDBML(dbml)
+    while not wait(interval):
+        current = snapshotDBML(dbml)
+        if current == last:
+            continue
+        while not wait(debounce):
+            settled = snapshotDBML(dbml)
+            if settled == current:
+                break
+            current = settled
+        else:
+            return
+        changed = sorted(target for target in set(last) | set(current) if last.get(target) != current.get(target))
+        last = current
+        yield changed
+
+def _sleep(seconds):
+    # Stands in for Event.wait when there is no stop event: waits, and reports that nobody asked to stop.
+    time.sleep(seconds)
+    return False
@@ -0,0 +1,21 @@
+import os
+import sqlite3
+import pytest
+from click.testing import CliRunner
+
+@pytest.fixture
+def runner():
+    """A CliRunner that captures stderr apart from stdout, so `result.stdout` and `result.stderr` can be checked separately. click 8.2 and later always do; older versions only with `mix_stderr=False`, which newer ones no longer accept."""
+    try:
+        return CliRunner(mix_stderr=False)
+    except TypeError:
+        return CliRunner()
+
+def tables(db):
+    """The sorted names of the tables in `db`, a connection or the path of a database file, leaving out SQLite's own like `sqlite_sequence`."""
+    con = sqlite3.connect(db) if isinstance(db, (str, os.PathLike)) else db
+    try:
+        return sorted(r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"))
+    finally:
+        if con is not db:
+            con.close()
@@ -0,0 +1,74 @@
+import asyncio
+import sqlite3
+import threading
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from dbml_sqlite import toSQLite, applySQLite, toSQLiteAsync, applySQLiteAsync, applyStatementsAsync, configureAsync, Stats
+from dbml_sqlite import aio
+from .conftest import tables
+
+# Runs until interrupted: the count needs every row of an endless recursive CTE.
+ENDLESS = 'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c;\n'
+
+def test_toSQLiteAsync():
+    async def main():
+        return await asyncio.gather(toSQLiteAsync('./tests/test.dbml'), toSQLiteAsync('./tests/test.dbml', emulation='half', join=False))
+    full, half = asyncio.run(main())
+    assert full == toSQLite('./tests/test.dbml')
+    assert half == toSQLite('./tests/test.dbml', emulation='half', join=False)
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        assert asyncio.run(toSQLiteAsync('./tests/test.dbml', profile='read-heavy', executor=pool)) == toSQLite('./tests/test.dbml', profile='read-heavy')
+    with pytest.raises(ValueError):
+        asyncio.run(toSQLiteAsync('./tests/test.dbml', emulation='none'))
+
+def test_applySQLiteAsync(tmp_path):
+    stats = Stats()
+    paths = [tmp_path / f'{i}.db' for i in range(3)]
+    async def main():
+        return await asyncio.gather(*(applySQLiteAsync('./tests/test.dbml', path, profile='write-heavy', observer=stats) for path in paths))
+    results = asyncio.run(main())
+    assert [t.sql for t in results[0]] == [t.sql for t in applySQLite('./tests/test.dbml', tmp_path / 'sync.db', profile='write-heavy')]
+    for path in paths:
+        assert tables(path) == ['contact', 'message', 'message_status', 'zip_code']
+    assert stats.summary()['execute']['events'] == 3 * len(results[0])
+    con = sqlite3.connect(tmp_path / 'shared.db', check_same_thread=False)
+    asyncio.run(applySQLiteAsync('./tests/test.dbml', con))
+    assert con.execute('SELECT count(*) FROM zip_code').fetchone()[0] == 5
+    con.close()
+
+def test_apply_limit(tmp_path, monkeypatch):
+    running = []
+    peak = []
+    lock = threading.Lock()
+    def fake(database, statements, *args):
+        with lock:
+            running.append(database)
+            peak.append(len(running))
+        threading.Event().wait(0.05)
+        with lock:
+            running.remove(database)
+        return []
+    monkeypatch.setattr(aio, '_applyOnThread', fake)
+    configureAsync(applyLimit=2)
+    try:
+        async def main():
+            await asyncio.gather(*(applyStatementsAsync([], tmp_path / f'{i}.db') for i in range(6)))
+        asyncio.run(main())
+        assert max(peak) == 2
+    finally:
+        configureAsync(applyLimit=aio.APPLY_LIMIT)
+    with pytest.raises(ValueError, match='applyLimit'):
+        configureAsync(applyLimit=0)
+
+def test_cancel_rolls_back(tmp_path):
+    path = tmp_path / 'app.db'
+    statements = ['CREATE TABLE a (x INTEGER);\n', 'INSERT INTO a VALUES (1);\n', ENDLESS, 'CREATE TABLE b (x INTEGER);\n']
+    async def main():
+        task = asyncio.create_task(applyStatementsAsync(statements, path))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The database is free again right after the cancellation.
+        return tables(path)
+    assert asyncio.run(main()) == []
@@ -0,0 +1,56 @@
+import pytest
+import sqlite3
+from dbml_sqlite import applySQLite, applyStatements, toSQLite
+from .conftest import tables
+
+def test_applySQLite():
+    con = sqlite3.connect(':memory:')
+    timings = applySQLite('./tests/test.dbml', con)
+    assert tables(con) == ['contact', 'message', 'message_status', 'zip_code']
+    assert ''.join(t.sql for t in timings) == toSQLite('./tests/test.dbml')
+    assert all(t.seconds >= 0 for t in timings)
+    assert con.execute('SELECT count(*) FROM message_status').fetchone()[0] == 5
+    assert not con.in_transaction
+    con.close()
+
+def test_apply_rolls_back():
+    con = sqlite3.connect(':memory:')
+    with pytest.raises(sqlite3.OperationalError):
+        applyStatements(['CREATE TABLE a (x INTEGER);\n', 'CREATE TABLE a (x INTEGER);\n'], con)
+    assert tables(con) == []
+    def failing():
+        yield 'CREATE TABLE b (x INTEGER);\n'
+        raise ValueError('conversion failed')
+    with pytest.raises(ValueError):
+        applyStatements(failing(), con)
+    assert tables(con) == []
+    con.close()
+
+def test_apply_bootstrap(tmp_path):
+    db = tmp_path / 'boot.db'
+    con = sqlite3.connect(str(db))
+    con.execute('PRAGMA foreign_keys = 1')
+    seen = []
+    def watch():
+        seen.append(con.execute('PRAGMA foreign_keys').fetchone()[0])
+        yield 'CREATE TABLE a (x INTEGER);\n'
+    applyStatements(watch(), con, bootstrap=True)
+    assert seen == [0]
+    assert con.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+    assert con.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    with pytest.raises(ValueError):
+        applyStatements([], con, bootstrap={'journal_mode': 'wal; DROP TABLE a'})
+    con.close()
+
+def test_apply_batch_inserts(tmp_path):
+    con = sqlite3.connect(':memory:')
+    executed = []
+    con.set_trace_callback(executed.append)
+    applySQLite('./tests/test.dbml', con)
+    # Enum rows are bound to one prepared statement rather than parsed from a multi-row literal.
+    assert executed.count("INSERT INTO message_status(type, seq) VALUES ('unsent', 1) ON CONFLICT DO NOTHING") == 1
+    assert not any(statement.startswith('INSERT INTO message_status(type, seq) VALUES\n') for statement in executed)
+    assert con.execute('SELECT type FROM message_status ORDER BY seq').fetchall() == [('unsent',), ('pending',), ('sent',), ('delivered',), ('failed',)]
+    applySQLite('./tests/test.dbml', con)
+    assert con.execute('SELECT count(*) FROM message_status').fetchone()[0] == 5
+    con.close()
@@ -0,0 +1,27 @@
+import json
+from pydbml import PyDBML
+from benchmarks.synthetic import syntheticDBML
+from benchmarks.run import runBenchmark, main
+
+def test_synthetic_schema():
+    parsed = PyDBML(syntheticDBML(tables=4, columns=3, enums=2, enumItems=3, refs=2, indexes=2))
+    assert len(parsed.tables) == 4
+    assert len(parsed.enums) == 2
+    assert sum(len(t.refs) for t in parsed.tables) == 6
+    assert all(len(t.indexes) == 2 for t in parsed.tables)
+    assert syntheticDBML(tables=3) == syntheticDBML(tables=3)
+
+def test_report(tmp_path):
+    report = runBenchmark(tables=3, columns=3, enums=1, enumItems=2, repeat=1)
+    assert report['meta']['counts']['tables'] == 3
+    for stage in ('parse', 'iterPhased', 'emit', 'parseNative', 'processColumn', 'processEnum', 'processTable', 'processRef', 'processIndex', 'join', 'applyStatements'):
+        assert report['stages'][stage]['seconds'] >= 0
+        assert report['stages'][stage]['peak_bytes'] >= 0
+    out = tmp_path / 'bench.json'
+    main(['--tables', '2', '--repeat', '1', '--output', str(out)])
+    assert json.loads(out.read_text())['meta']['schema']['tables'] == 2
+
+def test_report_emulation_modes():
+    counts = {mode: runBenchmark(tables=2, columns=3, enums=2, enumItems=2, repeat=1, emulation=mode)['meta']['counts'] for mode in ('full', 'integer', 'half')}
+    # The enum tables and their rows are part of the emitted schema in both table modes.
+    assert counts['integer']['statements'] == counts['full']['statements'] == counts['half']['statements'] + 4
@@ -0,0 +1,103 @@
+import pytest
+from pydbml import PyDBML
+from dbml_sqlite import toSQLite, processFile, DDLCache
+
+def test_cache_hit_skips_parse(tmp_path, monkeypatch):
+    src = tmp_path / 'src.dbml'
+    src.write_text('Table t {\n    a integer\n    b text\n\n    indexes {\n        (a, b)\n    }\n}\n')
+    cache = DDLCache(tmp_path / 'cache')
+    first = toSQLite(str(src), cache=cache)
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['entries'] == 1
+    def fail(*args, **kwargs):
+        raise AssertionError('parsed despite cache hit')
+    monkeypatch.setattr(PyDBML, 'parse_file', fail)
+    assert toSQLite(str(src), cache=cache) == first
+    assert cache.stats()['hits'] == 1
+    with pytest.raises(AssertionError):
+        toSQLite(str(src), tableExists=False, cache=cache)
+
+def test_cache_hit_keeps_project_settings(tmp_path, monkeypatch):
+    (tmp_path / 'a.dbml').write_text("Project app {\n    sqlite_journal_mode: 'wal'\n}\n\nTable a {\n    id integer\n}\n")
+    (tmp_path / 'b.dbml').write_text('Table b {\n    id integer\n}\n')
+    cache = DDLCache(tmp_path / 'cache')
+    expected = {str(tmp_path): toSQLite(str(tmp_path)), str(tmp_path / 'a.dbml'): toSQLite(str(tmp_path / 'a.dbml'))}
+    for path in expected:
+        assert toSQLite(path, cache=cache, workers=2) == expected[path]
+    assert 'PRAGMA journal_mode = wal;' in expected[str(tmp_path)]
+    hits = cache.stats()['hits']
+    def fail(*args, **kwargs):
+        raise AssertionError('parsed despite cache hit')
+    monkeypatch.setattr(PyDBML, 'parse_file', fail)
+    for path in expected:
+        assert toSQLite(path, cache=cache) == expected[path]
+    assert cache.stats()['hits'] == hits + 3
+
+def test_cache_directory_mode(tmp_path):
+    for i in range(3):
+        (tmp_path / f'f{i}.dbml').write_text(f'Table t{i} {{\n    id integer\n}}\n')
+    cache = DDLCache(tmp_path / 'cache')
+    uncached = toSQLite(str(tmp_path))
+    assert toSQLite(str(tmp_path), cache=cache, workers=2) == uncached
+    assert toSQLite(str(tmp_path), cache=cache) == uncached
+    assert cache.stats()['hits'] == 3
+    assert cache.stats()['stores'] == 3
+
+def test_cache_eviction(tmp_path):
+    cache = DDLCache(tmp_path, maxBytes=100)
+    cache.put('aa' + '0' * 62, ['x' * 60])
+    cache.put('bb' + '0' * 62, ['y' * 60])
+    stats = cache.stats()
+    assert stats['entries'] == 1
+    assert stats['evictions'] == 1
+    cache.clear()
+    assert cache.stats()['entries'] == 0
+
+def test_cache_put_scans_only_when_over_budget(tmp_path, monkeypatch):
+    cache = DDLCache(tmp_path, maxBytes=1000)
+    scans = []
+    entries = cache._entries
+    def counted():
+        scans.append(1)
+        return entries()
+    monkeypatch.setattr(cache, '_entries', counted)
+    for i in range(10):
+        cache.put(f'{i:02d}' + '0' * 62, ['x' * 40])
+    assert len(scans) == 1
+    # Replacing an entry doesn't count it twice.
+    for _ in range(5):
+        cache.put('00' + '0' * 62, ['x' * 40])
+    assert len(scans) == 1
+    for i in range(10, 30):
+        cache.put(f'{i:02d}' + '0' * 62, ['x' * 40])
+    assert len(scans) > 1
+    assert cache.stats()['bytes'] <= 1000
+    assert cache.evictions > 0
+
+def test_versions_without_importlib_metadata(monkeypatch):
+    from importlib.metadata import version
+    import sys
+    pytest.importorskip('pkg_resources')
+    from dbml_sqlite.cache import _distributionVersion
+    expected = version('pydbml')
+    # As on Python 3.7, where neither importlib.metadata nor the backport may be there.
+    monkeypatch.setitem(sys.modules, 'importlib.metadata', None)
+    monkeypatch.setitem(sys.modules, 'importlib_metadata', None)
+    assert _distributionVersion('pydbml') == expected
+    assert _distributionVersion('no-such-distribution') == 'unknown'
+
+def test_index_names_are_stable():
+    o = processFile('./tests/abc.dbml', 'full')
+    assert o == processFile('./tests/abc.dbml', 'full')
+    assert 'CREATE INDEX IF NOT EXISTS _' in o
+
+def test_cache_keeps_batch_inserts(tmp_path):
+    cache = DDLCache(tmp_path / 'cache')
+    first = toSQLite('./tests/test.dbml', cache=cache, join=False)
+    def batches(statements):
+        return [(s.sql, s.rows) for s in statements if hasattr(s, 'rows')]
+    cached = toSQLite('./tests/test.dbml', cache=cache, join=False)
+    assert cache.stats()['hits'] == 1
+    assert cached == first and batches(cached) == batches(first) != []
+    # Worker processes hand them back pickled.
+    assert batches(toSQLite('./tests', workers=2, join=False)) == batches(toSQLite('./tests', join=False))
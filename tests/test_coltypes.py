@@ -0,0 +1,142 @@
+import json
+import pytest
+from dbml_sqlite import TypeRegistry, TYPE_REGISTRY, TypeMatch, normalizeColType, readColTypes, coerceColType, explainColTypes, toSQLite, MemoryCache, cli
+
+DBML = '''Table things {
+  id int(11) [pk]
+  price "decimal(10, 2)"
+  tags "text[]"
+  shape geometry
+  name varchar(80)
+}
+'''
+
+@pytest.fixture
+def things(tmp_path):
+    path = tmp_path / 'things.dbml'
+    path.write_text(DBML)
+    return path
+
+def test_normalizeColType():
+    assert normalizeColType('decimal( 10, 2 )') == 'DECIMAL(10,2)'
+    assert normalizeColType('"text []"') == 'TEXT[]'
+    assert normalizeColType('  double\tprecision ') == 'DOUBLE PRECISION'
+
+@pytest.mark.parametrize('colType,sqliteType', [
+    ('varchar(255)', 'TEXT'),
+    ('VarChar ( 255 )', 'TEXT'),
+    ('character varying(20)', 'TEXT'),
+    ('char(3)', 'TEXT'),
+    ('jsonb', 'TEXT'),
+    ('"text[]"', 'TEXT'),
+    ('"int[3][3]"', 'TEXT'),
+    ('timestamp with time zone', 'TEXT'),
+    ('datetime(6)', 'TEXT'),
+    ('decimal(10,2)', 'REAL'),
+    ('numeric(8)', 'REAL'),
+    ('"double precision"', 'REAL'),
+    ('int(11) unsigned', 'INTEGER'),
+    ('bigserial', 'INTEGER'),
+    ('bytea', 'BLOB'),
+    ('varbinary(16)', 'BLOB'),
+])
+def test_resolve(colType, sqliteType):
+    assert TypeRegistry().coerce(colType) == sqliteType
+
+def test_resolveRule():
+    registry = TypeRegistry()
+    assert registry.resolve('varchar') == TypeMatch('varchar', 'TEXT', 'VARCHAR')
+    match = registry.resolve('varchar(80)')
+    assert match.sqliteType == 'TEXT' and match.rule.startswith('re:')
+    # Remembered per type string.
+    assert registry.resolve('varchar(80)') is match
+    with pytest.raises(ValueError, match='"VARCHAR\\(A\\)"'):
+        registry.resolve('varchar(a)')
+
+def test_customRules():
+    registry = TypeRegistry()
+    before = registry.fingerprint()
+    assert registry.coerce('varchar(80)') == 'TEXT'
+    registry.add('geometry', 'blob')
+    registry.addPattern(r'VARCHAR\(\d+\)', 'BLOB')
+    assert registry.coerce('Geometry') == 'BLOB'
+    # Later patterns win, and the remembered result is forgotten.
+    assert registry.coerce('varchar(80)') == 'BLOB'
+    assert registry.fingerprint() != before
+    with pytest.raises(ValueError):
+        registry.add('x', 'FLOAT')
+    with pytest.raises(ValueError):
+        registry.addPattern('(', 'TEXT')
+    registry.reset()
+    assert registry.fingerprint() == before
+    assert TypeRegistry({'money': 'TEXT'}, ()).state() == ({'MONEY': 'TEXT'}, [])
+
+def test_extended():
+    registry = TypeRegistry()
+    before = registry.state()
+    with registry.extended({'geometry': 'BLOB', 're:POINT\\(\\d+\\)': 'TEXT'}) as extended:
+        assert extended is registry
+        assert registry.coerce('geometry') == 'BLOB'
+        assert registry.coerce('point(2)') == 'TEXT'
+    assert registry.state() == before
+    with pytest.raises(ValueError):
+        registry.coerce('geometry')
+
+def test_readColTypes(tmp_path):
+    path = tmp_path / 'types.json'
+    path.write_text(json.dumps({'geometry': 'BLOB', 're:GEO\\w*': 'blob'}))
+    assert readColTypes(path) == {'geometry': 'BLOB', 're:GEO\\w*': 'blob'}
+    for content in ('{', '["geometry"]', '{"geometry": 1}', '{"geometry": "FLOAT"}', '{"re:(": "TEXT"}'):
+        path.write_text(content)
+        with pytest.raises(ValueError):
+            readColTypes(path)
+
+def test_globalRegistry(things):
+    with pytest.raises(ValueError):
+        toSQLite(str(things))
+    with TYPE_REGISTRY.extended({'geometry': 'BLOB'}):
+        assert coerceColType('geometry') == 'BLOB'
+        assert 'shape BLOB' in toSQLite(str(things))
+    with pytest.raises(ValueError):
+        coerceColType('geometry')
+
+def test_cacheKey(things):
+    cache = MemoryCache()
+    with TYPE_REGISTRY.extended({'geometry': 'BLOB'}):
+        assert 'shape BLOB' in toSQLite(str(things), cache=cache)
+    with TYPE_REGISTRY.extended({'geometry': 'TEXT'}):
+        assert 'shape TEXT' in toSQLite(str(things), cache=cache)
+
+def test_workers(tmp_path):
+    for i in range(2):
+        (tmp_path / f'{i}.dbml').write_text(DBML.replace('things', f'things{i}'))
+    with TYPE_REGISTRY.extended({'geometry': 'BLOB'}):
+        assert toSQLite(str(tmp_path), workers=2).count('shape BLOB') == 2
+
+def test_explainColTypes(things):
+    matches = explainColTypes(str(things))
+    assert [(m.colType, m.sqliteType) for m in matches] == [('int(11)', 'INTEGER'), ('"decimal(10, 2)"', 'REAL'), ('"text[]"', 'TEXT'), ('geometry', None), ('varchar(80)', 'TEXT')]
+    assert matches[3] == TypeMatch('geometry', None, None)
+
+def test_cliTypes(things, tmp_path, runner):
+    result = runner.invoke(cli, [str(things), '--type', 'geometry=blob', '--explain-types'])
+    assert result.exit_code == 0
+    assert 'shape BLOB' in result.stdout
+    assert 'geometry -> BLOB (GEOMETRY)' in result.stderr
+    assert 'varchar(80) -> TEXT (re:' in result.stderr
+    types = tmp_path / 'types.json'
+    types.write_text(json.dumps({'re:GEO\\w*': 'TEXT'}))
+    result = runner.invoke(cli, [str(things), '--types', str(types)])
+    assert 'shape TEXT' in result.stdout
+    # --type wins over --types.
+    result = runner.invoke(cli, [str(things), '--types', str(types), '--type', 're:GEO\\w*=BLOB'])
+    assert 'shape BLOB' in result.stdout
+    # The rules only apply to the run that added them.
+    result = runner.invoke(cli, [str(things), '--explain-types'])
+    assert 'geometry -> ? (no rule matches)' in result.stderr
+    assert 'Could not figure out how to coerce "GEOMETRY"' in result.stdout
+    result = runner.invoke(cli, [str(things), '--type', 'geometry'])
+    assert result.exit_code == 2 and 'NAME=TYPE' in result.stderr
+    types.write_text('{"geometry": "FLOAT"}')
+    result = runner.invoke(cli, [str(things), '--types', str(types)])
+    assert result.exit_code == 2 and 'FLOAT' in result.stderr
@@ -2,7 +2,7 @@ import pytest
 import os
 import sqlite3
 from dbml_sqlite import __version__
-from dbml_sqlite import toSQLite, validDBMLFile, coerceColType, processColumn, processRef, processEnum, processTable, processFile, processIndex
+from dbml_sqlite import toSQLite, iterSQLite, validDBMLFile, coerceColType, processColumn, processRef, processEnum, processTable, processFile, processIndex, foreignKeyIndexes, indexName, tableOptions, indexOptions, parseDBMLFile, processLabelView, enumColumns, enumInserts
 from pydbml.classes import Enum
 from pathlib import Path
 
@@ -23,6 +23,7 @@ class MockColumn:
         self.not_null = not_null
         self.unique = unique
         self.default = default
+        self.autoinc = False
 class MockRef:
     def __init__(self, col, ref_table, ref_col, on_update, on_delete):
         self.col = col
@@ -95,6 +96,7 @@ def test_process_column():
     assert processColumn(c4, 'full') == '  c4 TEXT DEFAULT \'howdy\''
     assert processColumn(c5, 'full') == '  c5 TEXT NOT NULL REFERENCES e1(type)'
     assert processColumn(c5, 'half') == '  c5 TEXT CHECK( c5 IN ( \'i1\', \'i2\' ) ) NOT NULL'
+    assert processColumn(c5, 'integer') == '  c5 INTEGER NOT NULL REFERENCES e1(id)'
     assert processColumn(c6, 'full') == '  c6 REAL NOT NULL DEFAULT 12.345'
 
 def test_process_ref():
@@ -129,7 +131,27 @@ def test_process_enum():
     items.append(MockItem('Jimmy'))
     e = MockEnum('myEnum', items)
     o = processEnum(e)
-    assert o == f'CREATE TABLE IF NOT EXISTS {e.name} (\n  id INTEGER PRIMARY KEY,\n  type TEXT NOT NULL UNIQUE,\n  seq INTEGER NOT NULL UNIQUE\n);\nINSERT INTO {e.name}(type, seq) VALUES (\'Joe\', 1);\nINSERT INTO {e.name}(type, seq) VALUES (\'Bob\', 2);\nINSERT INTO {e.name}(type, seq) VALUES (\'Jimmy\', 3);\n'
+    assert o == f'CREATE TABLE IF NOT EXISTS {e.name} (\n  id INTEGER PRIMARY KEY,\n  type TEXT NOT NULL UNIQUE,\n  seq INTEGER NOT NULL UNIQUE\n);\nINSERT INTO {e.name}(type, seq) VALUES\n  (\'Joe\', 1),\n  (\'Bob\', 2),\n  (\'Jimmy\', 3)\nON CONFLICT DO NOTHING;\n'
+    o = processEnum(e, False, False, sqliteVersion='3.23.1')
+    assert o[1] == "INSERT OR IGNORE INTO myEnum(type, seq) VALUES\n  ('Joe', 1),\n  ('Bob', 2),\n  ('Jimmy', 3);\n"
+    assert (o[1].sql, o[1].rows) == ('INSERT OR IGNORE INTO myEnum(type, seq) VALUES (?, ?)', [('Joe', 1), ('Bob', 2), ('Jimmy', 3)])
+
+def test_enum_batches(tmp_path):
+    labels = [f"it's {i}" for i in range(1201)]
+    statements = enumInserts('code', [(label, i + 1) for i, label in enumerate(labels)])
+    assert [len(s.rows) for s in statements] == [500, 500, 201]
+    assert statements[0].sql == 'INSERT INTO code(type, seq) VALUES (?, ?) ON CONFLICT DO NOTHING'
+    assert "  ('it''s 0', 1),\n" in statements[0]
+    long = ['x' * 300000 for _ in range(4)]
+    assert [len(s.rows) for s in enumInserts('code', [(label + str(i), i) for i, label in enumerate(long)])] == [3, 1]
+    src = tmp_path / 'codes.dbml'
+    src.write_text('enum code {\n' + ''.join(f'    "{label}"\n' for label in labels) + '}\n')
+    con = sqlite3.connect(':memory:')
+    con.executescript(toSQLite(str(src)))
+    # Running the DDL again skips the rows that are already there instead of failing.
+    con.executescript(toSQLite(str(src)))
+    assert con.execute('SELECT count(*), max(seq) FROM code').fetchone() == (1201, 1201)
+    assert con.execute('SELECT type FROM code WHERE seq = 2').fetchone() == ("it's 1",)
 
 def test_process_file():
     p = Path('./tests/abc.dbml')
@@ -191,3 +213,190 @@ def test_sqlite():
         assert 'message' in tables
         assert 'contact' in tables
     con.close() 
+
+def test_toSQLite_workers(tmp_path):
+    for i in range(4):
+        (tmp_path / f'f{i}.dbml').write_text(f'Table t{i} {{\n    id integer\n}}\n')
+    serial = toSQLite(str(tmp_path), workers=1)
+    assert serial == toSQLite(str(tmp_path), workers=3)
+    assert serial.index('t0 (') < serial.index('t1 (') < serial.index('t3 (')
+    (tmp_path / 'f2.dbml').write_text('Table broken {')
+    with pytest.raises(ValueError, match='f2.dbml'):
+        toSQLite(str(tmp_path), workers=2)
+
+def test_iterSQLite():
+    statements = iterSQLite('./tests/test.dbml')
+    first = next(statements)
+    assert first.startswith('CREATE TABLE IF NOT EXISTS message_status (')
+    assert first.endswith(');\n')
+    rest = list(statements)
+    assert all(s.endswith(';\n') for s in rest)
+    assert first + ''.join(rest) == toSQLite('./tests/test.dbml')
+    with pytest.raises(ValueError):
+        iterSQLite('./tests/asdf')
+
+def test_process_table_segments():
+    lc1 = MockColumn('l1', 'INTEGER', None, None, None, None)
+    segments = processTable(MockTable('lt', [lc1], []), 'full', False, False)
+    assert '  l1' in segments
+    assert all(len(s) > 1 for s in segments)
+
+FK_DBML = '''Table parent {
+    id integer [pk]
+}
+
+Table child {
+    id integer [pk]
+    parent_id integer [ref: > parent.id]
+    other_id integer [ref: > parent.id]
+    unique_id integer [unique, ref: > parent.id]
+    name text
+
+    indexes {
+        (other_id, name)
+    }
+}
+
+Ref: child.parent_id > parent.id [delete: cascade]
+'''
+
+def test_foreign_key_indexes(tmp_path):
+    src = tmp_path / 'fk.dbml'
+    src.write_text(FK_DBML)
+    assert toSQLite(str(src)) == toSQLite(str(src), fkIndexes=False)
+    plain = toSQLite(str(src), join=False, indexExists=False)
+    statements = toSQLite(str(src), join=False, indexExists=False, fkIndexes=True)
+    added = [s for s in statements if s not in plain]
+    name = indexName(MockTable('child', [], []), MockIndex(None, False, [MockItem('parent_id')], None))
+    # parent_id has two refs but gets a single index; other_id leads a declared index and unique_id is unique.
+    assert added == [f'CREATE INDEX {name} ON child (parent_id);\n']
+    assert statements[-1] == added[0]
+    # Once the declared index starts with name, other_id is no longer covered by it.
+    src.write_text(FK_DBML.replace('(other_id, name)', '(name, other_id)'))
+    assert len(toSQLite(str(src), join=False, fkIndexes=True)) == len(statements) + 1
+    for parser in ('pydbml', 'native'):
+        from dbml_sqlite import parseDBMLFile
+        tables = {t.name: t for t in parseDBMLFile(src, parser).tables}
+        fks = foreignKeyIndexes(tables['child'])
+        assert [(fk.columns, len(fk.refs)) for fk in fks] == [(('parent_id',), 2), (('other_id',), 1)]
+        assert fks[0].index.subjects[0] is tables['child'].refs[0].col
+        assert foreignKeyIndexes(tables['parent']) == []
+    con = sqlite3.connect(':memory:')
+    con.executescript(toSQLite(str(src), fkIndexes=True))
+    plan = con.execute('EXPLAIN QUERY PLAN SELECT * FROM child WHERE parent_id = 1').fetchall()
+    assert 'USING INDEX' in plan[0][-1]
+    con.close()
+
+STORAGE_DBML = '''Table membership {
+    user_id integer [not null]
+    group_id integer [not null]
+    role text
+    Note: 'sqlite: strict, without rowid'
+
+    indexes {
+        (user_id, group_id) [pk]
+        role [name: 'active_role', note: 'sqlite: where role IS NOT NULL']
+        role [name: 'role_lower', note: 'sqlite: on lower(role) where user_id > 0']
+        (group_id) [note: 'sqlite: on group_id % 10']
+    }
+}
+
+Table user {
+    id integer [pk]
+    email text
+    Note: "Users.\\nsqlite: strict"
+}
+'''
+
+def test_storage_options(tmp_path):
+    src = tmp_path / 'storage.dbml'
+    src.write_text(STORAGE_DBML)
+    statements = toSQLite(str(src), join=False, tableExists=False, indexExists=False)
+    assert statements[0].endswith(',\n  PRIMARY KEY (user_id, group_id)\n) WITHOUT ROWID, STRICT;\n')
+    assert statements[1].endswith('\n) STRICT;\n')
+    assert statements[2] == 'CREATE INDEX active_role ON membership (role) WHERE role IS NOT NULL;\n'
+    assert statements[3] == 'CREATE INDEX role_lower ON membership (lower(role)) WHERE user_id > 0;\n'
+    assert statements[4].endswith(' ON membership (group_id % 10);\n')
+    assert len(statements) == 5
+    con = sqlite3.connect(':memory:')
+    con.executescript(''.join(statements))
+    assert con.execute("SELECT wr, strict FROM pragma_table_list WHERE name = 'membership'").fetchone() == (1, 1)
+    plan = con.execute('EXPLAIN QUERY PLAN SELECT * FROM membership WHERE lower(role) = ? AND user_id > 0', ('a',)).fetchall()
+    assert 'role_lower' in plan[0][-1]
+    con.close()
+    table = parseDBMLFile(src).tables[0]
+    assert tableOptions(table) == ['without rowid', 'strict']
+    assert [indexOptions(i) for i in table.indexes] == [(None, None), (None, 'role IS NOT NULL'), ('lower(role)', 'user_id > 0'), ('group_id % 10', None)]
+    # An expression index isn't named like a plain index on the same columns.
+    assert indexName(table, table.indexes[3]) != indexName(table, MockIndex(None, False, table.indexes[3].subjects, table))
+    assert toSQLite(str(src), parser='native') == toSQLite(str(src))
+    assert toSQLite(str(src), sqliteVersion='3.37.0') == toSQLite(str(src))
+    with pytest.raises(ValueError, match='Table "membership" uses WITHOUT ROWID'):
+        toSQLite(str(src), sqliteVersion='3.8.1')
+    src.write_text(STORAGE_DBML.replace('(user_id, group_id) [pk]', 'user_id'))
+    with pytest.raises(ValueError, match='WITHOUT ROWID, which requires a primary key'):
+        toSQLite(str(src))
+    src.write_text(STORAGE_DBML.replace('user_id integer [not null]', 'user_id integer [pk]'))
+    with pytest.raises(ValueError, match='both a \\[pk\\] column and a \\[pk\\] index'):
+        toSQLite(str(src))
+    src.write_text(STORAGE_DBML.replace('strict, without rowid', 'fast'))
+    with pytest.raises(ValueError, match='Unknown SQLite option "fast" in the note of table "membership"'):
+        toSQLite(str(src))
+
+def test_storage_option_validation():
+    col = MockColumn('id', 'INTEGER', True, None, None, None)
+    table = MockTable('t', [col], [])
+    table.note = 'sqlite: without rowid'
+    table.indexes = []
+    assert processTable(table, 'full', False).endswith('\n) WITHOUT ROWID;\n')
+    col.autoinc = True
+    with pytest.raises(ValueError, match='AUTOINCREMENT'):
+        processTable(table, 'full', False)
+    col.autoinc = False
+    table.note = 'sqlite: STRICT'
+    table.columns.append(MockColumn('nothing', 'NONE', None, None, None, None))
+    with pytest.raises(ValueError, match='"nothing" of table "t" has type NULL'):
+        processTable(table, 'full', False)
+    table.columns.pop()
+    assert processTable(table, 'full', False, sqliteVersion=(3, 37, 2)).endswith(') STRICT;\n')
+    with pytest.raises(ValueError, match='STRICT, which needs SQLite 3.37.0 or newer, but the target is SQLite 3.31.1'):
+        processTable(table, 'full', False, sqliteVersion='3.31.1')
+    index = MockIndex('i', False, [col], table)
+    index.note = 'sqlite: on abs(id) where id > 0'
+    assert processIndex(table, index, indexExists=False) == 'CREATE INDEX i ON t (abs(id)) WHERE id > 0;\n'
+    with pytest.raises(ValueError, match='EXPRESSION INDEX, which needs SQLite 3.9.0'):
+        processIndex(table, index, sqliteVersion='3.8.11')
+    index.note = 'sqlite: where id > 0'
+    assert processIndex(table, index, sqliteVersion='3.8.0').endswith('(id) WHERE id > 0;\n')
+    index.pk = True
+    with pytest.raises(ValueError, match='Primary key index'):
+        processIndex(table, index)
+    index.pk = False
+    index.note = 'sqlite: strict'
+    with pytest.raises(ValueError, match='Invalid SQLite options "strict"'):
+        processIndex(table, index)
+    with pytest.raises(ValueError, match='Invalid SQLite version'):
+        toSQLite('./tests/test.dbml', sqliteVersion='latest')
+
+def test_integer_enums(tmp_path):
+    src = tmp_path / 'events.dbml'
+    src.write_text('enum level {\n    debug\n    info\n}\n\nTable event {\n    id integer [pk]\n    severity level\n    name text\n    previous level\n}\n\nTable plain {\n    id integer\n}\n')
+    out = toSQLite(str(src), 'integer', tableExists=False, labelViews=True)
+    assert 'severity INTEGER NOT NULL REFERENCES level(id)' in out
+    assert out.endswith('CREATE VIEW event_labeled AS\nSELECT\n  t.id,\n  e1.type AS severity,\n  t.name,\n  e2.type AS previous\nFROM event AS t\n  JOIN level AS e1 ON e1.id = t.severity\n  JOIN level AS e2 ON e2.id = t.previous;\nCREATE TABLE plain (\n  id INTEGER\n);\n')
+    assert toSQLite(str(src), 'integer') == toSQLite(str(src), 'integer', labelViews=False)
+    con = sqlite3.connect(':memory:')
+    con.executescript(out)
+    con.execute('PRAGMA foreign_keys = ON')
+    con.execute("INSERT INTO event VALUES (1, (SELECT id FROM level WHERE type = 'info'), 'a', 1)")
+    assert con.execute('SELECT * FROM event_labeled').fetchall() == [(1, 'info', 'a', 'debug')]
+    with pytest.raises(sqlite3.IntegrityError):
+        con.execute("INSERT INTO event VALUES (2, 3, 'b', 1)")
+    with pytest.raises(ValueError, match='"integer" emulation mode'):
+        toSQLite(str(src), labelViews=True)
+    with pytest.raises(ValueError, match='Unknown emulation mode "quarter"'):
+        toSQLite(str(src), 'quarter')
+    plain = MockTable('plain', [MockColumn('id', 'INTEGER', True, None, None, None)], [])
+    assert enumColumns(plain) == []
+    with pytest.raises(ValueError, match='no enum columns'):
+        processLabelView(plain)
@@ -0,0 +1,164 @@
+import pytest
+import sqlite3
+from click.testing import CliRunner
+from dbml_sqlite import diffSQLite, migrateSQLite, applySQLite, applyMigration, migrate
+
+BASE = '''enum status {
+    new
+    done
+}
+
+Table item {
+    id integer [primary key]
+    name text [not null]
+    status status [not null]
+    legacy text
+
+    indexes {
+        name [name: 'item_name']
+    }
+}
+'''
+
+def write(tmp_path, text):
+    p = tmp_path / 'schema.dbml'
+    p.write_text(text)
+    return str(p)
+
+def test_up_to_date(tmp_path):
+    src = write(tmp_path, BASE)
+    con = sqlite3.connect(':memory:')
+    assert len(diffSQLite(src, con)) == 4
+    migrateSQLite(src, con)
+    assert diffSQLite(src, con) == []
+
+def test_add_and_drop(tmp_path):
+    src = write(tmp_path, BASE)
+    con = sqlite3.connect(':memory:')
+    applySQLite(src, con)
+    con.execute("INSERT INTO item (id, name, status) VALUES (1, 'a', 'new')")
+    con.commit()
+    changed = BASE.replace('    legacy text\n', '    note text [default: "none"]\n').replace("name [name: 'item_name']", "(status, name)")
+    src = write(tmp_path, changed)
+    statements = migrateSQLite(src, con)
+    assert statements[0] == 'DROP INDEX item_name;\n'
+    assert 'ALTER TABLE item DROP COLUMN legacy;\n' in statements
+    assert "ALTER TABLE item ADD COLUMN note TEXT DEFAULT 'none';\n" in statements
+    assert statements[-1].startswith('CREATE INDEX _')
+    assert not any('DROP TABLE' in s for s in statements)
+    assert con.execute('SELECT name, note FROM item').fetchall() == [('a', 'none')]
+    assert diffSQLite(src, con) == []
+
+def test_rebuild(tmp_path):
+    src = write(tmp_path, BASE)
+    con = sqlite3.connect(':memory:')
+    applySQLite(src, con)
+    con.execute("INSERT INTO item (id, name, status) VALUES (1, '7', 'new')")
+    con.commit()
+    src = write(tmp_path, BASE.replace('name text [not null]', 'name integer [not null]'))
+    statements = migrateSQLite(src, con)
+    assert 'DROP TABLE item;\n' in statements
+    assert 'CREATE INDEX item_name ON item (name);\n' in statements
+    assert con.execute('SELECT id, name FROM item').fetchall() == [(1, 7)]
+    assert diffSQLite(src, con) == []
+
+def test_rebuild_keeps_triggers(tmp_path):
+    src = write(tmp_path, BASE)
+    con = sqlite3.connect(':memory:')
+    applySQLite(src, con)
+    con.execute("CREATE TABLE log (name TEXT)")
+    con.execute("CREATE TRIGGER item_log AFTER INSERT ON item BEGIN INSERT INTO log VALUES (new.name); END")
+    con.commit()
+    src = write(tmp_path, BASE.replace('name text [not null]', 'name integer [not null]'))
+    statements = migrateSQLite(src, con)
+    assert statements.index('CREATE TRIGGER item_log AFTER INSERT ON item BEGIN INSERT INTO log VALUES (new.name); END;\n') > statements.index('ALTER TABLE _dbml_sqlite_new_item RENAME TO item;\n')
+    con.execute("INSERT INTO item (id, name, status) VALUES (1, 7, 'new')")
+    assert con.execute('SELECT name FROM log').fetchall() == [('7',)]
+    assert diffSQLite(src, con) == []
+
+def test_rebuild_checks_foreign_keys(tmp_path):
+    note = 'Table note {\n    id integer [primary key]\n    item_id integer\n}\n'
+    src = write(tmp_path, BASE + note)
+    con = sqlite3.connect(':memory:')
+    applySQLite(src, con)
+    con.execute("INSERT INTO note (id, item_id) VALUES (1, 42)")
+    con.commit()
+    src = write(tmp_path, BASE + note.replace('item_id integer', 'item_id integer [ref: > item.id]'))
+    with pytest.raises(sqlite3.IntegrityError, match='note row 1 references item'):
+        migrateSQLite(src, con)
+    assert not con.in_transaction
+    assert con.execute('PRAGMA foreign_key_list(note)').fetchall() == []
+    assert con.execute("SELECT name FROM sqlite_master WHERE name LIKE '_dbml_sqlite_new_%'").fetchall() == []
+    con.execute("INSERT INTO item (id, name, status) VALUES (42, 'a', 'new')")
+    con.commit()
+    applyMigration(diffSQLite(src, con), con)
+    assert diffSQLite(src, con) == []
+
+def test_enum_rows(tmp_path):
+    src = write(tmp_path, BASE)
+    con = sqlite3.connect(':memory:')
+    applySQLite(src, con)
+    src = write(tmp_path, BASE.replace('    new\n    done\n', '    done\n    new\n    "in progress"\n'))
+    migrateSQLite(src, con)
+    assert con.execute('SELECT type, seq FROM status ORDER BY seq').fetchall() == [('done', 1), ('new', 2), ('in progress', 3)]
+    src = write(tmp_path, BASE.replace('    new\n    done\n', "    done\n"))
+    assert diffSQLite(src, con) == ["DELETE FROM status WHERE type IN ('new', 'in progress');\n"]
+
+def test_migrate_cli(tmp_path):
+    src = write(tmp_path, BASE)
+    db = tmp_path / 'my.db'
+    sqlite3.connect(str(db)).close()
+    runner = CliRunner()
+    result = runner.invoke(migrate, [src, str(db), '--apply'])
+    assert 'CREATE TABLE item (' in result.output
+    result = runner.invoke(migrate, [src, str(db)])
+    assert result.output == '\n'
+
+def test_fk_indexes(tmp_path):
+    src = write(tmp_path, BASE + 'Table note {\n    id integer [primary key]\n    item_id integer [ref: > item.id]\n}\n')
+    con = sqlite3.connect(':memory:')
+    applySQLite(src, con)
+    statements = diffSQLite(src, con, fkIndexes=True)
+    assert len(statements) == 1 and statements[0].endswith(' ON note (item_id);\n')
+    migrateSQLite(src, con, fkIndexes=True)
+    assert diffSQLite(src, con, fkIndexes=True) == []
+    assert diffSQLite(src, con) == [statements[0].replace('CREATE INDEX', 'DROP INDEX').split(' ON ')[0] + ';\n']
+
+def test_storage_options(tmp_path):
+    src = write(tmp_path, BASE)
+    con = sqlite3.connect(':memory:')
+    applySQLite(src, con)
+    con.execute("INSERT INTO item (id, name, status) VALUES (1, 'a', 'new')")
+    con.commit()
+    src = write(tmp_path, BASE.replace('    legacy text\n', "    legacy text\n    Note: 'sqlite: strict'\n"))
+    statements = diffSQLite(src, con)
+    assert statements[0].startswith('CREATE TABLE _dbml_sqlite_new_item (') and statements[0].endswith(') STRICT;\n')
+    migrateSQLite(src, con)
+    assert diffSQLite(src, con) == []
+    assert con.execute('SELECT name FROM item').fetchall() == [('a',)]
+    src = write(tmp_path, BASE.replace("[name: 'item_name']", "[name: 'item_name', note: 'sqlite: where legacy IS NULL']").replace('    legacy text\n', "    legacy text\n    Note: 'sqlite: strict'\n"))
+    assert diffSQLite(src, con) == ['DROP INDEX item_name;\n', 'CREATE INDEX item_name ON item (name) WHERE legacy IS NULL;\n']
+    migrateSQLite(src, con)
+    assert diffSQLite(src, con) == []
+    src = write(tmp_path, BASE.replace("[name: 'item_name']", "[name: 'item_name', note: 'sqlite: where legacy IS NOT NULL']").replace('    legacy text\n', "    legacy text\n    Note: 'sqlite: strict'\n"))
+    assert diffSQLite(src, con)[-1] == 'CREATE INDEX item_name ON item (name) WHERE legacy IS NOT NULL;\n'
+
+def test_label_views(tmp_path):
+    src = write(tmp_path, BASE)
+    con = sqlite3.connect(':memory:')
+    applySQLite(src, con, 'integer', labelViews=True)
+    con.execute("INSERT INTO item (id, name, status) VALUES (1, 'a', 2)")
+    con.commit()
+    assert diffSQLite(src, con, 'integer', labelViews=True) == []
+    assert diffSQLite(src, con, 'integer') == []
+    con.execute('CREATE VIEW item_names AS SELECT name FROM item')
+    # Renaming the rebuilt table and dropping a column both fail while a view reads the table.
+    src = write(tmp_path, BASE.replace('name text [not null]', 'name integer [not null]').replace('    legacy text\n', ''))
+    statements = migrateSQLite(src, con, 'integer', labelViews=True)
+    assert statements[:2] == ['DROP VIEW item_labeled;\n', 'DROP VIEW item_names;\n']
+    view = 'CREATE VIEW item_labeled AS\nSELECT\n  t.id,\n  t.name,\n  e1.type AS status\nFROM item AS t\n  JOIN status AS e1 ON e1.id = t.status;\n'
+    assert statements[-2:] == [view, 'CREATE VIEW item_names AS SELECT name FROM item;\n']
+    assert con.execute('SELECT * FROM item_labeled').fetchall() == [(1, 'a', 'done')]
+    assert diffSQLite(src, con, 'integer', labelViews=True) == []
+    con.execute('DROP VIEW item_labeled')
+    assert diffSQLite(src, con, 'integer', labelViews=True) == [view]
@@ -0,0 +1,64 @@
+import sys
+import subprocess
+import pytest
+import dbml_sqlite
+
+ROOT = __file__.rsplit('tests', 1)[0]
+
+# Modules that must not be loaded just by importing the package or the CLI module.
+HEAVY = ('pydbml', 'pyparsing', 'click', 'sqlite3', 'concurrent.futures', 'csv')
+
+# Generous upper bound on the cumulative import time of the package, in microseconds. Importing everything
+# eagerly took over 200 ms, almost all of it spent in pydbml and pyparsing.
+BUDGET_US = 100000
+
+def importTimes(code):
+    """Run `code` in a fresh interpreter with `-X importtime` and return the cumulative import time of every module, in microseconds."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, cwd=ROOT, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+def loaded(times, package):
+    return [m for m in times if m == package or m.startswith(package + '.')]
+
+@pytest.mark.parametrize('code', ['import dbml_sqlite', 'from dbml_sqlite import coerceColType'])
+def test_package_import_is_light(code):
+    times = importTimes(code)
+    for package in HEAVY:
+        assert loaded(times, package) == []
+    assert min(importTimes(code)['dbml_sqlite'] for _ in range(3)) < BUDGET_US
+
+def test_terminal_import_skips_pydbml():
+    times = importTimes('import dbml_sqlite.terminal')
+    assert 'click' in times
+    for package in ('pydbml', 'pyparsing', 'concurrent.futures', 'csv'):
+        assert loaded(times, package) == []
+
+def test_client_skips_click(tmp_path):
+    # Nothing listens on the socket, so the client gives up after trying to connect.
+    code = f"from dbml_sqlite.__main__ import main\ntry:\n    main(['client', '--socket', {str(tmp_path / 'none.sock')!r}, '--ping'])\nexcept SystemExit as e:\n    assert e.code == 2"
+    times = importTimes(code)
+    assert 'dbml_sqlite.serve' in times
+    for package in HEAVY:
+        assert loaded(times, package) == []
+
+def test_lazy_attributes():
+    assert 'applySQLite' in dir(dbml_sqlite)
+    assert dbml_sqlite.cli is dbml_sqlite.terminal.cli
+    from dbml_sqlite import DDLCache, loadSQLite, diffSQLite
+    assert DDLCache.__module__ == 'dbml_sqlite.cache'
+    with pytest.raises(AttributeError):
+        dbml_sqlite.notAThing
+
+def test_star_import_exports_public_api():
+    namespace = {}
+    exec('from dbml_sqlite import *', namespace)
+    for name in ('re', 'os', 'hashlib', 'partial', 'Path', 'chain', 'core', 'native'):
+        assert name not in namespace
+    for name in ('toSQLite', 'iterPhased', 'Event', 'applySQLite', 'cli'):
+        assert name in namespace
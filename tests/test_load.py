@@ -0,0 +1,112 @@
+import pytest
+import sqlite3
+from click.testing import CliRunner
+from dbml_sqlite import loadSQLite, loadRows, toSQLite, cli
+
+def test_phases():
+    schema = toSQLite('./tests/test.dbml', phase='schema')
+    indexes = toSQLite('./tests/test.dbml', phase='indexes')
+    assert 'INDEX' not in schema
+    assert indexes == 'CREATE UNIQUE INDEX IF NOT EXISTS unique_contact ON contact (name, phone);\n'
+    assert schema + indexes == toSQLite('./tests/test.dbml')
+    with pytest.raises(ValueError):
+        toSQLite('./tests/test.dbml', phase='views')
+
+def test_phases_directory(tmp_path):
+    for i in range(2):
+        (tmp_path / f'f{i}.dbml').write_text(f'Table t{i} {{\n    id integer\n\n    indexes {{\n        id\n    }}\n}}\n')
+    o = toSQLite(str(tmp_path))
+    assert o.index('t1 (') < o.index('INDEX')
+
+def test_loadSQLite(tmp_path):
+    contacts = tmp_path / 'contact.csv'
+    contacts.write_text('id,name,phone,zip\n1,Ann,555,920\n2,,556,414\n')
+    messages = tmp_path / 'message.jsonl'
+    messages.write_text('{"id": 1, "body": "hi", "status": "sent", "contact_id": "1"}\n\n{"id": 2, "body": "yo", "status": "failed", "contact_id": 2}\n')
+    con = sqlite3.connect(':memory:')
+    counts = loadSQLite('./tests/test.dbml', con, {'contact': contacts, 'message': messages}, batchSize=1)
+    assert counts == {'contact': 2, 'message': 2}
+    assert con.execute('SELECT id, name, phone FROM contact ORDER BY id').fetchall() == [(1, 'Ann', 555), (2, None, 556)]
+    assert con.execute('SELECT contact_id FROM message ORDER BY id').fetchall() == [(1,), (2,)]
+    assert con.execute("SELECT count(*) FROM sqlite_master WHERE name = 'unique_contact'").fetchone()[0] == 1
+    bad = tmp_path / 'bad.csv'
+    bad.write_text('id,nope\n1,2\n')
+    with pytest.raises(ValueError):
+        loadRows(con, 'contact', bad)
+
+def test_load_values(tmp_path):
+    con = sqlite3.connect(':memory:')
+    con.execute('CREATE TABLE t (n INTEGER, s TEXT, r REAL, u)')
+    rows = tmp_path / 't.jsonl'
+    rows.write_text('{"n": "3.0", "s": {"a": 1}, "r": "2.5", "u": [1, 2]}\n{"n": 4, "s": true, "r": null}\n{"s": ["x"], "n": null}\n')
+    assert loadRows(con, 't', rows) == 3
+    assert con.execute('SELECT n, s, r, u FROM t').fetchall() == [(3, '{"a": 1}', 2.5, '[1, 2]'), (4, 'true', None, None), (None, '["x"]', None, None)]
+    csvRows = tmp_path / 't.csv'
+    csvRows.write_text('n,s\n1,a\n2.9,b\n')
+    with pytest.raises(ValueError, match='row 2, column n: 2.9 is not an integer'):
+        loadRows(con, 't', csvRows)
+    rows.write_text('{"n": 1}\n{"n": 2.5}\n')
+    with pytest.raises(ValueError, match='row 2, column n'):
+        loadRows(con, 't', rows, batchSize=1)
+    # Nothing of a failed file is kept.
+    assert con.execute('SELECT count(*) FROM t').fetchone()[0] == 3
+
+def test_load_csv_row_length(tmp_path):
+    con = sqlite3.connect(':memory:')
+    con.execute('CREATE TABLE t (n INTEGER, s TEXT)')
+    rows = tmp_path / 't.csv'
+    rows.write_text('n,s\n1,a\n2,b,EXTRA\n')
+    with pytest.raises(ValueError, match='row 2 has 3 field\\(s\\), but the header names 2 column\\(s\\)'):
+        loadRows(con, 't', rows)
+    rows.write_text('n,s\n1,a\n2\n')
+    with pytest.raises(ValueError, match='row 2 has 1 field'):
+        loadRows(con, 't', rows, batchSize=1)
+    assert con.execute('SELECT count(*) FROM t').fetchone()[0] == 0
+
+def test_load_blobs(tmp_path):
+    con = sqlite3.connect(':memory:')
+    con.execute('CREATE TABLE t (b BLOB)')
+    rows = tmp_path / 't.jsonl'
+    rows.write_text('{"b": "ab"}\n{"b": 5}\n{"b": true}\n{"b": 1.5}\n{"b": {"a": [1]}}\n')
+    assert loadRows(con, 't', rows) == 5
+    assert con.execute('SELECT b FROM t').fetchall() == [(b'ab',), (b'5',), (b'true',), (b'1.5',), (b'{"a": [1]}',)]
+
+def test_load_jsonl_keys(tmp_path):
+    con = sqlite3.connect(':memory:')
+    con.execute('CREATE TABLE t (a INTEGER, b TEXT)')
+    rows = tmp_path / 't.jsonl'
+    rows.write_text('{"a": 1}\n{"a": 2, "b": "x"}\n')
+    with pytest.raises(ValueError, match='row 2 has key\\(s\\) b'):
+        loadRows(con, 't', rows)
+    assert con.execute('SELECT count(*) FROM t').fetchone()[0] == 0
+    rows.write_text('{"a": 1, "b": null}\n{"a": 2, "b": "x"}\n{"b": "y"}\n')
+    assert loadRows(con, 't', rows) == 3
+    assert con.execute('SELECT a, b FROM t').fetchall() == [(1, None), (2, 'x'), (None, 'y')]
+
+def test_load_integer_enums(tmp_path):
+    contacts = tmp_path / 'contact.csv'
+    contacts.write_text('id,name,phone,zip\n1,Ann,555,414\n')
+    messages = tmp_path / 'message.jsonl'
+    messages.write_text('{"id": 1, "body": "hi", "status": "sent", "contact_id": 1}\n{"id": 2, "body": "yo", "status": 5, "contact_id": 1}\n')
+    con = sqlite3.connect(':memory:')
+    loadSQLite('./tests/test.dbml', con, {'contact': contacts, 'message': messages}, emulation='integer')
+    # zip labels look like numbers, but a CSV field is always a label.
+    assert con.execute('SELECT zip_code.type FROM contact JOIN zip_code ON zip_code.id = contact.zip').fetchall() == [('414',)]
+    assert con.execute('SELECT message_status.type FROM message JOIN message_status ON message_status.id = message.status ORDER BY message.id').fetchall() == [('sent',), ('failed',)]
+    messages.write_text('{"id": 3, "body": "hi", "status": "lost", "contact_id": 1}\n')
+    with pytest.raises(ValueError, match='row 1, column status: "lost" is not a label of message_status, expected one of: unsent, pending'):
+        loadRows(con, 'message', messages)
+
+def test_cli_load(tmp_path):
+    (tmp_path / 'src.dbml').write_text('Table tester {\n    id integer\n    score real\n\n    indexes {\n        score\n    }\n}\n')
+    (tmp_path / 'rows.csv').write_text('id,score\n1,2.5\n')
+    db = tmp_path / 'my.db'
+    runner = CliRunner()
+    result = runner.invoke(cli, [str(tmp_path / 'src.dbml'), '-n', '-x', str(db), '--load', f'tester={tmp_path / "rows.csv"}'])
+    assert 'Loaded 1 rows into tester.' in result.output
+    con = sqlite3.connect(str(db))
+    assert con.execute('SELECT score FROM tester').fetchall() == [(2.5,)]
+    assert con.execute("SELECT count(*) FROM sqlite_master WHERE type = 'index'").fetchone()[0] == 1
+    con.close()
+    result = runner.invoke(cli, [str(tmp_path / 'src.dbml'), '--load', 'tester'])
+    assert result.exit_code != 0
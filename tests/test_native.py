@@ -0,0 +1,166 @@
+import time
+import pytest
+from pathlib import Path
+from pydbml import PyDBML
+from click.testing import CliRunner
+from benchmarks.synthetic import syntheticDBML
+from dbml_sqlite import cli, toSQLite, parseDBMLFile, processEnum, processTable, processIndex
+from dbml_sqlite.native import parseDBML, parseFile, UnsupportedSyntax
+
+# DBML the native parser handles itself. Each one must give exactly what PyDBML gives.
+SUPPORTED = [
+    'Table a {\n id int\n}',
+    'TABLE a {\n id int [NOT NULL, PK, Default: TRUE]\n}\n',
+    'table a {\n id int [default: false, null]\n name text [default: null]\n}',
+    'Table a {\n id int [default: 1.50]\n n int [default: 007]\n}',
+    'Table a {\n id int [default: `now()`]\n x text [default: ` x `]\n}',
+    'Table a {\n id int [default: "x\'y"]\n y text [default: \'\']\n}',
+    'Table a {\n id decimal(10, 2)\n b decimal( 10,2 )\n c decimal(10,  2)\n d int (11)\n e int(11)[pk]\n}',
+    'Table a {\n id int unique pk\n b int pk\n}',
+    'Table a {\n id int [not null, null]\n b int [increment, null]\n c int [primary key, unique, increment]\n}',
+    'Table a {\n id int [\n  pk,\n  default: 3 // c\n ]\n b int [note:\n "x"]\n}',
+    'Table a {\n id int [note: \'x\', unique, note: "y"]\n}',
+    'Table a {\n note text\n}',
+    'Table a {\n id int\n Note: "hi"\n}',
+    'Table a {\n id int\n Note { \'t\' }\n indexes {\n  id [type: BTREE, note: "n"] (id) [unique] \n}\n}',
+    'Table a {\n id int\n name text\n indexes {\n id\n (id, name) [unique, name: "n"]\n ( name , id ) [type: hash]\n }\n}',
+    'Table a {\n id int\n indexes { id }\n}',
+    'Table a {\n id int [pk]\n indexes {\n id [pk] // c\n}\n}',
+    'Table a as A [headercolor: #fff] {\n id int\n}',
+    'Table a [note: "tn", headercolor: #A0B1C2] {\n id int\n}',
+    'Table "a b" {\n "c d" int\n}',
+    'Table a{\n id int\n}',
+    'Table a\n{\n id int\n}',
+    'Table a {\n\n id int // c\n\n}\n\n',
+    '// c\nTable a {\n id int\n}\n// d\n',
+    '\ufeffTable a {\n id int\n}',
+    'Table a {\r\n id int\r\n}\r\n',
+    'Table a {\n id int\n}\nTable a {\n x int\n}',
+    'enum e { a b c\n}',
+    'enum e {\n a // x\n}',
+    'enum e {\n\n a [note: "n"]\n "in progress"\n}\n',
+    'enum e\n{\n a\n}',
+    'enum text {\n a\n}\nTable a {\n t text\n}',
+    'Table a {\n id int\n}\nTable b {\n a_id int [ref: > a.id]\n}',
+    'Table a {\n id int [ref: > a.id, ref: < a.id, ref: - a.id]\n}',
+    'Table a {\n id int\n}\nTable b {\n a_id int\n}\nRef: a.id < b.a_id [delete: Cascade]',
+    'Table a {\n id int\n}\nTable b {\n a_id int\n}\nRef x { a.id < b.a_id }',
+    'Table a {\n id int\n}\nTable b {\n a_id int\n}\nRef x {\n a.id < b.a_id\n}\n',
+    'Table a {\n id int\n}\nRef name: a.id - a.id [update: set null, delete: no action]',
+    'Table a {\n id int\n}\nRef name: a.id > a.id [update:   set default, delete: restrict] // c\n',
+    'Table a {\n id int\n}\nref: a.id - a.id\n',
+    'Ref: b.a_id > a.id\nTable a {\n id int\n}\nTable b {\n a_id int [ref: > a.id]\n}',
+]
+
+# DBML outside of the native subset. The native parser refuses it, and `parseFile` hands it to PyDBML.
+UNSUPPORTED = [
+    'Project p {\n database_type: \'SQLite\'\n}\nTable a {\n id int\n}',
+    'Table a {\n id int\n}\nTableGroup g {\n a\n}',
+    "Table a {\n id int [note: '''multi\nline''']\n}",
+    "Table a {\n id int [default: 'it\\'s']\n}",
+    'Table a {\n id "my type"\n}',
+    'Table a {\n id varchar(a b)\n}',
+]
+
+# Invalid DBML. PyDBML raises, and so must the native parser, so neither produces DDL.
+INVALID = [
+    '',
+    'Table a { id int }',
+    'Table a {\n id int } ',
+    'Table a {\n id int\n} // hi',
+    'Table a {\n id int [default: -1]\n}',
+    'Table a {\n id int [default: 1.5, not  null]\n}',
+    'Table a {\n id int\n}\nTable b {\n a_id int [ref : > a.id]\n}',
+    'Table a {\n id int\n}\n\nRef {\n a.id > a.id\n} // x',
+    'enum e {\n a\n\n}',
+    'enum e {\n a\n b }',
+    'Table a {\n id int\n}\nRef: a.id > b.id',
+    'Table a {\n id int\n indexes {\n  nope\n }\n}',
+    'Table a {\n indexes {\n  id\n }\n}',
+    'Table a {\n id int [pkey]\n}',
+    'Table a {\n id int\n indexes {\n  id [pk, unique]\n }\n}',
+]
+
+def shape(parsed):
+    """Everything the `process*` functions (and anything built on them) can see of a parse result."""
+    def note(n):
+        return n.text if n else ''
+    def colType(t):
+        return t if isinstance(t, str) else (type(t).__name__, t.name, [(i.name, note(i.note)) for i in t.items])
+    tables = []
+    for t in parsed.tables:
+        tables.append((
+            t.name, t.alias, note(t.note), t.header_color,
+            [(c.name, colType(c.type), c.unique, c.not_null, c.pk, c.autoinc, c.default, type(c.default).__name__, note(c.note), c.table.name) for c in t.columns],
+            [(r.col.name, r.ref_table.name, r.ref_col.name, r.name, r.on_update, r.on_delete) for r in t.refs],
+            [(i.subject_names, [s.name for s in i.subjects], i.name, i.unique, i.type, i.pk, note(i.note), i.table.name) for i in t.indexes],
+        ))
+    enums = [(e.name, [(i.name, note(i.note)) for i in e.items]) for e in parsed.enums]
+    return tables, enums, sorted(parsed.table_dict)
+
+def ddl(parsed, emulation):
+    statements = []
+    try:
+        if emulation == 'full':
+            for enum in parsed.enums:
+                statements.extend(processEnum(enum, False, False))
+        statements.extend(processTable(t, emulation, False) for t in parsed.tables)
+        statements.extend(processIndex(t, i, indexExists=False) for t in parsed.tables for i in t.indexes)
+    except ValueError as e:
+        statements.append(f'ValueError: {e}')
+    return statements
+
+def corpus():
+    yield from SUPPORTED
+    for path in sorted(Path('tests').rglob('*.dbml')):
+        yield path.read_text(encoding='utf8')
+    for seed in range(4):
+        yield syntheticDBML(tables=8, columns=6, enums=3, enumItems=4, refs=3, indexes=3, seed=seed)
+
+@pytest.mark.parametrize('source', list(corpus()))
+def test_native_matches_pydbml(source):
+    expected = PyDBML(source)
+    parsed = parseDBML(source)
+    assert shape(parsed) == shape(expected)
+    for emulation in ('full', 'half'):
+        assert ddl(parsed, emulation) == ddl(expected, emulation)
+
+@pytest.mark.parametrize('source', UNSUPPORTED)
+def test_native_falls_back(source, tmp_path):
+    with pytest.raises(UnsupportedSyntax):
+        parseDBML(source)
+    path = tmp_path / 'schema.dbml'
+    path.write_text(source, encoding='utf8')
+    assert shape(parseFile(path)) == shape(PyDBML(source))
+
+@pytest.mark.parametrize('source', INVALID)
+def test_native_rejects_invalid(source, tmp_path):
+    with pytest.raises(Exception):
+        PyDBML(source)
+    with pytest.raises(UnsupportedSyntax):
+        parseDBML(source)
+    path = tmp_path / 'schema.dbml'
+    path.write_text(source, encoding='utf8')
+    with pytest.raises(Exception):
+        parseFile(path)
+
+def test_parser_option():
+    assert toSQLite('./tests', parser='native') == toSQLite('./tests')
+    assert toSQLite('./tests/test.dbml', emulation='half', parser='native', join=False) == toSQLite('./tests/test.dbml', emulation='half', join=False)
+    assert toSQLite('./tests', parser='native', workers=2) == toSQLite('./tests')
+    with pytest.raises(ValueError):
+        toSQLite('./tests', parser='fast')
+    assert type(parseDBMLFile(Path('tests/test.dbml'), 'native')).__module__ == 'dbml_sqlite.native'
+    runner = CliRunner()
+    assert runner.invoke(cli, ['tests', '--parser', 'native']).output == runner.invoke(cli, ['tests']).output
+
+def test_native_is_faster():
+    source = syntheticDBML(tables=100, columns=10, enums=5, enumItems=20)
+    def best(func):
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            func(source)
+            times.append(time.perf_counter() - start)
+        return min(times)
+    assert best(PyDBML) > 5 * best(parseDBML)
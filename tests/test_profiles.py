@@ -0,0 +1,104 @@
+import sqlite3
+import pytest
+from dbml_sqlite import toSQLite, iterSQLite, pragmaPreamble, resolvePragmas, pragmaStatements, parsePragma, applyPreamble, applySQLite, loadSQLite, PROFILES, cli
+
+SCHEMA = 'Table item {\n    id integer [pk]\n    name text\n}\n'
+
+PROJECT = '''Project app {
+    database_type: 'SQLite'
+    sqlite_profile: 'write-heavy'
+    sqlite_cache_size: '-1000'
+    Note: 'settings'
+}
+'''
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+def pragma(con, key):
+    return con.execute(f'PRAGMA {key}').fetchone()[0]
+
+def test_resolvePragmas():
+    assert resolvePragmas() == {}
+    values = resolvePragmas('read-heavy', {'Cache_Size': -10, 'busy_timeout': 5000})
+    assert list(values) == ['page_size', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'busy_timeout']
+    assert values['cache_size'] == '-10' and values['journal_mode'] == 'WAL'
+    project = {'database_type': 'SQLite', 'sqlite_profile': 'embedded-small', 'sqlite_page_size': '2048'}
+    assert resolvePragmas(project=project)['page_size'] == '2048'
+    assert resolvePragmas('write-heavy', project=project)['journal_mode'] == 'WAL'
+    assert resolvePragmas('write-heavy', {'page_size': 8192}, project)['page_size'] == '8192'
+    with pytest.raises(ValueError, match='Unknown profile "fast"'):
+        resolvePragmas('fast')
+    with pytest.raises(ValueError, match='invalid PRAGMA'):
+        resolvePragmas(pragmas={'cache_size': '1; DROP TABLE item'})
+    statements = pragmaStatements(PROFILES['embedded-small'])
+    assert statements[:2] == ['PRAGMA page_size = 1024;\n', 'PRAGMA auto_vacuum = FULL;\n']
+    assert [parsePragma(s) for s in statements] == list(PROFILES['embedded-small'].items())
+    with pytest.raises(ValueError):
+        parsePragma('CREATE TABLE x (id);')
+
+def test_preamble_output(tmp_path):
+    src = write(tmp_path / 'schema.dbml', SCHEMA)
+    assert toSQLite(src, profile=None) == toSQLite(src)
+    statements = toSQLite(src, profile='read-heavy', pragmas={'cache_size': '-100'}, join=False)
+    assert statements[:6] == pragmaStatements(resolvePragmas('read-heavy', {'cache_size': '-100'}))
+    assert statements[6:] == toSQLite(src, join=False)
+    assert list(iterSQLite(src, profile='read-heavy', pragmas={'cache_size': -100}, phase='pragmas')) == statements[:6]
+    write(tmp_path / 'schema.dbml', PROJECT + SCHEMA)
+    expected = pragmaStatements(resolvePragmas('write-heavy', {'cache_size': '-1000'}))
+    for parser in ('pydbml', 'native'):
+        assert pragmaPreamble(src, parser=parser) == expected
+        assert toSQLite(str(tmp_path), parser=parser, join=False)[:len(expected)] == expected
+    assert pragmaPreamble(src, 'embedded-small')[0] == 'PRAGMA page_size = 1024;\n'
+    write(tmp_path / 'other.dbml', PROJECT.replace('-1000', '-2000') + 'Table other {\n    id integer\n}\n')
+    with pytest.raises(ValueError, match='sets sqlite_cache_size to "-1000", but another file sets it to "-2000"'):
+        toSQLite(str(tmp_path))
+
+def test_applyPreamble(tmp_path):
+    path = tmp_path / 'app.db'
+    timings = applySQLite(write(tmp_path / 'schema.dbml', SCHEMA), path, profile='embedded-small')
+    assert 'VACUUM;\n' not in [t.sql for t in timings]
+    con = sqlite3.connect(path)
+    assert (pragma(con, 'page_size'), pragma(con, 'auto_vacuum')) == (1024, 1)
+    con.execute("INSERT INTO item (name) VALUES ('a')")
+    con.commit()
+    statements = [t.sql for t in applyPreamble(pragmaStatements(PROFILES['read-heavy']), con)]
+    assert statements.index('VACUUM;\n') < statements.index('PRAGMA journal_mode = WAL;\n')
+    assert (pragma(con, 'page_size'), pragma(con, 'journal_mode')) == (4096, 'wal')
+    # page_size can't change in WAL mode, so the database leaves it for the VACUUM and comes back.
+    statements = [t.sql for t in applyPreamble(['PRAGMA page_size = 8192;\n', 'PRAGMA journal_mode = WAL;\n'], con)]
+    assert statements == ['PRAGMA page_size = 8192;\n', 'PRAGMA journal_mode = DELETE;\n', 'VACUUM;\n', 'PRAGMA journal_mode = WAL;\n']
+    assert (pragma(con, 'page_size'), pragma(con, 'journal_mode')) == (8192, 'wal')
+    assert 'VACUUM;\n' not in [t.sql for t in applyPreamble(['PRAGMA page_size = 8192;\n'], con)]
+    assert con.execute('SELECT name FROM item').fetchall() == [('a',)]
+    con.execute('BEGIN')
+    with pytest.raises(ValueError, match='transaction in progress'):
+        applyPreamble(['PRAGMA cache_size = -10;\n'], con)
+    con.close()
+
+def test_loadSQLite_profile(tmp_path):
+    rows = tmp_path / 'item.jsonl'
+    rows.write_text('{"id": 1, "name": "a"}\n')
+    path = tmp_path / 'app.db'
+    assert loadSQLite(write(tmp_path / 'schema.dbml', SCHEMA), path, {'item': rows}, profile='write-heavy') == {'item': 1}
+    con = sqlite3.connect(path)
+    assert pragma(con, 'journal_mode') == 'wal'
+    con.close()
+
+def test_cli_profile(tmp_path, runner):
+    src = write(tmp_path / 'schema.dbml', SCHEMA)
+    db = str(tmp_path / 'app.db')
+    result = runner.invoke(cli, [src, '--profile', 'embedded-small', '--pragma', 'cache_size=-100', '-x', db])
+    assert result.stdout.startswith('PRAGMA page_size = 1024;\nPRAGMA auto_vacuum = FULL;\n')
+    assert 'PRAGMA cache_size = -100;\n' in result.stdout
+    assert result.stderr == ''
+    result = runner.invoke(cli, [src, '-n', '--profile', 'read-heavy', '-x', db, '-b'])
+    assert result.stderr == 'Ran VACUUM so the changed page_size or auto_vacuum takes effect.\n'
+    con = sqlite3.connect(db)
+    assert (pragma(con, 'page_size'), pragma(con, 'journal_mode')) == (4096, 'wal')
+    con.close()
+    result = runner.invoke(cli, [src, '--phase', 'pragmas', '--profile', 'write-heavy'])
+    assert result.stdout == ''.join(pragmaStatements(PROFILES['write-heavy'])) + '\n'
+    result = runner.invoke(cli, [src, '--pragma', 'cache_size'])
+    assert 'is not of the form NAME=VALUE' in result.stderr
@@ -0,0 +1,69 @@
+import sqlite3
+import pytest
+from dbml_sqlite import provisionSQLite, provisionStatements, expandTargets, toSQLite, Stats, cli
+from .conftest import tables
+
+def test_expandTargets(tmp_path):
+    for name in ('b.db', 'a.db', 'c.txt'):
+        (tmp_path / name).touch()
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'd.db').touch()
+    assert expandTargets([tmp_path / 'new.db', str(tmp_path / '*.db'), str(tmp_path / 'a.db')]) == [str(tmp_path / p) for p in ('new.db', 'a.db', 'b.db')]
+    assert expandTargets([str(tmp_path / '**' / '*.db')]) == [str(tmp_path / p) for p in ('a.db', 'b.db', 'sub/d.db')]
+    assert expandTargets([str(tmp_path / 'none' / '*.db')]) == []
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_provisionSQLite(tmp_path, workers):
+    existing = tmp_path / 'existing.db'
+    con = sqlite3.connect(existing)
+    con.execute('CREATE TABLE keep (x INTEGER)')
+    con.execute('INSERT INTO keep VALUES (1)')
+    con.commit()
+    con.close()
+    (tmp_path / 'broken.db').write_bytes(b'not a database' * 100)
+    for i in range(3):
+        (tmp_path / f'tenant{i}.db').touch()
+    stats = Stats()
+    results = provisionSQLite('./tests/test.dbml', [tmp_path / 'new.db', str(tmp_path / 'tenant*.db'), existing, tmp_path / 'broken.db'], workers=workers, observer=stats, profile='write-heavy')
+    assert [(r.target, r.ok, r.method) for r in results] == [
+        (str(tmp_path / 'new.db'), True, 'clone'),
+        (str(tmp_path / 'tenant0.db'), True, 'clone'),
+        (str(tmp_path / 'tenant1.db'), True, 'clone'),
+        (str(tmp_path / 'tenant2.db'), True, 'clone'),
+        (str(existing), True, 'apply'),
+        (str(tmp_path / 'broken.db'), False, 'clone'),
+    ]
+    assert 'file is not a database' in results[-1].error
+    assert stats.summary()['provision']['events'] == 6
+    expected = ['contact', 'message', 'message_status', 'zip_code']
+    for r in results[:4]:
+        assert tables(r.target) == expected
+    assert tables(existing) == sorted(expected + ['keep'])
+    con = sqlite3.connect(tmp_path / 'tenant1.db')
+    assert con.execute('SELECT count(*) FROM message_status').fetchone()[0] == 5
+    assert con.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    con.close()
+    con = sqlite3.connect(existing)
+    assert con.execute('SELECT x FROM keep').fetchall() == [(1,)]
+    con.close()
+
+def test_provision_template_failure(tmp_path):
+    with pytest.raises(sqlite3.OperationalError):
+        provisionStatements(['CREATE TABLE a (x);\n', 'CREATE TABLE a (x);\n'], [tmp_path / 'a.db'])
+    assert not (tmp_path / 'a.db').exists()
+
+def test_cli_provision(tmp_path, runner):
+    targets = [str(tmp_path / f'{name}.db') for name in ('a', 'b')]
+    result = runner.invoke(cli, ['./tests/test.dbml', '-x', targets[0], '-x', targets[1], '-j', '2'])
+    assert result.exit_code == 0
+    assert result.stdout == toSQLite('./tests/test.dbml', tableExists=False, indexExists=False, sqliteVersion=sqlite3.sqlite_version) + '\n'
+    assert result.stderr == f'Provisioned {targets[0]} (cloned from the template).\nProvisioned {targets[1]} (cloned from the template).\nProvisioned 2 of 2 databases.\n'
+    (tmp_path / 'c.db').write_bytes(b'not a database' * 100)
+    result = runner.invoke(cli, ['./tests/test.dbml', '-n', '-t', '-i', '-x', str(tmp_path / '*.db')])
+    assert result.stderr.endswith('Provisioned 2 of 3 databases.\n')
+    assert result.exit_code == 1
+    assert f'Error provisioning {tmp_path / "c.db"}: file is not a database' in result.stderr
+    assert f'Provisioned {targets[0]} (executed the statements).' in result.stderr
+    result = runner.invoke(cli, ['./tests/test.dbml', '-x', str(tmp_path / '*.db'), '-l', 'contact=contact.csv'])
+    assert 'requires exactly one --execute database' in result.stderr
+    assert result.stdout == ''
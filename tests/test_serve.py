@@ -0,0 +1,72 @@
+import io
+import json
+import sqlite3
+import threading
+from click.testing import CliRunner
+from dbml_sqlite import MemoryCache, toSQLite, cli
+from dbml_sqlite.serve import handleRequest, serveSocket, serveStdio, sendRequest, clientMain
+
+def request(command, *args, cwd=None):
+    return {'command': command, 'args': list(args), 'cwd': cwd}
+
+def test_handleRequest(tmp_path):
+    cache = MemoryCache()
+    expected = CliRunner().invoke(cli, ['./tests/test.dbml', '-e'])
+    response = handleRequest(request('convert', './tests/test.dbml', '-e'), cache)
+    assert response == {'ok': True, 'exit': 0, 'stdout': expected.stdout, 'stderr': ''}
+    assert handleRequest(request('convert', './tests/test.dbml', '-e'), cache) == response
+    assert (cache.stats()['misses'], cache.stats()['hits']) == (1, 1)
+    assert handleRequest(request('validate', 'test.dbml', cwd='tests'), cache) == {'ok': True, 'exit': 0, 'stdout': '', 'stderr': ''}
+    bad = tmp_path / 'bad.dbml'
+    bad.write_text('Table a {\n    id integer [pk\n}\n')
+    response = handleRequest(request('validate', str(bad)), cache)
+    assert (response['ok'], response['exit']) == (False, 1)
+    assert 'Error generating SQLite DDL' in response['stdout']
+    db = tmp_path / 'app.db'
+    assert handleRequest(request('validate', './tests/test.dbml', '-x', str(db)), cache)['exit'] == 2
+    assert handleRequest(request('apply', './tests/test.dbml'), cache)['stderr'] == 'apply requires --execute.\n'
+    response = handleRequest(request('apply', './tests/test.dbml', '-n', '-x', str(db)), cache)
+    assert response['ok'] and response['stdout'] == ''
+    con = sqlite3.connect(db)
+    assert con.execute('SELECT count(*) FROM zip_code').fetchone()[0] == 5
+    con.close()
+    (tmp_path / 'broken.db').write_bytes(b'not a database' * 100)
+    response = handleRequest(request('apply', './tests/test.dbml', '-n', '-t', '-i', '-x', str(tmp_path / '*.db')), cache)
+    assert (response['ok'], response['exit']) == (False, 1)
+    assert response['stderr'].endswith('Provisioned 1 of 2 databases.\n')
+    assert handleRequest(request('convert', './tests/test.dbml', '--watch'), cache)['exit'] == 2
+    response = handleRequest(request('convert', './tests/test.dbml', '--nope'), cache)
+    assert response['exit'] == 2 and 'No such option' in response['stderr']
+    assert handleRequest(request('convert', '--help'), cache)['exit'] == 0
+    assert handleRequest(request('compile'), cache)['exit'] == 2
+    assert handleRequest(request('convert', cwd=str(tmp_path / 'missing')), cache)['exit'] == 2
+
+def test_serveStdio():
+    lines = [json.dumps(request('ping')), '', 'not json', json.dumps(request('convert', './tests/test.dbml')), json.dumps(request('shutdown')), json.dumps(request('ping'))]
+    output = io.StringIO()
+    serveStdio(io.StringIO('\n'.join(lines) + '\n'), output)
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r['exit'] for r in responses] == [0, 2, 0, 0]
+    assert responses[2]['stdout'] == toSQLite('./tests/test.dbml', tableExists=False, indexExists=False) + '\n'
+
+def test_serveSocket(tmp_path, capsys):
+    path = str(tmp_path / 's.sock')
+    # A socket file nobody listens on is left over from a server that died, and replaced.
+    open(path, 'w').close()
+    server = threading.Thread(target=serveSocket, args=(path,))
+    server.start()
+    for _ in range(200):
+        try:
+            assert sendRequest('ping', path=path)['ok']
+            break
+        except OSError:
+            threading.Event().wait(0.01)
+    assert clientMain(['--socket', path, '--', './tests/test.dbml', '--phase', 'indexes']) == 0
+    assert capsys.readouterr().out == 'CREATE UNIQUE INDEX unique_contact ON contact (name, phone);\n\n'
+    assert clientMain(['--socket', path, '--validate', str(tmp_path)]) == 0
+    assert clientMain(['--socket', path, '--shutdown']) == 0
+    server.join(5)
+    assert not server.is_alive()
+    assert not (tmp_path / 's.sock').exists()
+    assert clientMain(['--socket', path, '--ping']) == 2
+    assert 'Could not reach a dbml_sqlite server' in capsys.readouterr().err
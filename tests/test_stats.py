@@ -0,0 +1,57 @@
+import os
+import pstats
+import sqlite3
+from dbml_sqlite import Stats, Event, DDLCache, toSQLite, applySQLite, statementName, cli
+
+def test_toSQLite_observer():
+    stats = Stats()
+    assert toSQLite('./tests/test.dbml', observer=stats) == toSQLite('./tests/test.dbml')
+    kinds = [e.kind for e in stats.events]
+    assert kinds == ['parse', 'enum', 'enum', 'table', 'table', 'index', 'file']
+    assert stats.events[0] == Event('parse', os.path.join('tests', 'test.dbml'), os.path.join('tests', 'test.dbml'), stats.events[0].seconds, 2)
+    assert [(e.name, e.count) for e in stats.events[1:6]] == [('message_status', 5), ('zip_code', 5), ('message', 4), ('contact', 4), ('unique_contact', 2)]
+    assert stats.events[-1].count == len(toSQLite('./tests/test.dbml', join=False))
+    assert all(e.seconds >= 0 for e in stats.events)
+    summary = stats.summary()
+    assert list(summary) == ['parse', 'enum', 'table', 'index', 'file']
+    assert summary['table']['events'] == 2 and summary['table']['count'] == 8
+
+def test_observer_workers_and_cache(tmp_path):
+    stats = Stats()
+    toSQLite('./tests', workers=2, observer=stats)
+    files = [e.name for e in stats.events if e.kind == 'file']
+    assert files == sorted(files) and len(files) == 2
+    cache = DDLCache(tmp_path / 'cache')
+    toSQLite('./tests', cache=cache)
+    stats = Stats()
+    toSQLite('./tests', cache=cache, observer=stats)
+    assert [e.kind for e in stats.events] == ['cache', 'cache']
+
+def test_applySQLite_observer():
+    stats = Stats()
+    con = sqlite3.connect(':memory:')
+    timings = applySQLite('./tests/test.dbml', con, observer=stats)
+    executed = [e for e in stats.events if e.kind == 'execute']
+    assert [e.name for e in executed] == [statementName(t.sql) for t in timings]
+    assert executed[0].name == 'CREATE TABLE IF NOT EXISTS message_status'
+    assert statementName("INSERT INTO zip_code(type, seq) VALUES ('920', 1);\n") == 'INSERT INTO zip_code'
+    con.close()
+
+def test_format():
+    stats = Stats()
+    stats(Event('table', 'a', 'x.dbml', 0.002, 3))
+    stats(Event('table', 'b', 'x.dbml', 0.001, 2))
+    lines = stats.format().split('\n')
+    assert lines[0].split() == ['step', 'events', 'count', 'total', 'ms', 'max', 'ms', 'slowest']
+    assert lines[1].split() == ['table', '2', '5', '3.00', '2.00', 'a']
+
+def test_cli_stats_and_cprofile(tmp_path, runner):
+    src = tmp_path / 'src.dbml'
+    src.write_text('table tester {\n    id integer\n}')
+    profile = tmp_path / 'run.prof'
+    args = [str(src), '-n', '-x', str(tmp_path / 'my.db'), '--stats', '--cprofile', str(profile), '-c', str(tmp_path / 'cache')]
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0
+    steps = [line.split()[0] for line in result.stderr.strip().split('\n')]
+    assert steps == ['step', 'parse', 'table', 'file', 'execute', 'hits=0']
+    assert pstats.Stats(str(profile)).total_calls > 0
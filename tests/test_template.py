@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+import pytest
+from dbml_sqlite import SchemaTemplate, schemaFixture, toSQLite, Stats
+from .conftest import tables
+
+db = schemaFixture('./tests/test.dbml', profile='read-heavy')
+
+def test_connect(tmp_path):
+    stats = Stats()
+    with SchemaTemplate('./tests/test.dbml', poolSize=2, observer=stats, pragmas={'cache_size': '-100'}) as template:
+        assert template.statements == toSQLite('./tests/test.dbml', join=False)
+        assert template.preamble == ['PRAGMA cache_size = -100;\n']
+        assert stats.summary()['execute']['events'] == len(template.statements) + 1
+        assert len(template._pool) == 2
+        first, second, third = template.connect(), template.connect(), template.connect()
+        assert len(template._pool) == 0
+        for con in (first, second, third):
+            assert tables(con) == ['contact', 'message', 'message_status', 'zip_code']
+            assert con.execute('SELECT count(*) FROM message_status').fetchone()[0] == 5
+            assert con.execute('PRAGMA cache_size').fetchone()[0] == -100
+            assert not con.in_transaction
+        first.execute("INSERT INTO contact (phone, zip) VALUES (1, '920')")
+        first.commit()
+        assert second.execute('SELECT count(*) FROM contact').fetchone()[0] == 0
+        assert template.prewarm() == 2 and template.prewarm(1) == 1 and len(template._pool) == 3
+        path = tmp_path / 'copy.db'
+        con = template.connect(path)
+        con.close()
+        con = sqlite3.connect(path)
+        assert tables(con) == ['contact', 'message', 'message_status', 'zip_code']
+        con.close()
+        for con in (first, second, third):
+            con.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        template.connect()
+
+def test_backup_fallback():
+    template = SchemaTemplate('./tests/test.dbml')
+    template.image = None
+    results = []
+    def worker():
+        con = template.connect()
+        results.append(tables(con))
+        con.close()
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [['contact', 'message', 'message_status', 'zip_code']] * 4
+    template.close()
+    with pytest.raises(ValueError, match='poolSize'):
+        SchemaTemplate('./tests/test.dbml', poolSize=-1)
+
+@pytest.mark.parametrize('name', ['a', 'b'])
+def test_schemaFixture(db, name):
+    # Every test gets its own copy, so the row inserted by the first run is gone in the second.
+    assert db.execute('SELECT count(*) FROM contact').fetchone()[0] == 0
+    db.execute("INSERT INTO contact (name, phone, zip) VALUES (?, 1, '920')", (name,))
+    db.commit()
+    assert db.execute('PRAGMA cache_size').fetchone()[0] == -65536
@@ -1,6 +1,7 @@
 import pytest
 import os
 from dbml_sqlite import cli
+from dbml_sqlite.terminal import main
 from click.testing import CliRunner
 
 def test_cli():
@@ -18,3 +19,64 @@ def test_cli():
             f.write('errrrrrr')
         result = runner.invoke(cli, ['err.dbm1'])
         assert 'Error generating SQLite DDL from dbml. Did you provide a valid dbml file?' in result.output
+        # The same status `dbml_sqlite client` exits with.
+        assert result.exit_code == 1
+
+def test_main_dispatch(capsys):
+    with pytest.raises(SystemExit) as e:
+        main(['migrate', '--help'])
+    assert e.value.code == 0
+    assert 'Usage: dbml_sqlite migrate [OPTIONS] SRC DATABASE' in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        main(['--help'])
+    assert 'Usage: dbml_sqlite [OPTIONS] SRC' in capsys.readouterr().out
+
+def test_main_src_named_like_subcommand(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'migrate').mkdir()
+    (tmp_path / 'migrate' / 'src.dbml').write_text('table tester {\n    id integer\n}')
+    with pytest.raises(SystemExit) as e:
+        main(['--', 'migrate'])
+    assert e.value.code == 0
+    assert capsys.readouterr().out == 'CREATE TABLE tester (\n  id INTEGER\n);\n\n'
+    with pytest.raises(SystemExit) as e:
+        main(['migrate'])
+    assert e.value.code == 2
+    assert 'Usage: dbml_sqlite migrate' in capsys.readouterr().err
+
+def test_cli_fk_indexes(tmp_path, runner):
+    src = tmp_path / 'src.dbml'
+    src.write_text('table a {\n    id integer [pk]\n}\ntable b {\n    a_id integer [ref: > a.id]\n}\n')
+    for args in ([], ['-c', str(tmp_path / 'cache')], ['-c', str(tmp_path / 'cache'), '-s']):
+        result = runner.invoke(cli, [str(src), '-n', '-k'] + args)
+        assert result.exit_code == 0
+        assert result.stderr.split('\n')[0] == 'Added an index on b(a_id) to cover its foreign key.'
+    result = runner.invoke(cli, [str(src), '-k'])
+    assert ' ON b (a_id);' in result.stdout
+    result = runner.invoke(cli, [str(src), '-n', '-k', '--phase', 'schema'])
+    assert result.stderr == ''
+    src.write_text('table a {\n    id integer [pk]\n}\n')
+    result = runner.invoke(cli, [str(src), '-n', '-k'])
+    assert result.stderr == 'Every foreign key column is already covered by an index.\n'
+
+def test_cli_sqlite_version(tmp_path):
+    src = tmp_path / 'src.dbml'
+    src.write_text("table a {\n    id integer [pk]\n    Note: 'sqlite: strict'\n}\n")
+    runner = CliRunner()
+    result = runner.invoke(cli, [str(src), '--sqlite-version', '3.36.0'])
+    assert 'Table "a" uses STRICT, which needs SQLite 3.37.0 or newer, but the target is SQLite 3.36.0.' in result.output
+    assert not (tmp_path / 'my.db').exists()
+    result = runner.invoke(cli, [str(src), '-x', str(tmp_path / 'my.db')])
+    assert result.output.endswith(') STRICT;\n\n')
+
+def test_cli_integer_enums(tmp_path):
+    src = tmp_path / 'src.dbml'
+    src.write_text('enum level {\n    low\n    high\n}\ntable a {\n    id integer [pk]\n    level level\n}\n')
+    runner = CliRunner()
+    result = runner.invoke(cli, [str(src), '-e', '--label-views', '-x', str(tmp_path / 'my.db')])
+    assert 'level INTEGER NOT NULL REFERENCES level(id)' in result.output
+    assert 'CREATE VIEW a_labeled AS' in result.output
+    assert runner.invoke(cli, [str(src), '-h']).output == runner.invoke(cli, [str(src), '--half']).output
+    assert 'REFERENCES level(type)' in runner.invoke(cli, [str(src)]).output
+    result = runner.invoke(cli, [str(src), '--label-views'])
+    assert 'Label views need the "integer" emulation mode, not "full".' in result.output
@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import threading
+from dbml_sqlite import toSQLite, MemoryCache, cli
+from dbml_sqlite import watch
+from dbml_sqlite.watch import snapshotDBML, watchDBML
+
+A = 'Table a {\n    id integer [pk]\n}\n'
+B = 'Table b {\n    id integer [pk]\n}\n'
+
+def touch(path, text, offset):
+    path.write_text(text)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + offset))
+
+def test_snapshotDBML(tmp_path):
+    assert snapshotDBML(tmp_path / 'missing') == {}
+    (tmp_path / 'a.dbml').write_text(A)
+    (tmp_path / 'notes.txt').write_text('x')
+    assert list(snapshotDBML(tmp_path)) == [str(tmp_path / 'a.dbml')]
+    assert list(snapshotDBML(tmp_path / 'a.dbml')) == [str(tmp_path / 'a.dbml')]
+
+def test_watchDBML_debounce(tmp_path):
+    (tmp_path / 'a.dbml').write_text(A)
+    stop = threading.Event()
+    polls = []
+    # Every poll sees one more write of a burst until the third, then the files settle.
+    def fakeSnapshot(dbml):
+        polls.append(dbml)
+        return {'a.dbml': (min(len(polls), 4), 1)}
+    real = watch.snapshotDBML
+    watch.snapshotDBML = fakeSnapshot
+    try:
+        changes = watchDBML(tmp_path, interval=0, debounce=0, stop=stop)
+        assert next(changes) == ['a.dbml']
+        assert len(polls) == 5
+        stop.set()
+        assert list(changes) == []
+    finally:
+        watch.snapshotDBML = real
+
+def test_watchDBML_files(tmp_path):
+    (tmp_path / 'a.dbml').write_text(A)
+    stop = threading.Event()
+    changes = watchDBML(tmp_path, interval=0.01, debounce=0.01, stop=stop)
+    def edit():
+        touch(tmp_path / 'a.dbml', A + B, 10 ** 9)
+        touch(tmp_path / 'b.dbml', B, 0)
+    timer = threading.Timer(0.05, edit)
+    timer.start()
+    assert next(changes) == [str(tmp_path / 'a.dbml'), str(tmp_path / 'b.dbml')]
+    (tmp_path / 'b.dbml').unlink()
+    assert next(changes) == [str(tmp_path / 'b.dbml')]
+    stop.set()
+    assert list(changes) == []
+    timer.join()
+
+def test_MemoryCache(tmp_path):
+    (tmp_path / 'a.dbml').write_text(A)
+    (tmp_path / 'b.dbml').write_text(B)
+    cache = MemoryCache(maxEntries=2)
+    expected = toSQLite(str(tmp_path))
+    assert toSQLite(str(tmp_path), cache=cache) == expected
+    assert toSQLite(str(tmp_path), cache=cache) == expected
+    touch(tmp_path / 'b.dbml', B.replace('id', 'ident'), 10 ** 9)
+    assert toSQLite(str(tmp_path), cache=cache) == toSQLite(str(tmp_path))
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stores'], stats['evictions'], stats['entries']) == (3, 3, 3, 1, 2)
+    assert stats['bytes'] == len(toSQLite(str(tmp_path)))
+    cache.clear()
+    assert cache.get(cache.key(tmp_path / 'a.dbml')) is None
+
+def test_cli_watch(tmp_path, monkeypatch, runner):
+    src = tmp_path / 'schema'
+    src.mkdir()
+    (src / 'a.dbml').write_text(A)
+    (src / 'b.dbml').write_text(B)
+    out = tmp_path / 'out.sql'
+    db = tmp_path / 'app.db'
+    parsed = []
+    expected = []
+    from dbml_sqlite import core, diff
+    real = core.parseDBMLFile
+    def parse(target, parser='pydbml'):
+        parsed.append(target.name)
+        return real(target, parser)
+    monkeypatch.setattr(core, 'parseDBMLFile', parse)
+    monkeypatch.setattr(diff, 'parseDBMLFile', parse)
+    def fakeWatch(dbml, debounce):
+        assert debounce == 0.1
+        (src / 'b.dbml').write_text(B.replace('}', '    name text\n}'))
+        expected.append(toSQLite(str(src), tableExists=False, indexExists=False))
+        del parsed[2:]
+        yield [str(src / 'b.dbml')]
+        (src / 'b.dbml').write_text('Table b {\n    id integer [pk]\n    name text\n    [\n}\n')
+        yield [str(src / 'b.dbml')]
+        raise KeyboardInterrupt
+    monkeypatch.setattr(watch, 'watchDBML', fakeWatch)
+    result = runner.invoke(cli, [str(src), '-n', '-w', str(out), '-x', str(db), '--watch', '--debounce', '0.1'])
+    assert result.exit_code == 0
+    # Only the changed file is converted again; the migration and the broken save parse on their own.
+    assert parsed == ['a.dbml', 'b.dbml', 'b.dbml', 'a.dbml', 'b.dbml', 'b.dbml']
+    assert f'Changed: {src / "b.dbml"}\n' in result.stderr
+    assert f'Applied 1 migration statements to {db}.\n' in result.stderr
+    assert 'Error generating SQLite DDL' in result.stdout
+    # The broken save leaves the output of the last good one in place.
+    assert out.read_text() == expected[0]
+    con = sqlite3.connect(db)
+    assert [r[1] for r in con.execute('PRAGMA table_info(b)')] == ['id', 'name']
+    con.close()
+    result = runner.invoke(cli, [str(src), '-x', str(tmp_path / '*.db'), '--watch'])
+    assert 'supports a single --execute database' in result.stderr